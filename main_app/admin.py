@@ -2,18 +2,28 @@ from django.contrib.auth.models import Group, User
 from django.contrib.auth.admin import GroupAdmin
 from django.contrib import admin
 from django import forms
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 
 from .models import ContactMessage, Respondent, Interest, Question, Choice, Response
 from modeltranslation.admin import TranslationAdmin
+from .pagination import EstimatedCountPaginator
 
 
 # === Respondent ===
 @admin.register(Respondent)
 class RespondentAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'submitted_at', 'get_interests', 'thumbnail')
-    search_fields = ('name', 'email')
+    # Recherche par préfixe (^) : utilisable par les index, contrairement à LIKE '%...%'
+    # (PrefixSearchIndex sur name et email, voir Respondent.Meta)
+    search_fields = ('^name', '^email')
     readonly_fields = ('image_preview',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('interests')
 
     def get_interests(self, obj):
         return ", ".join([interest.name for interest in obj.interests.all()])
@@ -21,13 +31,13 @@ class RespondentAdmin(admin.ModelAdmin):
 
     def thumbnail(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="50" height="50" style="object-fit:cover;" />', obj.image.url)
+            return format_html('<img src="{}" width="50" height="50" style="object-fit:cover;" />', obj.small_image_url)
         return "-"
     thumbnail.short_description = 'Miniature'
 
     def image_preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="300" style="margin-top:10px;" />', obj.image.url)
+            return format_html('<img src="{}" width="300" style="margin-top:10px;" />', obj.medium_image_url)
         return "Aucune image"
     image_preview.short_description = 'Aperçu (image actuelle)'
 
@@ -37,9 +47,25 @@ class RespondentAdmin(admin.ModelAdmin):
 class ResponseAdmin(admin.ModelAdmin):
     list_display = ('respondent', 'get_question', 'get_choice', 'answered_at')
     list_select_related = ('respondent', 'choice', 'choice__question')
-    search_fields = ('respondent__name', 'choice__choice_text', 'choice__question__question_text')
+    search_fields = ('^respondent__name', '^choice__choice_text', '^choice__question__question_text')
     list_filter = ('answered_at',)
-    
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Au lieu d'un LIKE sur la jointure de trois tables, on cherche d'abord dans les
+        # petites tables (répondants, choix, questions), puis on filtre les réponses par
+        # leurs clés étrangères indexées
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        respondents = Respondent.objects.filter(name__istartswith=search_term).values('pk')
+        questions = Question.objects.filter(question_text__istartswith=search_term).values('pk')
+        choices = Choice.objects.filter(
+            Q(choice_text__istartswith=search_term) | Q(question__in=questions)
+        ).values('pk')
+        return queryset.filter(Q(respondent__in=respondents) | Q(choice__in=choices)), False
+
     def get_question(self, obj):
         return obj.choice.question.question_text
     get_question.short_description = 'Question'
@@ -93,7 +119,18 @@ class QuestionAdmin(TranslationAdmin):
 
 @admin.register(Choice)
 class ChoiceAdmin(TranslationAdmin):
-    list_display = ('choice_text', 'question', 'votes')
+    list_display = ('choice_text', 'question', 'total_votes')
+
+    def get_queryset(self, request):
+        # Inclut les votes encore dans les compteurs partiels
+        return super().get_queryset(request).annotate(
+            pending_votes=Coalesce(Sum('vote_shards__count'), 0)
+        )
+
+    def total_votes(self, obj):
+        return obj.votes + obj.pending_votes
+    total_votes.short_description = 'Votes'
+    total_votes.admin_order_field = 'votes'
 
 
 @admin.register(Interest)
@@ -6,4 +6,5 @@ class MainAppConfig(AppConfig):
     name = 'main_app'
     
     def ready(self):
-        import main_app.signals
\ No newline at end of file
+        import main_app.checks
+        import main_app.signals
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .bulk import delete_rows
+from .models import ArchivedResponse, Response
+
+# Archivage des anciennes réponses : la table Response ne garde que les réponses
+# récentes (RESPONSE_ARCHIVE_AFTER_DAYS), les autres sont déplacées dans
+# ArchivedResponse (clés entières et date, même identifiant). Le déplacement se
+# fait par lots, une transaction par lot, sans signal : compteurs dénormalisés
+# et agrégats ne changent pas, puisque la réponse existe toujours. Les résultats,
+# les exports et les recalculs (counters.py, rollups.py) lisent les deux tables.
+
+
+def archive_cutoff(days=None):
+    return timezone.now() - timedelta(days=settings.RESPONSE_ARCHIVE_AFTER_DAYS if days is None else days)
+
+
+def archive_responses(cutoff=None, question_id=None, chunk_size=1000):
+    # Réponses antérieures à cutoff, ou toutes celles d'un sondage clos (question_id)
+    responses = Response.objects.order_by('pk')
+    if question_id is not None:
+        responses = responses.filter(choice__question_id=question_id)
+    else:
+        responses = responses.filter(answered_at__lt=cutoff or archive_cutoff())
+
+    moved, last_pk = 0, 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                responses.filter(pk__gt=last_pk)
+                .values_list('pk', 'respondent_id', 'choice_id', 'answered_at')[:chunk_size]
+            )
+            if not rows:
+                return moved
+            ArchivedResponse.objects.bulk_create([
+                ArchivedResponse(pk=pk, respondent_id=respondent_id, choice_id=choice_id, answered_at=answered_at)
+                for pk, respondent_id, choice_id, answered_at in rows
+            ])
+            # DELETE direct : pas de post_delete, la réponse reste comptée
+            delete_rows(Response, [row[0] for row in rows], using=router.db_for_write(Response))
+        moved += len(rows)
+        last_pk = rows[-1][0]
@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from main_app.forms import RespondentForm
+from . import fragments, idempotency, live
+from .models import Choice, Question
+from .pagination import CursorPaginator
+from .results import question_results
+from .views import (
+    home_fragment_parts, home_sort, question_form_parts, sort_key_for, submit_respondent_form,
+)
+from .votes import arecord_vote, record_vote
+
+# Versions asynchrones des pages les plus fréquentées (accueil, sondage, vote),
+# servies par le point d'entrée ASGI (voir projet_travail2/asgi.py et ASYNC_VIEWS).
+# Les lectures passent par l'API asynchrone de l'ORM ; ce qui n'existe qu'en
+# synchrone (transactions, validation des formulaires liés à la base, pagination
+# numérotée, rendu des pages d'un utilisateur connecté) passe par sync_to_async.
+
+
+async def _user(request):
+    # Utilisateur résolu une fois : request.user n'est plus chargé paresseusement
+    # (requête synchrone) pendant le rendu des gabarits
+    request.user = await request.auser()
+    return request.user
+
+
+async def _render(request, template_name, context):
+    if request.user.is_authenticated:
+        # base.html parcourt les groupes de l'utilisateur
+        return await sync_to_async(render)(request, template_name, context)
+    return render(request, template_name, context)
+
+
+async def home(request):
+    user = await _user(request)
+    sort_param, sort_order = home_sort(request)
+
+    async def render_polls():
+        if user.is_authenticated:
+            questions = Question.objects.filter(creator=user)
+        else:
+            questions = Question.objects.all()
+
+        if settings.POLL_PAGINATION_MODE == 'pages':
+            order_prefix = '-' if sort_order == 'desc' else ''
+            paginator = Paginator(questions.order_by(f"{order_prefix}{sort_param}"), 6)
+            page_obj = await sync_to_async(paginator.get_page)(request.GET.get('page'))
+            return await sync_to_async(render_to_string)('main_app/_home_polls.html', {
+                'page_obj': page_obj,
+                'current_sort': sort_param,
+                'current_order': sort_order,
+            })
+
+        questions, key = sort_key_for(questions, sort_param)
+        paginator = CursorPaginator(questions, key, 6, descending=sort_order == 'desc')
+        page_obj = await paginator.aget_page(request.GET.get('cursor'))
+        return render_to_string('main_app/_home_polls.html', {
+            'page_obj': page_obj,
+            'current_sort': sort_param,
+            'current_order': sort_order,
+        })
+
+    if user.is_authenticated:
+        polls_html = await render_polls()
+    else:
+        listing_version, = await fragments.aget_versions(fragments.LISTING)
+        polls_html = await fragments.aget_or_render(
+            home_fragment_parts(request, listing_version, sort_param, sort_order), render_polls,
+        )
+
+    return await _render(request, 'main_app/home.html', {
+        'polls_html': mark_safe(polls_html),
+        'current_sort': sort_param,
+        'current_order': sort_order,
+    })
+
+
+async def vote(request, question_id):
+    question = await aget_object_or_404(Question, pk=question_id)
+    if request.method != 'POST':
+        return HttpResponse("Méthode non autorisée", status=405)
+    choice_id = request.POST.get('choice')
+    if not choice_id:
+        return HttpResponse("Vous devez sélectionner une option.", status=400)
+    choice = await aget_object_or_404(Choice.objects.only('pk'), pk=choice_id, question=question)
+    key = idempotency.request_key(request)
+    if key is None:
+        await arecord_vote(choice.pk)
+    elif await idempotency.aclaim(key, 'vote'):
+        # Clé et vote dans une même transaction (API synchrone)
+        await sync_to_async(idempotency.run_once)(key, 'vote', lambda: record_vote(choice.pk))
+    return redirect('home')
+
+
+async def question_detail(request, question_id):
+    question = await aget_object_or_404(Question, pk=question_id)
+    user = await _user(request)
+
+    if user.is_authenticated:
+        return await _render(request, 'main_app/question_detail_admin.html', {
+            'question': question,
+            'results': await sync_to_async(question_results)(question),
+        })
+
+    if request.method == "POST":
+        # Formulaire (catalogues), validation et enregistrement transactionnel : API synchrone
+        def submit():
+            key = idempotency.request_key(request)
+            if not idempotency.claim(key, 'submission'):
+                return None
+            form = RespondentForm(request.POST, request.FILES, question=question)
+            if submit_respondent_form(form, key):
+                return None
+            return render_to_string('main_app/_question_form_fields.html', {'form': form})
+
+        form_html = await sync_to_async(submit)()
+        if form_html is None:
+            return redirect('home')
+    else:
+        question_version, interests_version = await fragments.aget_versions(
+            fragments.question_scope(question.pk), fragments.INTERESTS,
+        )
+
+        def render_form():
+            # Les catalogues du formulaire peuvent nécessiter une lecture (API synchrone)
+            return render_to_string('main_app/_question_form_fields.html', {
+                'form': RespondentForm(question=question),
+            })
+
+        form_html = await fragments.aget_or_render(
+            question_form_parts(question.pk, question_version, interests_version), sync_to_async(render_form),
+        )
+
+    return await _render(request, 'main_app/question_detail.html', {
+        'question': question,
+        'form_html': mark_safe(form_html),
+        'idempotency_key': idempotency.new_key(),
+    })
+
+
+async def results_stream(request, question_id):
+    # Résultats en direct (Server-Sent Events), réservés comme la page de résultats aux utilisateurs connectés
+    question = await aget_object_or_404(Question.objects.only('pk'), pk=question_id)
+    user = await _user(request)
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+    # Flux continu uniquement derrière ASGI (voir live.stream)
+    response = StreamingHttpResponse(
+        live.stream(question.pk, follow=settings.ASYNC_VIEWS), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Pas de mise en tampon par un proxy (nginx) : chaque événement part immédiatement
+    response['X-Accel-Buffering'] = 'no'
+    return response
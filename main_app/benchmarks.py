@@ -0,0 +1,160 @@
+import itertools
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from .models import Choice, Interest, Question, Respondent, Response
+from .search import rebuild_index
+
+# Outils communs aux commandes de mesure (bench_*) : base jetable, jeu de
+# données volumineux inséré en bloc et mesure des temps / requêtes par URL.
+
+
+@contextmanager
+def scratch_database(keep=False):
+    # Base de test créée à côté de la vraie base : les mesures ne touchent jamais db.sqlite3
+    old_name = connection.settings_dict['NAME']
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+        teardown_test_environment()
+
+
+SYLLABLES = ('ba', 'ce', 'di', 'fo', 'gu', 'la', 'me', 'ni', 'po', 'ru', 'sa', 'te', 'vi', 'zo', 'an', 'on', 'ou', 'ré')
+
+
+def vocabulary(size, seed=0):
+    # Mots inventés, du plus fréquent au plus rare (fréquences en 1/rang, comme dans un texte réel)
+    rng = random.Random(seed)
+    words = {}
+    while len(words) < size:
+        words.setdefault(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))), None)
+    return list(words)
+
+
+def _last_pk(model):
+    return model._base_manager.aggregate(last=Max('pk'))['last'] or 0
+
+
+def _new_ids(model, last_pk):
+    # Lignes insérées par cet appel seulement : les données déjà présentes ne sont pas réutilisées
+    return list(model._base_manager.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True))
+
+
+def seed_polls(**options):
+    # Tout ou rien : un échec ne laisse pas de jeu de données à moitié inséré
+    with transaction.atomic():
+        _seed_polls(**options)
+
+
+def _seed_polls(questions=100, choices_per_question=4, respondents=1000, responses=10000,
+                interests=10, users=0, batch_size=5000, seed=0, words=0, index=True):
+    # words > 0 : textes tirés d'un vocabulaire de cette taille (mesures de la recherche)
+    rng = random.Random(seed)
+    last_pks = {model: _last_pk(model) for model in (User, Interest, Question, Choice, Respondent)}
+    now = timezone.now()
+    if words:
+        lexicon = vocabulary(words, seed)
+        weights = list(itertools.accumulate(1 / rank for rank in range(1, words + 1)))
+
+        def text(count):
+            return ' '.join(rng.choices(lexicon, cum_weights=weights, k=count))
+    else:
+        text = None
+
+    # Mot de passe haché une seule fois : le hachage coûte bien plus cher que l'insertion
+    password = make_password('motdepasse')
+    # Numérotés après la plus grande clé (et non le nombre de lignes, qui baisse après une suppression)
+    User.objects.bulk_create(
+        [User(username=f"sondeur{last_pks[User] + 1 + i}", password=password) for i in range(users)],
+        batch_size=batch_size,
+    )
+    user_ids = _new_ids(User, last_pks[User]) if users else [None]
+
+    Interest.objects.bulk_create(
+        [Interest(name=f"Centre d'intérêt {i}") for i in range(interests)], batch_size=batch_size,
+    )
+    for start in range(0, questions, batch_size):
+        Question.objects.bulk_create([
+            Question(
+                question_text=f"{text(6)} ?" if text else f"Question {i} ?",
+                pub_date=now - timezone.timedelta(minutes=i), creator_id=rng.choice(user_ids),
+            )
+            for i in range(start, min(questions, start + batch_size))
+        ])
+    question_ids = _new_ids(Question, last_pks[Question])
+    for start in range(0, len(question_ids), batch_size):
+        Choice.objects.bulk_create([
+            Choice(question_id=question_id, choice_text=text(2) if text else f"Choix {j}")
+            for question_id in question_ids[start:start + batch_size] for j in range(choices_per_question)
+        ])
+    first_respondent = last_pks[Respondent] + 1
+    Respondent.objects.bulk_create(
+        [
+            Respondent(name=f"Répondant {i}", email=f"repondant{i}@example.com", email_key=f"repondant{i}@example.com")
+            for i in range(first_respondent, first_respondent + respondents)
+        ],
+        batch_size=batch_size,
+    )
+
+    interest_ids = _new_ids(Interest, last_pks[Interest])
+    respondent_ids = _new_ids(Respondent, last_pks[Respondent])
+    Through = Respondent.interests.through
+    Through.objects.bulk_create(
+        [
+            Through(respondent_id=respondent_id, interest_id=interest_id)
+            for respondent_id in respondent_ids
+            for interest_id in rng.sample(interest_ids, min(2, len(interest_ids)))
+        ],
+        batch_size=batch_size,
+    )
+
+    choice_ids = _new_ids(Choice, last_pks[Choice])
+    for start in range(0, responses, batch_size):
+        Response.objects.bulk_create([
+            Response(respondent_id=rng.choice(respondent_ids), choice_id=rng.choice(choice_ids))
+            for _ in range(min(batch_size, responses - start))
+        ])
+
+    if index:
+        # bulk_create n'envoie pas les signaux qui tiennent l'index de recherche à jour
+        rebuild_index()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(request, repeat=10, warmup=1):
+    # request : fonction sans argument qui effectue une requête et renvoie la réponse
+    for _ in range(warmup):
+        request()
+    timings, queries, status = [], 0, None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = len(captured)
+        status = getattr(response, 'status_code', None)
+    return {
+        'status': status,
+        'queries': queries,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'max_ms': round(max(timings), 2),
+    }
@@ -0,0 +1,32 @@
+from django.db import connections
+
+# Écritures en bloc en SQL direct, pour l'import, la purge et l'archivage : ni
+# save(), ni pre_save (valeurs auto_now_add gardées telles quelles), ni signal.
+# Seules des API publiques sont utilisées (Field.get_db_prep_save, curseur) :
+# rien ne dépend des méthodes privées de QuerySet/Manager (_insert, _raw_delete).
+
+
+def insert_rows(model, objs, fields, using='default'):
+    # Une requête INSERT ... VALUES (...), (...) : lots bornés par l'appelant (bulk_batch_size)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    params = [field.get_db_prep_save(getattr(obj, field.attname), connection) for obj in objs for field in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES {', '.join([row] * len(objs))}", params,
+        )
+
+
+def delete_rows(model, pks, using='default'):
+    # DELETE par clés primaires, sans collecteur : dépendances à effacer avant
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} IN ({placeholders})",
+            list(pks),
+        )
+        return cursor.rowcount
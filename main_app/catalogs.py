@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+from modeltranslation import settings as mt_settings
+from modeltranslation.utils import build_localized_fieldname, get_language
+
+from . import fragments
+from .models import Choice, Interest
+
+# Catalogues du formulaire de réponse (RespondentForm) gardés en mémoire du
+# processus : liste des centres d'intérêt et choix de chaque question, par langue.
+# Chaque entrée est rangée avec le numéro de version du cache de fragments
+# (fragments.INTERESTS, fragments.question_scope) : une modification incrémente
+# la version et l'entrée est relue. Les versions sont lues dans le cache partagé
+# (settings.CACHES) : une modification faite par un autre worker est vue aussitôt.
+# Seules les colonnes de la langue affichée (et de la langue par défaut, en
+# repli) sont lues.
+
+MAX_ENTRIES = 1000
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+
+def _load(model, field, filters):
+    language = get_language()
+    columns = [build_localized_fieldname(field, language)]
+    if language != mt_settings.DEFAULT_LANGUAGE:
+        columns.append(build_localized_fieldname(field, mt_settings.DEFAULT_LANGUAGE))
+    rows = model.objects.filter(**filters).order_by('pk').values_list('pk', *columns)
+    # Texte traduit vide : repli sur la langue par défaut, comme modeltranslation
+    return tuple((pk, next((label for label in labels if label), '')) for pk, *labels in rows)
+
+
+def _get(scope, loader):
+    version, = fragments.get_versions(scope)
+    key = (scope, get_language())
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == version:
+            _entries.move_to_end(key)
+            return entry[1]
+    items = loader()
+    with _lock:
+        _entries[key] = (version, items)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return items
+
+
+def interest_catalog():
+    return _get(fragments.INTERESTS, lambda: _load(Interest, 'name', {}))
+
+
+def choice_catalog(question_id):
+    return _get(
+        fragments.question_scope(question_id), lambda: _load(Choice, 'choice_text', {'question_id': question_id}),
+    )
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Caches propres à chaque processus : une version incrémentée par un worker
+# n'invalide que ses propres fragments et catalogues
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        "Le cache par défaut est propre au processus : avec plusieurs workers, "
+        "les fragments et catalogues invalidés restent servis par les autres.",
+        hint="Configurer un cache partagé (fichiers, base de données, Redis, Memcached).",
+        id='main_app.W001',
+    )]
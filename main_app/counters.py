@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedResponse, Choice, Question
+
+# Choice.response_count et Question.response_count sont des compteurs dénormalisés :
+# ils évitent le COUNT/GROUP BY sur toute la table Response à chaque affichage.
+# Ils sont mis à jour par les signaux de Response (création/suppression, y compris
+# en cascade) et par ResponseQuerySet.bulk_create. Les réponses archivées
+# (ArchivedResponse) restent comptées.
+
+
+def lock_order(keys):
+    # Ordre stable des mises à jour pour éviter les interblocages entre lots concurrents
+    return sorted(keys)
+
+
+def create_or_increment(model, field, delta, **lookup):
+    # Ligne de compteur absente : création, ou incrément si une autre requête vient de la créer
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **{field: delta})
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**{field: F(field) + delta})
+
+
+def response_added(choice_id, delta=1, question_id=None):
+    Choice.objects.filter(pk=choice_id).update(response_count=F('response_count') + delta)
+    # question_id connu (choix déjà chargé) : mise à jour directe, sans jointure
+    questions = Question.objects.filter(pk=question_id) if question_id else Question.objects.filter(choice__pk=choice_id)
+    questions.update(response_count=F('response_count') + delta)
+
+
+def apply_response_deltas(deltas):
+    deltas = {choice_id: delta for choice_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    choice_questions = dict(Choice.objects.filter(pk__in=deltas).values_list('pk', 'question_id'))
+    question_deltas = defaultdict(int)
+    with transaction.atomic():
+        for choice_id in lock_order(deltas):
+            if choice_id not in choice_questions:
+                continue
+            delta = deltas[choice_id]
+            Choice.objects.filter(pk=choice_id).update(response_count=F('response_count') + delta)
+            question_deltas[choice_questions[choice_id]] += delta
+        for question_id in lock_order(question_deltas):
+            Question.objects.filter(pk=question_id).update(
+                response_count=F('response_count') + question_deltas[question_id]
+            )
+
+
+def _archived_count(lookup):
+    # Sous-requête plutôt que seconde jointure : pas de produit réponses × archives
+    archived = (
+        ArchivedResponse.objects.filter(**{lookup: OuterRef('pk')}).order_by()
+        .values(lookup).annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(archived), 0)
+
+
+def rebuild_response_counts(choice_ids=None, dry_run=False):
+    choices = Choice.objects.all()
+    questions = Question.objects.all()
+    if choice_ids is not None:
+        choices = choices.filter(pk__in=list(choice_ids))
+        questions = questions.filter(pk__in=choices.values('question_id'))
+
+    mismatches = []
+    targets = ((Choice, choices, 'response', 'choice'), (Question, questions, 'choice__response', 'choice__question'))
+    for model, queryset, lookup, archived_lookup in targets:
+        rows = (
+            queryset.order_by()
+            .annotate(actual=Count(lookup) + _archived_count(archived_lookup))
+            .exclude(response_count=F('actual'))
+            .values_list('pk', 'response_count', 'actual')
+        )
+        for pk, stored, actual in rows.iterator(chunk_size=2000):
+            mismatches.append((model._meta.label, pk, stored, actual))
+            if not dry_run:
+                model.objects.filter(pk=pk).update(response_count=actual)
+    return mismatches
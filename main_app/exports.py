@@ -0,0 +1,80 @@
+import csv
+import json
+
+from .models import ArchivedResponse, Respondent, Response
+
+# Export des réponses en flux : les lignes sont lues par paquets avec un
+# itérateur côté serveur et écrites au fur et à mesure, la mémoire utilisée
+# ne dépend donc pas de la taille du sondage. Les réponses archivées (les plus
+# anciennes) sont exportées d'abord, puis les réponses récentes.
+
+EXPORT_COLUMNS = (
+    'response_id', 'answered_at', 'question_id', 'question', 'choice_id', 'choice',
+    'respondent_id', 'respondent_name', 'respondent_email', 'interests',
+)
+
+
+def _interests_by_respondent(respondent_ids):
+    interests = {}
+    rows = (
+        Respondent.interests.through.objects.filter(respondent_id__in=respondent_ids)
+        .order_by('respondent_id', 'interest_id')
+        .values_list('respondent_id', 'interest__name')
+    )
+    for respondent_id, name in rows:
+        interests.setdefault(respondent_id, []).append(name)
+    return interests
+
+
+def _with_interests(chunk):
+    interests = _interests_by_respondent({row[6] for row in chunk})
+    for row in chunk:
+        yield row + (interests.get(row[6], []),)
+
+
+def _rows(model, question_id, chunk_size):
+    responses = model.objects.order_by('pk').values_list(
+        'pk', 'answered_at', 'choice__question_id', 'choice__question__question_text',
+        'choice_id', 'choice__choice_text', 'respondent_id', 'respondent__name', 'respondent__email',
+    )
+    if question_id is not None:
+        responses = responses.filter(choice__question_id=question_id)
+
+    # Les centres d'intérêt sont chargés une fois par paquet, pas une fois par ligne
+    chunk = []
+    for row in responses.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _with_interests(chunk)
+            chunk = []
+    if chunk:
+        yield from _with_interests(chunk)
+
+
+def iter_response_rows(question_id=None, chunk_size=2000):
+    yield from _rows(ArchivedResponse, question_id, chunk_size)
+    yield from _rows(Response, question_id, chunk_size)
+
+
+class _Echo:
+    # Pseudo-fichier : csv.writer renvoie directement la ligne formatée
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row[:-1] + ('|'.join(row[-1]),))
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str, ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
@@ -1,15 +1,18 @@
 from django import forms
 from django.contrib.auth.models import User
+from . import catalogs
 from .models import ContactMessage, Question, Respondent, Choice, Interest
 
 class RespondentForm(forms.ModelForm):
-    choice = forms.ModelChoiceField(
-        queryset=Choice.objects.none(), 
+    # Choix et centres d'intérêt tirés des catalogues en mémoire (main_app/catalogs.py) :
+    # ni l'affichage ni la validation ne relisent ces tables
+    choice = forms.TypedChoiceField(
+        coerce=int,
         widget=forms.Select(attrs={'class': 'form-select'}),
         label="Votre réponse"
     )
-    interests = forms.ModelMultipleChoiceField(
-        queryset=Interest.objects.all(),
+    interests = forms.TypedMultipleChoiceField(
+        coerce=int,
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
         required=False,
         label="Centres d'intérêt"
@@ -31,8 +34,18 @@ class RespondentForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         question = kwargs.pop('question', None)
         super().__init__(*args, **kwargs)
-        if question:
-            self.fields['choice'].queryset = Choice.objects.filter(question=question)
+        self.question = question
+        choices = catalogs.choice_catalog(question.pk) if question else ()
+        self.fields['choice'].choices = [('', '---------'), *choices]
+        self.fields['interests'].choices = catalogs.interest_catalog()
+
+    # Objets non relus : seuls l'id (et la question du choix) sont connus,
+    # les autres champs seraient chargés à la demande
+    def clean_choice(self):
+        return Choice.from_db(None, ['id', 'question_id'], [self.cleaned_data['choice'], self.question.pk])
+
+    def clean_interests(self):
+        return [Interest.from_db(None, ['id'], [pk]) for pk in self.cleaned_data['interests']]
 
 class ContactForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,121 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import stats
+from .routers import replica_reads_allowed
+
+# Cache de fragments HTML rendus (cartes de l'accueil, formulaire d'un sondage).
+# Les clés contiennent des numéros de version incrémentés par les signaux des
+# modèles (voir signals.py) : un changement rend immédiatement obsolètes les
+# fragments concernés, sans attendre l'expiration. Le délai d'expiration ne sert
+# qu'à borner la mémoire utilisée.
+
+LISTING = 'listing'      # liste des sondages (accueil)
+INTERESTS = 'interests'  # catalogue des centres d'intérêt
+
+HITS_KEY = 'poll:stats:fragment_hits'
+MISSES_KEY = 'poll:stats:fragment_misses'
+
+
+def question_scope(question_id):
+    return f'question:{question_id}'
+
+
+def _version_key(scope):
+    return f'poll:version:{scope}'
+
+
+def get_versions(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            # Version initiale unique : une version perdue (éviction) ne peut pas
+            # ressusciter d'anciens fragments encore en cache
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return versions
+
+
+async def aget_versions(*scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = await cache.aget_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            found[key] = await cache.aget(key)
+        versions.append(found[key])
+    return versions
+
+
+def _bump(scope):
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_versions(*scopes):
+    # Après le commit : un rendu concurrent ne peut pas mettre en cache l'ancien état sous la nouvelle version
+    transaction.on_commit(lambda: [_bump(scope) for scope in scopes])
+
+
+def _fragment_key(parts):
+    raw = ':'.join(str(part) for part in parts)
+    return 'poll:fragment:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _timeout():
+    # Rendu lu sur un réplica en retard : il pourrait être stocké sous une version
+    # déjà incrémentée, on ne le garde donc que le temps du retard toléré
+    if replica_reads_allowed():
+        return settings.REPLICA_READ_YOUR_WRITES_SECONDS
+    return settings.FRAGMENT_CACHE_TIMEOUT
+
+
+def get_or_render(parts, render):
+    key = _fragment_key(parts)
+    html = cache.get(key)
+    if html is not None:
+        stats.increment(HITS_KEY)
+        return html
+    stats.increment(MISSES_KEY)
+    html = render()
+    cache.set(key, html, _timeout())
+    return html
+
+
+async def aget_or_render(parts, render):
+    # render : coroutine sans argument (vues asynchrones)
+    key = _fragment_key(parts)
+    html = await cache.aget(key)
+    if html is not None:
+        await stats.aincrement(HITS_KEY)
+        return html
+    await stats.aincrement(MISSES_KEY)
+    html = await render()
+    await cache.aset(key, html, _timeout())
+    return html
+
+
+def get_stats():
+    found = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = found.get(HITS_KEY, 0), found.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
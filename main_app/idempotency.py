@@ -0,0 +1,102 @@
+import re
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import stats
+from .models import IdempotencyKey
+
+# Envois idempotents : chaque formulaire affiché porte une clé unique (champ caché
+# idempotency_key, ou en-tête Idempotency-Key pour les clients de l'API de vote).
+# Un double clic ou une nouvelle tentative après un délai dépassé renvoie la même
+# clé : l'envoi est alors écarté avant toute écriture.
+# 1. cache.add() : vérification atomique et sans requête SQL, qui écarte presque tous les doublons ;
+# 2. table IdempotencyKey (clé unique) : insérée dans la transaction de l'écriture,
+#    elle arrête les doublons passés malgré le cache (cache local à un processus, éviction).
+
+FIELD_NAME = 'idempotency_key'
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+KEY_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+STATS_KEY = 'poll:stats:duplicates:{kind}:{stage}'
+KINDS = ('submission', 'vote')
+STAGES = ('cache', 'database')
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def request_key(request):
+    # Clé absente ou mal formée : envoi traité normalement, sans protection
+    key = request.POST.get(FIELD_NAME) or request.META.get(HEADER, '')
+    return key if KEY_PATTERN.match(key) else None
+
+
+def _cache_key(key):
+    return f'poll:idempotency:{key}'
+
+
+def _stats_key(kind, stage):
+    return STATS_KEY.format(kind=kind, stage=stage)
+
+
+def claim(key, kind):
+    # False : clé déjà vue, l'envoi est un doublon
+    if key is None or cache.add(_cache_key(key), 1, settings.IDEMPOTENCY_KEY_TTL):
+        return True
+    stats.increment(_stats_key(kind, 'cache'))
+    return False
+
+
+async def aclaim(key, kind):
+    if key is None or await cache.aadd(_cache_key(key), 1, settings.IDEMPOTENCY_KEY_TTL):
+        return True
+    await stats.aincrement(_stats_key(kind, 'cache'))
+    return False
+
+
+def release(key):
+    # Envoi refusé (formulaire invalide) : la même clé pourra être renvoyée corrigée
+    if key is not None:
+        cache.delete(_cache_key(key))
+
+
+def run_once(key, kind, write):
+    # Exécute write() dans la même transaction que l'insertion de la clé ;
+    # renvoie False si la clé existait déjà en base
+    if key is None:
+        write()
+        return True
+    try:
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.create(key=key)
+            except IntegrityError:
+                stats.increment(_stats_key(kind, 'database'))
+                return False
+            write()
+    except Exception:
+        release(key)
+        raise
+    return True
+
+
+def get_stats():
+    keys = {(kind, stage): _stats_key(kind, stage) for kind in KINDS for stage in STAGES}
+    found = cache.get_many(keys.values())
+    return {kind: {stage: found.get(keys[kind, stage], 0) for stage in STAGES} for kind in KINDS}
+
+
+def reset_stats():
+    cache.delete_many([_stats_key(kind, stage) for kind in KINDS for stage in STAGES])
+
+
+def prune(older_than=None):
+    # Au-delà de la durée de vie du cache, une clé ne protège plus de rien
+    cutoff = timezone.now() - timezone.timedelta(seconds=older_than or settings.IDEMPOTENCY_KEY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
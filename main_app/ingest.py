@@ -0,0 +1,135 @@
+from django import forms
+from django.db import transaction
+
+from .models import Choice, Interest, Respondent, Response, normalize_email
+
+# Import par lots de réponses collectées hors ligne (bornes, questionnaires papier).
+# Chaque enregistrement : {"name", "email" (facultatif), "choice", "interests" (liste d'id)}.
+# Un lot coûte un nombre fixe de requêtes, quel que soit son nombre d'enregistrements :
+# validation des id en une requête, répondants résolus par email en bloc,
+# réponses insérées avec bulk_create (compteurs mis à jour une fois par lot).
+
+LOOKUP_CHUNK = 500
+
+
+class ResponseRecordForm(forms.Form):
+    name = forms.CharField(max_length=100)
+    email = forms.EmailField(required=False)
+    choice = forms.IntegerField()
+    interests = forms.Field(required=False)
+
+    def __init__(self, *args, choice_ids=(), interest_ids=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.choice_ids = choice_ids
+        self.interest_ids = interest_ids
+
+    def clean_choice(self):
+        choice = self.cleaned_data['choice']
+        if choice not in self.choice_ids:
+            raise forms.ValidationError("Choix inconnu.")
+        return choice
+
+    def clean_interests(self):
+        interests = self.cleaned_data['interests'] or []
+        if not isinstance(interests, list) or not all(isinstance(pk, int) for pk in interests):
+            raise forms.ValidationError("Liste d'identifiants attendue.")
+        unknown = set(interests) - self.interest_ids
+        if unknown:
+            raise forms.ValidationError(f"Centres d'intérêt inconnus : {sorted(unknown)}.")
+        return interests
+
+
+def _ids(records, key):
+    ids = set()
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        value = record.get(key)
+        values = value if isinstance(value, list) else [value]
+        ids.update(v for v in values if isinstance(v, int))
+    return ids
+
+
+def validate_records(records):
+    # Choix d'un sondage supprimé (en attente de purge) : refusés comme inconnus
+    choice_ids = set(
+        Choice.objects.filter(pk__in=_ids(records, 'choice'), question__deleted_at=None).values_list('pk', flat=True)
+    )
+    interest_ids = set(Interest.objects.filter(pk__in=_ids(records, 'interests')).values_list('pk', flat=True))
+
+    valid, errors = [], []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append({'index': index, 'errors': {'__all__': ["Objet JSON attendu."]}})
+            continue
+        form = ResponseRecordForm(record, choice_ids=choice_ids, interest_ids=interest_ids)
+        if form.is_valid():
+            valid.append(form.cleaned_data)
+        else:
+            errors.append({'index': index, 'errors': form.errors.get_json_data()})
+    return valid, errors
+
+
+def _resolve_respondents(records):
+    keys = sorted({normalize_email(record['email']) for record in records if record['email']})
+    by_key = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        for respondent in Respondent.objects.filter(email_key__in=keys[start:start + LOOKUP_CHUNK]).order_by('pk'):
+            by_key.setdefault(respondent.email_key, respondent)
+
+    respondents, new, renamed = [], {}, {}
+    for record in records:
+        key = normalize_email(record['email'])
+        if key is None:
+            respondent = Respondent(name=record['name'])
+            new[id(respondent)] = respondent
+        elif key in by_key:
+            respondent = by_key[key]
+            if respondent.pk is not None and respondent.name != record['name']:
+                renamed[respondent.pk] = respondent
+            respondent.name = record['name']
+        else:
+            # bulk_create n'appelle pas save() : clé renseignée ici
+            respondent = by_key[key] = Respondent(name=record['name'], email=record['email'], email_key=key)
+            new[id(respondent)] = respondent
+        respondents.append(respondent)
+
+    Respondent.objects.bulk_create(new.values(), batch_size=LOOKUP_CHUNK)
+    Respondent.objects.bulk_update(renamed.values(), ['name'], batch_size=LOOKUP_CHUNK)
+    return respondents
+
+
+def _set_interests(records, respondents):
+    # Même comportement que le formulaire : les centres d'intérêt envoyés remplacent les anciens
+    latest = {}
+    for record, respondent in zip(records, respondents):
+        latest[respondent.pk] = record['interests']
+
+    Through = Respondent.interests.through
+    respondent_ids = sorted(latest)
+    for start in range(0, len(respondent_ids), LOOKUP_CHUNK):
+        Through.objects.filter(respondent_id__in=respondent_ids[start:start + LOOKUP_CHUNK]).delete()
+    Through.objects.bulk_create(
+        [
+            Through(respondent_id=respondent_id, interest_id=interest_id)
+            for respondent_id, interests in latest.items()
+            for interest_id in set(interests)
+        ],
+        batch_size=LOOKUP_CHUNK,
+    )
+
+
+def ingest_records(records):
+    valid, errors = validate_records(records)
+    if valid:
+        with transaction.atomic():
+            respondents = _resolve_respondents(valid)
+            _set_interests(valid, respondents)
+            Response.objects.bulk_create(
+                [
+                    Response(respondent=respondent, choice_id=record['choice'])
+                    for record, respondent in zip(valid, respondents)
+                ],
+                batch_size=LOOKUP_CHUNK,
+            )
+    return {'created': len(valid), 'errors': errors}
@@ -0,0 +1,100 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Compteurs de requêtes SQL par alias de base (default, replica1...), pour
+# vérifier la répartition lectures / écritures. Le compteur est branché sur
+# chaque connexion à son ouverture (signal connection_created, voir signals.py).
+# Pendant une requête HTTP échantillonnée (middleware request_metrics_middleware),
+# les requêtes SQL et les rendus de gabarits sont aussi chronométrés.
+
+_lock = threading.Lock()
+_totals = Counter()
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self, keep_slowest=5):
+        self.counts = Counter()
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.keep_slowest = keep_slowest
+        self._slowest = []
+        self._template_depth = 0
+
+    @property
+    def queries(self):
+        return sum(self.counts.values())
+
+    def add_query(self, alias, sql, duration):
+        self.counts[alias] += 1
+        self.db_time += duration
+        if self.keep_slowest:
+            # Tas borné : seules les keep_slowest requêtes les plus lentes sont conservées
+            entry = (duration, alias, sql)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest_queries(self):
+        return sorted(self._slowest, reverse=True)
+
+
+def count_queries(execute, sql, params, many, context):
+    alias = context['connection'].alias
+    with _lock:
+        _totals[alias] += 1
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(alias, sql, time.perf_counter() - start)
+
+
+def install(connection):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def query_counts():
+    with _lock:
+        return dict(_totals)
+
+
+def reset_query_counts():
+    with _lock:
+        _totals.clear()
+
+
+@contextmanager
+def collect_queries(keep_slowest=5):
+    # Mesures propres à un bloc (une requête HTTP par exemple)
+    stats = RequestStats(keep_slowest)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def time_template():
+    # Un gabarit rendu pendant le rendu d'un autre n'est compté qu'une fois
+    stats = _current.get()
+    if stats is None or stats._template_depth:
+        yield
+        return
+    stats._template_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._template_depth -= 1
+        stats.template_time += time.perf_counter() - start
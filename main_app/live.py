@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from .models import Choice
+
+logger = logging.getLogger(__name__)
+
+# Résultats en direct (Server-Sent Events). Tous les abonnés d'un même sondage
+# partagent une seule source par boucle d'événements (une seule par processus
+# sous ASGI) : une tâche asyncio relit les
+# compteurs du sondage (une requête : réponses dénormalisées + votes, compteurs
+# partiels compris) toutes les LIVE_RESULTS_INTERVAL secondes tant qu'il reste
+# au moins un abonné, puis réveille les abonnés. Chaque abonné calcule lui-même
+# ce qui a changé depuis le dernier état qu'il a envoyé : un client lent saute
+# des états intermédiaires sans jamais rater de changement.
+
+
+async def load_tallies(question_id):
+    rows = Choice.objects.filter(question_id=question_id).annotate(
+        pending=Coalesce(Sum('vote_shards__count'), 0)
+    ).values_list('pk', 'response_count', 'votes', 'pending')
+    return {pk: {'responses': responses, 'votes': votes + pending} async for pk, responses, votes, pending in rows}
+
+
+def changes(previous, current):
+    # Choix ajoutés ou modifiés, et choix supprimés (valeur None)
+    changed = {pk: tally for pk, tally in current.items() if previous.get(pk) != tally}
+    changed.update({pk: None for pk in previous.keys() - current.keys()})
+    return changed
+
+
+def event(data, name='tally'):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class Broadcaster:
+    def __init__(self, key, question_id):
+        self.key = key
+        self.question_id = question_id
+        self.subscribers = 0
+        self.tallies = None
+        self.updated = asyncio.Condition()
+        self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                tallies = await load_tallies(self.question_id)
+            except Exception:
+                # Base momentanément indisponible : les abonnés restent connectés
+                logger.exception("Lecture des résultats du sondage %s impossible", self.question_id)
+                tallies = self.tallies
+            if tallies != self.tallies:
+                async with self.updated:
+                    self.tallies = tallies
+                    self.updated.notify_all()
+            await asyncio.sleep(settings.LIVE_RESULTS_INTERVAL)
+
+    async def subscribe(self):
+        # Générateur de couples (état courant, changements) : les premiers changements
+        # forment l'état complet, None signale un battement de cœur (aucun changement pendant LIVE_RESULTS_HEARTBEAT)
+        self.subscribers += 1
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        sent = None
+        try:
+            while True:
+                current = None
+                async with self.updated:
+                    try:
+                        await asyncio.wait_for(
+                            self.updated.wait_for(lambda: self.tallies is not None and self.tallies != sent),
+                            settings.LIVE_RESULTS_HEARTBEAT,
+                        )
+                        current = self.tallies
+                    except asyncio.TimeoutError:
+                        pass
+                if current is None:
+                    yield sent, None
+                    continue
+                yield current, changes(sent or {}, current)
+                sent = current
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers:
+                # Plus personne à l'écoute : la source s'arrête
+                self.task.cancel()
+                _broadcasters.pop(self.key, None)
+
+
+_broadcasters = {}
+
+
+def broadcaster(question_id):
+    # Un seul point d'entrée par sondage et par boucle d'événements : la condition
+    # et la tâche de relecture appartiennent à la boucle qui les a créées
+    key = (asyncio.get_running_loop(), question_id)
+    if key not in _broadcasters:
+        _broadcasters[key] = Broadcaster(key, question_id)
+    return _broadcasters[key]
+
+
+def _tally_event(tallies, changed):
+    total = sum(tally['responses'] for tally in tallies.values())
+    return event({'total': total, 'choices': changed})
+
+
+async def stream(question_id, follow=True):
+    # follow=False (WSGI, où le flux serait lu en entier avant l'envoi) : un seul
+    # état puis fin du flux, le navigateur se reconnecte après LIVE_RESULTS_RETRY_MS.
+    # Pas de source partagée : chaque réponse WSGI a sa propre boucle, fermée à la fin
+    yield f"retry: {settings.LIVE_RESULTS_RETRY_MS}\n\n"
+    if not follow:
+        tallies = await load_tallies(question_id)
+        yield _tally_event(tallies, tallies)
+        return
+    # Déconnexion du client : l'abonnement est fermé tout de suite, pas au ramasse-miettes
+    async with aclosing(broadcaster(question_id).subscribe()) as subscription:
+        async for tallies, changed in subscription:
+            if changed is None:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield ": ping\n\n"
+            else:
+                yield _tally_event(tallies, changed)
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main_app.archive import archive_cutoff, archive_responses
+
+
+class Command(BaseCommand):
+    help = "Déplace par lots les anciennes réponses (ou celles d'un sondage clos) vers la table d'archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            help="Ancienneté des réponses archivées (RESPONSE_ARCHIVE_AFTER_DAYS par défaut)")
+        parser.add_argument('--question', type=int, help="Archiver toutes les réponses de ce sondage")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Réponses déplacées par transaction")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        moved = archive_responses(
+            cutoff=archive_cutoff(options['older_than_days']),
+            question_id=options['question'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{moved} réponse(s) archivée(s) en {time.perf_counter() - start:.1f} s."
+        ))
@@ -0,0 +1,54 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.test import Client
+from django.urls import reverse
+
+from main_app.benchmarks import measure, scratch_database, seed_polls
+from main_app.models import Response
+
+
+class Command(BaseCommand):
+    help = "Mesure les listes de l'admin (répondants, réponses) sur un gros jeu de données jetable"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--respondents', type=int, default=20000)
+        parser.add_argument('--responses', type=int, default=200000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write("Création du jeu de données...")
+            start = time.perf_counter()
+            seed_polls(respondents=options['respondents'], responses=options['responses'])
+            self.stdout.write(f"  {time.perf_counter() - start:.1f} s")
+
+            admin = User.objects.create_superuser('bench', password='bench-pass')
+            client = Client()
+            client.force_login(admin)
+
+            pages = {
+                'répondants': reverse('admin:main_app_respondent_changelist'),
+                'réponses': reverse('admin:main_app_response_changelist'),
+                'réponses, recherche': reverse('admin:main_app_response_changelist') + '?q=Répondant 42',
+            }
+            for label, url in pages.items():
+                self.report(label, measure(lambda: client.get(url), repeat=options['repeat']))
+
+            # Référence : l'ancien chemin (COUNT exact, LIKE '%...%' sur la jointure)
+            term = 'Répondant 42'
+            baseline = Response.objects.filter(
+                Q(respondent__name__icontains=term)
+                | Q(choice__choice_text__icontains=term)
+                | Q(choice__question__question_text__icontains=term)
+            )
+            self.report("référence : COUNT(*) exact", measure(lambda: Response.objects.count(), repeat=options['repeat']))
+            self.report("référence : recherche LIKE", measure(lambda: baseline.count(), repeat=options['repeat']))
+
+    def report(self, label, result):
+        self.stdout.write(
+            f"{label:<30} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+            f"{result['queries']} requête(s)"
+        )
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from main_app.benchmarks import percentile, scratch_database, seed_polls
+from main_app.models import Choice, Question
+
+ENTRYPOINTS = ('wsgi', 'asgi')
+
+
+def request_plan(total):
+    # Accueil, page d'un sondage et vote, en proportions égales
+    question = Question.objects.order_by('pk').first()
+    choice = Choice.objects.filter(question=question).order_by('pk').first()
+    requests = [
+        ('get', reverse('home'), None),
+        ('get', reverse('question_detail', args=[question.pk]), None),
+        ('post', reverse('vote', args=[question.pk]), {'choice': choice.pk}),
+    ]
+    return [requests[i % len(requests)] for i in range(total)]
+
+
+def run_wsgi(plan, concurrency):
+    # Un fil par requête simultanée, comme un serveur WSGI multi-thread
+    local = threading.local()
+
+    def call(item):
+        method, path, data = item
+        client = getattr(local, 'client', None) or Client()
+        local.client = client
+        start = time.perf_counter()
+        response = client.post(path, data) if method == 'post' else client.get(path)
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, plan))
+    connections.close_all()
+    return results
+
+
+def run_asgi(plan, concurrency):
+    # Une seule boucle d'événements, comme un processus ASGI
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(item):
+            method, path, data = item
+            async with semaphore:
+                start = time.perf_counter()
+                response = await (client.post(path, data) if method == 'post' else client.get(path))
+                return (time.perf_counter() - start) * 1000, response.status_code
+
+        return await asyncio.gather(*(call(item) for item in plan))
+
+    return asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = "Compare le débit et la latence (p99) des points d'entrée WSGI et ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entrypoint', choices=ENTRYPOINTS + ('both',), default='both')
+        parser.add_argument('--requests', type=int, default=600)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--respondents', type=int, default=1000)
+        parser.add_argument('--responses', type=int, default=10000)
+        parser.add_argument('--json', action='store_true', help="Résultat brut (utilisé entre processus)")
+
+    def handle(self, *args, **options):
+        if options['entrypoint'] == 'both':
+            for entrypoint in ENTRYPOINTS:
+                self.report(entrypoint, self.run_in_subprocess(entrypoint, options))
+            return
+
+        # Les vues asynchrones sont choisies au chargement des URL : un processus par point d'entrée
+        entrypoint = options['entrypoint']
+        if settings.ASYNC_VIEWS != (entrypoint == 'asgi'):
+            raise CommandError(f"POLL_ASYNC_VIEWS ne correspond pas au point d'entrée {entrypoint}.")
+
+        with scratch_database():
+            seed_polls(
+                questions=options['questions'], respondents=options['respondents'],
+                responses=options['responses'],
+            )
+            plan = request_plan(options['requests'])
+            run = run_asgi if entrypoint == 'asgi' else run_wsgi
+            run(plan[:20], options['concurrency'])  # chauffe (caches, connexions)
+            start = time.perf_counter()
+            results = run(plan, options['concurrency'])
+            elapsed = time.perf_counter() - start
+
+        timings = [timing for timing, _ in results]
+        result = {
+            'requests': len(results),
+            'errors': sum(1 for _, status in results if status >= 400),
+            'throughput_rps': round(len(results) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.50), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'max_ms': round(max(timings), 2),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.report(entrypoint, result)
+
+    def run_in_subprocess(self, entrypoint, options):
+        env = dict(os.environ, POLL_ASYNC_VIEWS='1' if entrypoint == 'asgi' else '0')
+        command = [sys.executable, '-m', 'django', 'bench_entrypoints', '--json', '--entrypoint', entrypoint]
+        for name in ('requests', 'concurrency', 'questions', 'respondents', 'responses'):
+            command += [f'--{name}', str(options[name])]
+        output = subprocess.run(
+            command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def report(self, entrypoint, result):
+        self.stdout.write(
+            f"{entrypoint.upper():<5} {result['throughput_rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+            f"p99 {result['p99_ms']:>8.2f} ms  max {result['max_ms']:>8.2f} ms  "
+            f"{result['errors']}/{result['requests']} erreur(s)"
+        )
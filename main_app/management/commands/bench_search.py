@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.test import override_settings
+
+from main_app.benchmarks import measure, scratch_database, seed_polls, vocabulary
+from main_app.models import Question
+from main_app.search import backend, query_terms, rebuild_index, search
+
+
+def naive_search(query):
+    # Ce que ferait un filtre icontains sur les champs traduits : parcours de toute la table
+    questions = Question.objects.all()
+    for term in query_terms(query):
+        questions = questions.filter(Q(question_text_fr__icontains=term) | Q(question_text_en__icontains=term))
+    return list(questions.order_by('-pub_date')[:10])
+
+
+class Command(BaseCommand):
+    help = "Mesure la recherche plein texte sur un grand nombre de sondages (base jetable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=1_000_000)
+        parser.add_argument('--choices', type=int, default=2, help="Choix par question")
+        parser.add_argument('--words', type=int, default=20000, help="Taille du vocabulaire des textes")
+        parser.add_argument('--backend', choices=('fts5', 'terms'), help="Index mesuré (par défaut : selon la base)")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--no-naive', action='store_true', help="Ne pas mesurer le filtre icontains")
+
+    def handle(self, *args, **options):
+        with override_settings(SEARCH_BACKEND=options['backend']), scratch_database():
+            self.stdout.write(f"Création de {options['questions']} question(s)...")
+            start = time.perf_counter()
+            seed_polls(
+                questions=options['questions'], choices_per_question=options['choices'], respondents=0,
+                responses=0, interests=0, words=options['words'], index=False,
+            )
+            self.stdout.write(f"  {time.perf_counter() - start:.1f} s")
+
+            start = time.perf_counter()
+            rebuild_index()
+            self.stdout.write(f"Indexation ({backend()}) : {time.perf_counter() - start:.1f} s")
+
+            lexicon = vocabulary(options['words'])
+            queries = {
+                'mot fréquent': lexicon[0],
+                'mot rare': lexicon[-1],
+                'deux mots': f"{lexicon[1]} {lexicon[100]}",
+                'préfixe': lexicon[10][:3],
+                'page 5': lexicon[0],
+            }
+            for label, query in queries.items():
+                page = 5 if label == 'page 5' else 1
+                row = measure(lambda: search(query, page), repeat=options['repeat'])
+                line = f"{label:<13} {query!r:<14} index  p50 {row['p50_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms"
+                if not options['no_naive'] and page == 1:
+                    naive = measure(lambda: naive_search(query), repeat=min(options['repeat'], 3), warmup=0)
+                    line += f"  | icontains p50 {naive['p50_ms']:>9.2f} ms"
+                self.stdout.write(line)
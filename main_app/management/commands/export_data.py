@@ -0,0 +1,42 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+
+from main_app.transfer import TRANSFER_FORMATS, iter_records
+
+
+class Command(BaseCommand):
+    help = "Exporte en flux toutes les données (sondages, répondants, utilisateurs, groupes) au format des fixtures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(TRANSFER_FORMATS), default='json',
+                            help="json : tableau lisible par loaddata ; ndjson : un objet par ligne")
+        parser.add_argument('--output', help="Fichier de sortie, compressé si son nom finit par .gz (sortie standard par défaut)")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.count = 0
+        self.start = self.reported = time.perf_counter()
+        lines = TRANSFER_FORMATS[options['format']](self._counted(iter_records(options['chunk_size'])))
+
+        path = options['output']
+        if path:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'wt', encoding='utf-8') as output:
+                for line in lines:
+                    output.write(line)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
+        elapsed = time.perf_counter() - self.start
+        self.stderr.write(f"{self.count} objet(s) exporté(s) en {elapsed:.1f} s ({self.count / max(elapsed, 1e-6):.0f} objets/s).")
+
+    def _counted(self, records):
+        for record in records:
+            self.count += 1
+            now = time.perf_counter()
+            if now - self.reported >= 1:
+                self.reported = now
+                self.stderr.write(f"  {record['model']} : {self.count} objet(s) ({self.count / (now - self.start):.0f} objets/s)")
+            yield record
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from main_app.exports import EXPORT_FORMATS, iter_response_rows
+
+
+class Command(BaseCommand):
+    help = "Exporte les réponses (avec répondant, choix, question et centres d'intérêt) en flux"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question', type=int, help="Limiter à une question")
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help="Fichier de sortie (sortie standard par défaut)")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        serialize, _ = EXPORT_FORMATS[options['format']]
+        self.count = 0
+        lines = serialize(self._counted(iter_response_rows(options['question'], options['chunk_size'])))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                for line in lines:
+                    output.write(line)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
+        self.stderr.write(f"{self.count} réponse(s) exportée(s).")
+
+    def _counted(self, rows):
+        for row in rows:
+            self.count += 1
+            yield row
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main_app.votes import flush_votes
+
+
+class Command(BaseCommand):
+    help = "Reporte les compteurs partiels de votes dans Choice.votes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        flushed = flush_votes(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{flushed} vote(s) reporté(s)."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from main_app import fragments
+
+
+class Command(BaseCommand):
+    help = "Affiche les succès et échecs du cache de fragments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Remet les compteurs à zéro")
+
+    def handle(self, *args, **options):
+        stats = fragments.get_stats()
+        self.stdout.write(
+            f"Succès : {stats['hits']}  Échecs : {stats['misses']}  "
+            f"Taux de succès : {stats['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            fragments.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Compteurs remis à zéro."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from main_app import idempotency
+
+
+class Command(BaseCommand):
+    help = "Affiche les doublons écartés (réponses, votes) et purge les clés d'envoi expirées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Remet les compteurs à zéro")
+        parser.add_argument(
+            '--prune', action='store_true', help="Supprime les clés plus anciennes que IDEMPOTENCY_KEY_TTL",
+        )
+
+    def handle(self, *args, **options):
+        for kind, stages in idempotency.get_stats().items():
+            self.stdout.write(
+                f"{kind:<11} doublons écartés : {stages['cache']} par le cache, {stages['database']} par la base"
+            )
+        if options['reset']:
+            idempotency.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Compteurs remis à zéro."))
+        if options['prune']:
+            self.stdout.write(self.style.SUCCESS(f"{idempotency.prune()} clé(s) expirée(s) supprimée(s)."))
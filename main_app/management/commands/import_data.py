@@ -0,0 +1,58 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from main_app.transfer import import_records, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe en flux un export de export_data ou une fixture (remplace loaddata pour les gros volumes) : "
+        "insertion par lots sans signaux, puis recalcul des compteurs, agrégats et index de recherche"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .json (tableau) ou .ndjson/.jsonl (un objet par ligne), éventuellement .gz ; - pour l'entrée standard")
+        parser.add_argument('--format', choices=['json', 'ndjson'], help="Format du fichier (déduit de l'extension par défaut)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Nombre d'objets insérés par requête")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        name = path[:-3] if path.endswith('.gz') else path
+        format = options['format'] or ('ndjson' if name.endswith(('.ndjson', '.jsonl')) else 'json')
+        self.start = self.reported = time.perf_counter()
+        try:
+            if path == '-':
+                counts, skipped = self._import(sys.stdin, format, options['batch_size'])
+            else:
+                opener = gzip.open if path.endswith('.gz') else open
+                with opener(path, 'rt', encoding='utf-8') as source:
+                    counts, skipped = self._import(source, format, options['batch_size'])
+        except (OSError, ValueError, IntegrityError) as exc:
+            raise CommandError(f"Import de {path} impossible (rien n'a été enregistré) : {exc}")
+
+        for label, count in counts.items():
+            self.stdout.write(f"  {label} : {count}")
+        for label, count in sorted(skipped.items()):
+            self.stdout.write(f"  {label} : {count} ignoré(s)")
+        total = sum(counts.values())
+        elapsed = time.perf_counter() - self.start
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} objet(s) importé(s) en {elapsed:.1f} s ({total / max(elapsed, 1e-6):.0f} objets/s)."
+        ))
+
+    def _import(self, source, format, batch_size):
+        return import_records(read_records(source, format), batch_size=batch_size, progress=self._progress)
+
+    def _progress(self, model, counts):
+        now = time.perf_counter()
+        if now - self.reported >= 1:
+            self.reported = now
+            total = sum(counts.values())
+            self.stderr.write(
+                f"  {model._meta.label_lower} : {counts[model._meta.label_lower]} objet(s), "
+                f"{total} au total ({total / (now - self.start):.0f} objets/s)"
+            )
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.ingest import ingest_records
+
+
+class Command(BaseCommand):
+    help = "Importe par lots des réponses collectées hors ligne (JSON ou NDJSON)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .json (liste d'enregistrements) ou .ndjson (un par ligne)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = failed = 0
+        for offset, batch in self._batches(options['path'], options['batch_size']):
+            result = ingest_records(batch)
+            created += result['created']
+            failed += len(result['errors'])
+            for error in result['errors']:
+                self.stderr.write(f"Enregistrement {offset + error['index']} : {json.dumps(error['errors'], ensure_ascii=False)}")
+
+        self.stdout.write(self.style.SUCCESS(f"{created} réponse(s) importée(s), {failed} rejetée(s)."))
+
+    def _records(self, path):
+        try:
+            with open(path, encoding='utf-8') as source:
+                if path.endswith(('.ndjson', '.jsonl')):
+                    for line in source:
+                        if line.strip():
+                            yield json.loads(line)
+                else:
+                    records = json.load(source)
+                    if isinstance(records, dict):
+                        records = records.get('records')
+                    if not isinstance(records, list):
+                        raise CommandError("Liste d'enregistrements attendue.")
+                    yield from records
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Lecture de {path} impossible : {exc}")
+
+    def _batches(self, path, batch_size):
+        batch, offset = [], 0
+        for record in self._records(path):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield offset, batch
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield offset, batch
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main_app.media import process_deletions
+
+
+class Command(BaseCommand):
+    help = "Supprime par lots les fichiers média en attente de suppression"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        deleted, failed = process_deletions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} fichier(s) supprimé(s), {failed} échec(s)."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main_app.media import process_images
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures des photos de répondants et nettoie les originaux"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        processed, failed = process_images(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{processed} image(s) traitée(s), {failed} illisible(s)."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.counters import rebuild_response_counts
+
+
+class Command(BaseCommand):
+    help = "Vérifie et reconstruit les compteurs de réponses des questions et des choix"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Vérifie seulement : code de sortie non nul si un compteur est faux",
+        )
+
+    def handle(self, *args, **options):
+        mismatches = rebuild_response_counts(dry_run=options['check'])
+        for label, pk, stored, actual in mismatches:
+            self.stdout.write(f"{label} #{pk} : {stored} enregistré, {actual} réel")
+
+        if options['check'] and mismatches:
+            raise CommandError(f"{len(mismatches)} compteur(s) incorrect(s).")
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS("Tous les compteurs sont corrects."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} compteur(s) corrigé(s)."))
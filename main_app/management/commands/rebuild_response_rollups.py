@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Vérifie et reconstruit les agrégats horaires et quotidiens des réponses, par lots de choix"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Vérifie seulement : code de sortie non nul si un agrégat est faux",
+        )
+        parser.add_argument('--chunk-size', type=int, default=100, help="Nombre de choix traités par transaction")
+
+    def handle(self, *args, **options):
+        mismatches = rebuild_rollups(chunk_size=options['chunk_size'], dry_run=options['check'])
+        for choice_id, period, bucket, stored, actual in mismatches:
+            self.stdout.write(f"Choix #{choice_id} {period} {bucket:%Y-%m-%d %H:%M} : {stored} enregistré, {actual} réel")
+
+        if options['check'] and mismatches:
+            raise CommandError(f"{len(mismatches)} agrégat(s) incorrect(s).")
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS("Tous les agrégats sont corrects."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} agrégat(s) corrigé(s)."))
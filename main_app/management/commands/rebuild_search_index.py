@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main_app.search import backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des sondages (après un import en bloc)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Nombre de questions indexées par lot")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        indexed = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{indexed} question(s) indexée(s) ({backend()}) en {time.perf_counter() - start:.1f} s."
+        ))
@@ -0,0 +1,185 @@
+import json
+import subprocess
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from main_app import urls as app_urls
+from main_app.benchmarks import measure, scratch_database
+from main_app.models import Choice, Question
+
+from .seed_data import add_volume_arguments, seed_from_options
+
+# Requêtes mesurées pour chaque URL de main_app/urls.py :
+# nom de l'URL -> [(client, méthode, paramètres GET ou données POST)]
+ROUTES = {
+    'home': [('anonyme', 'get', None), ('créateur', 'get', None)],
+    'about': [('anonyme', 'get', None)],
+    'contact': [('anonyme', 'get', None)],
+    'question_detail': [('anonyme', 'get', None), ('anonyme', 'post', 'submission'), ('créateur', 'get', None)],
+    'question_responses': [('créateur', 'get', None)],
+    'question_timeseries': [('créateur', 'get', None), ('créateur', 'get', {'period': 'hour'})],
+    'export_responses': [('créateur', 'get', None)],
+    'ingest_responses': [('admin', 'post', 'batch')],
+    'search': [('anonyme', 'get', {'q': 'question'}), ('anonyme', 'get', {'q': 'choix 1'})],
+    'respondents': [('anonyme', 'get', None), ('anonyme', 'get', {'all': 1})],
+    'vote': [('anonyme', 'post', 'vote')],
+    'login': [('anonyme', 'get', None)],
+    'logout': [('anonyme', 'post', None)],
+    'register': [('anonyme', 'get', None)],
+    'question_list': [('créateur', 'get', None)],
+    'create_question': [('créateur', 'get', None)],
+    'edit_question': [('créateur', 'get', None)],
+    'add_choice': [('créateur', 'get', None)],
+    'account': [('créateur', 'get', None)],
+    'delete_users': [('admin', 'get', None)],
+}
+# Vues non mesurées : la suppression (POST du créateur pour un sondage, GET pour un
+# choix) retire l'objet mesuré dès la première répétition, ou réponse sans fin
+SKIPPED = {
+    'delete_question': "supprime le sondage (POST du créateur)",
+    'delete_choice': "supprime le choix",
+    'results_stream': "flux continu (Server-Sent Events)",
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def consume(response):
+    # Réponses en flux : le temps mesuré inclut la génération du contenu
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+class Command(BaseCommand):
+    help = "Mesure chaque URL de l'application sur un jeu de données volumineux (base jetable)"
+
+    def add_arguments(self, parser):
+        add_volume_arguments(parser)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--output', help="Fichier JSON où enregistrer les résultats")
+        parser.add_argument('--compare', help="Résultats JSON d'une exécution précédente")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = {self.key(row): row for row in json.load(f)['results']}
+
+        with scratch_database():
+            self.stdout.write("Création du jeu de données...")
+            start = time.perf_counter()
+            seed_from_options(options)
+            self.stdout.write(f"  {time.perf_counter() - start:.1f} s")
+            results = self.run_routes(options['repeat'])
+
+        for row in results:
+            self.report(row, baseline.get(self.key(row)) if baseline else None)
+
+        if options['output']:
+            volumes = ('users', 'questions', 'choices', 'respondents', 'interests', 'responses')
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'revision': git_revision(),
+                    'date': timezone.now().isoformat(),
+                    'volumes': {name: options[name] for name in volumes},
+                    'repeat': options['repeat'],
+                    'results': results,
+                }, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Résultats enregistrés dans {options['output']}"))
+
+    def clients(self, question):
+        admin = User.objects.create_superuser('bench-admin', password='motdepasse')
+        admin.groups.add(Group.objects.get_or_create(name='admin')[0])
+        clients = {'anonyme': Client(), 'créateur': Client(), 'admin': Client()}
+        clients['créateur'].force_login(question.creator)
+        clients['admin'].force_login(admin)
+        return clients
+
+    def payloads(self, question):
+        choice = Choice.objects.filter(question=question).order_by('pk').first()
+        return {
+            'vote': {'choice': choice.pk},
+            'submission': {'name': "Répondant mesuré", 'email': "mesure@example.com", 'choice': choice.pk},
+            'batch': json.dumps([
+                {'name': f"Import {i}", 'email': f"import{i}@example.com", 'choice': choice.pk}
+                for i in range(100)
+            ]),
+        }
+
+    def run_routes(self, repeat):
+        # Sondage de référence : le plus répondu parmi ceux qui ont un créateur
+        question = Question.objects.exclude(creator=None).order_by('-response_count').first()
+        if question is None:
+            raise CommandError("Le jeu de données doit contenir au moins un utilisateur et une question.")
+        clients = self.clients(question)
+        payloads = self.payloads(question)
+
+        results = []
+        for pattern in app_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            if pattern.name in SKIPPED:
+                self.stdout.write(f"{pattern.name:<20} ignorée : {SKIPPED[pattern.name]}")
+                continue
+            if pattern.name not in ROUTES:
+                self.stderr.write(f"{pattern.name:<20} non mesurée : ajouter la route à ROUTES")
+                continue
+
+            kwargs = {name: question.pk for name in pattern.pattern.converters}
+            path = reverse(pattern.name, kwargs=kwargs)
+            for client_name, method, data in ROUTES[pattern.name]:
+                request = self.make_request(clients[client_name], method, path, data, payloads)
+                row = {
+                    'url': pattern.name,
+                    'path': path,
+                    'query': data if isinstance(data, dict) else {},
+                    'method': method.upper(),
+                    'client': client_name,
+                }
+                row.update(measure(request, repeat=repeat))
+                results.append(row)
+        return results
+
+    def make_request(self, client, method, path, data, payloads):
+        if method == 'get':
+            return lambda: consume(client.get(path, data))
+        if data == 'batch':
+            return lambda: client.post(path, payloads[data], content_type='application/json')
+        return lambda: client.post(path, payloads.get(data))
+
+    def key(self, row):
+        # Les identifiants dans les chemins changent d'un jeu de données à l'autre
+        return (row['url'], row['method'], row['client'], json.dumps(row['query'], sort_keys=True))
+
+    def label(self, row):
+        return row['url'] + (f"?{urlencode(row['query'])}" if row['query'] else '')
+
+    def report(self, row, previous):
+        line = (
+            f"{row['method']:<4} {self.label(row):<22} {row['client']:<9} {row['status']} "
+            f"p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms  "
+            f"{row['queries']:>3} requête(s)"
+        )
+        if previous:
+            line += (
+                f"  [p50 {row['p50_ms'] - previous['p50_ms']:+.2f} ms, "
+                f"{row['queries'] - previous['queries']:+d} requête(s)]"
+            )
+        self.stdout.write(line)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main_app.purge import run_purge_jobs
+
+
+class Command(BaseCommand):
+    help = "Efface par lots les sondages et utilisateurs dont la suppression a été demandée"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help="Lignes effacées par transaction (PURGE_CHUNK_SIZE par défaut)")
+
+    def handle(self, *args, **options):
+        finished, failed = run_purge_jobs(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{finished} purge(s) terminée(s), {failed} interrompue(s)."))
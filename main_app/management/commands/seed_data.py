@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main_app.benchmarks import seed_polls
+
+
+def add_volume_arguments(parser):
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--questions', type=int, default=1000)
+    parser.add_argument('--choices', type=int, default=4, help="Choix par question")
+    parser.add_argument('--respondents', type=int, default=20000)
+    parser.add_argument('--interests', type=int, default=20)
+    parser.add_argument('--responses', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0, help="Graine aléatoire (jeu reproductible)")
+
+
+def seed_from_options(options):
+    seed_polls(
+        users=options['users'], questions=options['questions'], choices_per_question=options['choices'],
+        respondents=options['respondents'], interests=options['interests'], responses=options['responses'],
+        batch_size=options['batch_size'], seed=options['seed'],
+    )
+
+
+class Command(BaseCommand):
+    help = "Ajoute un jeu de données volumineux (insertions en bloc) dans la base configurée"
+
+    def add_arguments(self, parser):
+        add_volume_arguments(parser)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        seed_from_options(options)
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['users']} utilisateur(s), {options['questions']} question(s), "
+            f"{options['respondents']} répondant(s), {options['responses']} réponse(s) "
+            f"ajoutés en {time.perf_counter() - start:.1f} s."
+        ))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from main_app.media import RESPONDENT_DIR, sweep_orphans
+
+
+class Command(BaseCommand):
+    help = "Met en file de suppression les images de répondants qui ne sont plus référencées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default=RESPONDENT_DIR)
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help="Ignorer les fichiers plus récents (envois en cours)",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Lister sans rien planifier")
+
+    def handle(self, *args, **options):
+        orphans = sweep_orphans(
+            directory=options['directory'],
+            grace=timedelta(minutes=options['grace_minutes']),
+            dry_run=options['dry_run'],
+        )
+        for name in orphans:
+            self.stdout.write(name)
+        action = "trouvé(s)" if options['dry_run'] else "mis en file de suppression"
+        self.stdout.write(self.style.SUCCESS(f"{len(orphans)} fichier(s) orphelin(s) {action}."))
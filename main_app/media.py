@@ -0,0 +1,208 @@
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import FAILED_MARK, MediaDeletion, Respondent
+
+logger = logging.getLogger(__name__)
+
+# Suppression différée des fichiers média. Les signaux n'effacent plus rien sur
+# le disque pendant la requête : ils enregistrent le fichier dans la table
+# MediaDeletion, dans la même transaction que la suppression/modification de la
+# ligne (annulée avec elle en cas d'erreur). La commande process_media_deletions
+# vide la file par lots ; sweep_media_orphans rattrape les fichiers qui ne sont
+# plus référencés par aucune ligne.
+
+MAX_ATTEMPTS = 5
+RESPONDENT_DIR = 'respondents'
+DERIVATIVES_DIR = 'respondents/derivatives'
+
+# Miniatures WebP précalculées : (largeur, hauteur, recadrage carré)
+IMAGE_VARIANTS = {
+    'small': (96, 96, True),     # listes (affichée en 50 px)
+    'medium': (600, 600, False),  # aperçu (affiché en 300 px)
+}
+
+
+def variant_name(name, variant):
+    # respondents/photo.jpg -> respondents/derivatives/photo.jpg_small.webp
+    return f"{DERIVATIVES_DIR}/{name.rsplit('/', 1)[-1]}_{variant}.webp"
+
+
+def image_files(name):
+    # L'original et toutes ses miniatures
+    return [name] + [variant_name(name, variant) for variant in IMAGE_VARIANTS] if name else []
+
+
+def image_variant_url(respondent, variant, storage=default_storage):
+    name = image_name(respondent.image)
+    if not name:
+        return ''
+    # Miniatures pas encore générées : on sert l'original
+    if respondent.processed_image != name:
+        return storage.url(name)
+    return storage.url(variant_name(name, variant))
+
+
+def _replace(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def build_derivatives(name, storage=default_storage):
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original_format = original.format
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    # Original réécrit sans métadonnées (EXIF, GPS...) et ramené à la taille maximale
+    max_size = settings.RESPONDENT_IMAGE_MAX_SIZE
+    image.thumbnail((max_size, max_size))
+    clean = Image.new(image.mode, image.size)
+    clean.paste(image)
+    if original_format == 'JPEG' and clean.mode == 'RGBA':
+        clean = clean.convert('RGB')
+    content = _encode(clean, original_format or 'PNG')
+    with storage.open(name, 'wb') as target:
+        target.write(content)
+
+    for variant, (width, height, crop) in IMAGE_VARIANTS.items():
+        if crop:
+            derivative = ImageOps.fit(clean, (width, height))
+        else:
+            derivative = clean.copy()
+            derivative.thumbnail((width, height))
+        _replace(storage, variant_name(name, variant), _encode(derivative, 'WEBP'))
+
+
+def process_images(batch_size=50, storage=default_storage):
+    processed = failed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Respondent.objects.filter(pk__gt=last_pk)
+            .exclude(image='').exclude(image__isnull=True)
+            .exclude(processed_image=F('image'))
+            .exclude(processed_image=Concat(Value(FAILED_MARK), F('image')))
+            .order_by('pk').values_list('pk', 'image')[:batch_size]
+        )
+        if not batch:
+            return processed, failed
+        last_pk = batch[-1][0]
+
+        for pk, name in batch:
+            try:
+                build_derivatives(name, storage)
+            except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+                # Fichier illisible : marqué pour ne pas y revenir, les pages servent l'original
+                logger.warning("Miniatures impossibles pour %s : %s", name, exc)
+                failed += 1
+                mark = FAILED_MARK + name
+            else:
+                processed += 1
+                mark = name
+            # Ne rien marquer si l'image a été remplacée entre-temps
+            Respondent.objects.filter(pk=pk, image=name).update(processed_image=mark)
+
+
+def schedule_deletion(*names):
+    names = [name for name in names if name]
+    if names:
+        MediaDeletion.objects.bulk_create([MediaDeletion(name=name) for name in names])
+
+
+def _referenced(names):
+    # Un fichier de nouveau référencé (annulation, réimport) ne doit pas être effacé
+    return set(Respondent.objects.filter(image__in=names).values_list('image', flat=True))
+
+
+def process_deletions(batch_size=100, storage=default_storage):
+    deleted = failed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            MediaDeletion.objects.filter(pk__gt=last_pk, attempts__lt=MAX_ATTEMPTS).order_by('pk')[:batch_size]
+        )
+        if not batch:
+            return deleted, failed
+        last_pk = batch[-1].pk
+
+        referenced = _referenced([entry.name for entry in batch])
+        done, errors = [], []
+        for entry in batch:
+            if entry.name in referenced:
+                done.append(entry.pk)
+                continue
+            try:
+                storage.delete(entry.name)
+            except OSError as exc:
+                entry.attempts += 1
+                entry.last_error = str(exc)
+                errors.append(entry)
+            else:
+                done.append(entry.pk)
+                deleted += 1
+
+        MediaDeletion.objects.filter(pk__in=done).delete()
+        MediaDeletion.objects.bulk_update(errors, ['attempts', 'last_error'])
+        failed += len(errors)
+
+
+def _list_files(storage, directory):
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [f"{directory}/{name}" for name in files]
+
+
+def sweep_orphans(directory=RESPONDENT_DIR, grace=timedelta(hours=1), chunk_size=500,
+                  dry_run=False, storage=default_storage):
+    # Les fichiers récents sont ignorés : l'envoi peut précéder l'enregistrement de la ligne
+    cutoff = timezone.now() - grace
+    # Une miniature est orpheline si son original n'est plus référencé
+    sources = {name: name for name in _list_files(storage, directory)}
+    if directory == RESPONDENT_DIR:
+        for name in _list_files(storage, DERIVATIVES_DIR):
+            source = name.rsplit('/', 1)[-1].rsplit('_', 1)[0]
+            sources[name] = f"{RESPONDENT_DIR}/{source}"
+
+    files = sorted(sources)
+    orphans = []
+    for start in range(0, len(files), chunk_size):
+        chunk = files[start:start + chunk_size]
+        referenced = _referenced({sources[name] for name in chunk})
+        pending = set(MediaDeletion.objects.filter(name__in=chunk).values_list('name', flat=True))
+        for name in chunk:
+            if sources[name] in referenced or name in pending:
+                continue
+            if storage.get_modified_time(name) < cutoff:
+                orphans.append(name)
+
+    if not dry_run:
+        for start in range(0, len(orphans), chunk_size):
+            schedule_deletion(*orphans[start:start + chunk_size])
+    return orphans
+
+
+def image_name(value):
+    # Nom enregistré d'un ImageField, que la valeur soit un FieldFile ou une chaîne
+    return getattr(value, 'name', value) or ''
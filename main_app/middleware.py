@@ -0,0 +1,129 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .instrumentation import collect_queries
+from .routers import allow_replica_reads, reset_replica_reads
+
+logger = logging.getLogger('main_app.requests')
+
+# Cookie posé après une écriture : tant qu'il est présent, le client lit sur la base principale
+PRIMARY_COOKIE = 'poll_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _use_replica(request):
+    if request.method not in SAFE_METHODS:
+        return False
+    try:
+        return float(request.COOKIES.get(PRIMARY_COOKIE, 0)) < time.time()
+    except ValueError:
+        return True
+
+
+def _pin_primary(request, response):
+    if request.method not in SAFE_METHODS:
+        window = settings.REPLICA_READ_YOUR_WRITES_SECONDS
+        response.set_cookie(
+            PRIMARY_COOKIE, str(time.time() + window), max_age=window, httponly=True, samesite='Lax',
+        )
+    return response
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = allow_replica_reads(_use_replica(request))
+            try:
+                response = await get_response(request)
+            finally:
+                reset_replica_reads(token)
+            return _pin_primary(request, response)
+    else:
+        def middleware(request):
+            token = allow_replica_reads(_use_replica(request))
+            try:
+                response = get_response(request)
+            finally:
+                reset_replica_reads(token)
+            return _pin_primary(request, response)
+    return middleware
+
+
+# Mesures par requête : nombre de requêtes SQL (par alias), temps passé en base,
+# temps de rendu des gabarits et temps total. Seule une fraction des requêtes
+# (REQUEST_METRICS_SAMPLE_RATE) est instrumentée en détail ; le temps total est
+# toujours mesuré, pour signaler toute requête lente.
+
+def _sampled():
+    rate = settings.REQUEST_METRICS_SAMPLE_RATE
+    return rate >= 1 or random.random() < rate
+
+
+def _report(request, response, total, stats):
+    metrics = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+    }
+    if stats is not None:
+        metrics.update({
+            'queries': stats.queries,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'template_ms': round(stats.template_time * 1000, 2),
+            'aliases': dict(stats.counts),
+        })
+        desc = ' '.join([f'{stats.queries} queries'] + [
+            f'{alias}={count}' for alias, count in sorted(stats.counts.items())
+        ])
+        response['Server-Timing'] = (
+            f'db;dur={metrics["db_ms"]};desc="{desc}", '
+            f'tpl;dur={metrics["template_ms"]}, total;dur={metrics["total_ms"]}'
+        )
+
+    line = ' '.join(f'{key}={value}' for key, value in metrics.items() if key != 'aliases')
+    slow = metrics['total_ms'] >= settings.REQUEST_METRICS_SLOW_MS or (
+        stats is not None and stats.queries >= settings.REQUEST_METRICS_MAX_QUERIES
+    )
+    if not slow:
+        logger.info(line, extra={'metrics': metrics})
+        return response
+
+    slowest = stats.slowest_queries() if stats is not None else []
+    metrics['slowest_queries'] = [
+        {'ms': round(duration * 1000, 2), 'alias': alias, 'sql': sql[:1000]} for duration, alias, sql in slowest
+    ]
+    details = ''.join(
+        f"\n  {query['ms']} ms [{query['alias']}] {query['sql']}" for query in metrics['slowest_queries']
+    )
+    logger.warning("Requête lente : %s%s", line, details, extra={'metrics': metrics})
+    return response
+
+
+@sync_and_async_middleware
+def request_metrics_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            start = time.perf_counter()
+            if not _sampled():
+                response = await get_response(request)
+                return _report(request, response, time.perf_counter() - start, None)
+            with collect_queries(settings.REQUEST_METRICS_SLOWEST_QUERIES) as stats:
+                response = await get_response(request)
+            return _report(request, response, time.perf_counter() - start, stats)
+    else:
+        def middleware(request):
+            start = time.perf_counter()
+            if not _sampled():
+                response = get_response(request)
+                return _report(request, response, time.perf_counter() - start, None)
+            with collect_queries(settings.REQUEST_METRICS_SLOWEST_QUERIES) as stats:
+                response = get_response(request)
+            return _report(request, response, time.perf_counter() - start, stats)
+    return middleware
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0011_remove_contactmessage_message_en_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vote_shards', to='main_app.choice')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('choice', 'shard'), name='unique_vote_shard')],
+            },
+        ),
+    ]
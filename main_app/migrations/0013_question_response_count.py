@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:51
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_response_counts(apps, schema_editor):
+    Choice = apps.get_model('main_app', 'Choice')
+    Question = apps.get_model('main_app', 'Question')
+    Response = apps.get_model('main_app', 'Response')
+
+    choice_counts = (
+        Response.objects.filter(choice=OuterRef('pk')).order_by()
+        .values('choice').annotate(n=Count('pk')).values('n')
+    )
+    Choice.objects.update(response_count=Coalesce(Subquery(choice_counts), 0))
+
+    question_counts = (
+        Response.objects.filter(choice__question=OuterRef('pk')).order_by()
+        .values('choice__question').annotate(n=Count('pk')).values('n')
+    )
+    Question.objects.update(response_count=Coalesce(Subquery(question_counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0012_voteshard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='choice',
+            name='response_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='response_count',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_response_counts, migrations.RunPython.noop),
+    ]
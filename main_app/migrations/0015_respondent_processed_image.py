@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0014_mediadeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respondent',
+            name='processed_image',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
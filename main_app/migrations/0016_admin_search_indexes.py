@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# Index pour la recherche par préfixe insensible à la casse de l'admin
+# (istartswith). La forme de l'index dépend de la base : SQLite n'utilise un
+# index pour LIKE que s'il est en COLLATE NOCASE, PostgreSQL a besoin d'un index
+# sur UPPER(...) en varchar_pattern_ops, MySQL utilise directement un index simple.
+SEARCH_COLUMNS = [
+    ('main_app_respondent', 'name'),
+    ('main_app_choice', 'choice_text_fr'),
+    ('main_app_choice', 'choice_text_en'),
+    ('main_app_question', 'question_text_fr'),
+    ('main_app_question', 'question_text_en'),
+]
+
+
+def _index_name(table, column):
+    return f"{table}_{column}_search_idx"
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    for table, column in SEARCH_COLUMNS:
+        if vendor == 'sqlite':
+            expression = f"{quote(column)} COLLATE NOCASE"
+        elif vendor == 'postgresql':
+            expression = f"(UPPER({quote(column)}::text)) varchar_pattern_ops"
+        else:
+            expression = quote(column)
+        schema_editor.execute(
+            f"CREATE INDEX {quote(_index_name(table, column))} ON {quote(table)} ({expression})"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    quote = schema_editor.quote_name
+    connection = schema_editor.connection
+    for table, column in SEARCH_COLUMNS:
+        with connection.cursor() as cursor:
+            existing = connection.introspection.get_constraints(cursor, table)
+        # Index perdu si la table a été reconstruite (modification de champ sous SQLite)
+        if _index_name(table, column) not in existing:
+            continue
+        if connection.vendor == 'mysql':
+            schema_editor.execute(f"DROP INDEX {quote(_index_name(table, column))} ON {quote(table)}")
+        else:
+            schema_editor.execute(f"DROP INDEX {quote(_index_name(table, column))}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0015_respondent_processed_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
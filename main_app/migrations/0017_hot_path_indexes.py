@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Lower, NullIf, Trim
+
+
+def fill_email_keys(apps, schema_editor):
+    # Même normalisation que models.normalize_email, en une seule requête
+    Respondent = apps.get_model('main_app', 'Respondent')
+    Respondent.objects.exclude(email=None).update(email_key=NullIf(Lower(Trim('email')), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0016_admin_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respondent',
+            name='email_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(fill_email_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['pub_date'], name='question_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['creator', 'pub_date'], name='question_creator_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['creator', 'response_count'], name='question_creator_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respondent',
+            index=models.Index(fields=['submitted_at'], name='respondent_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['choice', 'answered_at'], name='response_choice_answered_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0018_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Heure'), ('day', 'Jour')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='main_app.choice')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('choice', 'period', 'bucket'), name='unique_response_rollup')],
+            },
+        ),
+    ]
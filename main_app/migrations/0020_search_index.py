@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'main_app_question_fts'
+
+
+def _fts5_available(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_fts_table(apps, schema_editor):
+    # Sans FTS5 (autres bases), la recherche utilise SearchTerm : commande rebuild_search_index
+    if not _fts5_available(schema_editor):
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "question_fr, question_en, choices_fr, choices_en, "
+        # Index des préfixes de 2 et 3 lettres : recherche pendant la saisie
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    # Classement par défaut (ORDER BY rank) : la question pèse plus que ses choix
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 10.0, 1.0, 1.0)')")
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, question_fr, question_en, choices_fr, choices_en) "
+        "SELECT q.id, coalesce(q.question_text_fr, ''), coalesce(q.question_text_en, ''), "
+        "coalesce((SELECT group_concat(coalesce(c.choice_text_fr, ''), ' ') FROM main_app_choice c WHERE c.question_id = q.id), ''), "
+        "coalesce((SELECT group_concat(coalesce(c.choice_text_en, ''), ' ') FROM main_app_choice c WHERE c.question_id = q.id), '') "
+        "FROM main_app_question q"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if _fts5_available(schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0019_responserollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='main_app.question')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'question'), name='unique_search_term')],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
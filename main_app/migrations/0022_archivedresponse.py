@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0021_purge_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answered_at', models.DateTimeField()),
+                ('choice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_responses', to='main_app.choice')),
+                ('respondent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_responses', to='main_app.respondent')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0022_archivedresponse'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='respondent',
+            name='processed_image',
+            field=models.CharField(blank=True, default='', max_length=101),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:28
+
+from importlib import import_module
+
+import main_app.models
+from django.conf import settings
+from django.db import migrations
+
+# Les index de recherche créés en SQL par 0016 sont inconnus de l'état des
+# migrations : perdus à chaque reconstruction de table SQLite (0023 pour
+# main_app_respondent). Ils sont remplacés par des index déclarés dans Meta.indexes.
+search_indexes = import_module('main_app.migrations.0016_admin_search_indexes')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0023_respondent_processed_image_length'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(search_indexes.drop_search_indexes, search_indexes.create_search_indexes),
+        migrations.AddIndex(
+            model_name='choice',
+            index=main_app.models.PrefixSearchIndex(fields=['choice_text_fr'], name='choice_text_fr_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='choice',
+            index=main_app.models.PrefixSearchIndex(fields=['choice_text_en'], name='choice_text_en_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=main_app.models.PrefixSearchIndex(fields=['question_text_fr'], name='question_text_fr_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=main_app.models.PrefixSearchIndex(fields=['question_text_en'], name='question_text_en_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respondent',
+            index=main_app.models.PrefixSearchIndex(fields=['name'], name='respondent_name_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respondent',
+            index=main_app.models.PrefixSearchIndex(fields=['email'], name='respondent_email_search_idx'),
+        ),
+    ]
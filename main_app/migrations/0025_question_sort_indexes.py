@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:32
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0024_prefix_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.NullIf('question_text_fr', django.db.models.expressions.RawSQL("''", ())), 'question_text_fr', django.db.models.expressions.RawSQL("''", ()), output_field=models.CharField()), models.F('id'), name='question_sort_fr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.NullIf('question_text_en', django.db.models.expressions.RawSQL("''", ())), 'question_text_fr', django.db.models.expressions.RawSQL("''", ()), output_field=models.CharField()), models.F('id'), name='question_sort_en_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(models.F('creator'), django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.NullIf('question_text_fr', django.db.models.expressions.RawSQL("''", ())), 'question_text_fr', django.db.models.expressions.RawSQL("''", ()), output_field=models.CharField()), models.F('id'), name='question_creator_sort_fr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(models.F('creator'), django.db.models.functions.comparison.Coalesce(django.db.models.functions.comparison.NullIf('question_text_en', django.db.models.expressions.RawSQL("''", ())), 'question_text_fr', django.db.models.expressions.RawSQL("''", ()), output_field=models.CharField()), models.F('id'), name='question_creator_sort_en_idx'),
+        ),
+    ]
@@ -1,5 +1,29 @@
 from django.db import models
+from django.db.models import F, TextField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce, Collate, NullIf, Upper
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import OpClass
+from modeltranslation import settings as mt_settings
+from modeltranslation.utils import build_localized_fieldname
+
+
+class PrefixSearchIndex(models.Index):
+    # Index pour la recherche par préfixe insensible à la casse de l'admin
+    # (istartswith), déclaré dans Meta.indexes pour que les reconstructions de
+    # table SQLite le conservent. Sa forme dépend de la base : SQLite n'utilise un
+    # index pour LIKE que s'il est en COLLATE NOCASE, PostgreSQL a besoin d'un index
+    # sur UPPER(...) en varchar_pattern_ops, MySQL utilise directement un index simple.
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        field = self.fields[0]
+        vendor = schema_editor.connection.vendor
+        if vendor == 'sqlite':
+            index = models.Index(Collate(field, 'NOCASE'), name=self.name)
+        elif vendor == 'postgresql':
+            index = models.Index(OpClass(Upper(Cast(field, TextField())), 'varchar_pattern_ops'), name=self.name)
+        else:
+            index = models.Index(fields=self.fields, name=self.name)
+        return index.create_sql(model, schema_editor, using=using, **kwargs)
 
 class Interest(models.Model):
     name = models.CharField(max_length=100)
@@ -16,22 +40,113 @@ class ContactMessage(models.Model):
     def __str__(self):
         return f"{self.name} ({self.email})"
 
+def normalize_email(email):
+    # Clé de déduplication des répondants : "  Alice@Exemple.FR " -> "alice@exemple.fr"
+    return email.strip().lower() if email and email.strip() else None
+
+
+# Préfixe de processed_image : image illisible, miniatures abandonnées (voir main_app/media.py)
+FAILED_MARK = '!'
+
+
 class Respondent(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(blank=True, null=True)
+    # Email normalisé et indexé, tenu à jour par save() (à renseigner soi-même avec bulk_create)
+    email_key = models.CharField(max_length=254, null=True, blank=True, editable=False, db_index=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
     interests = models.ManyToManyField(Interest, blank=True)
-    image = models.ImageField(upload_to='respondents/', null=True, blank=True)
+    image = models.ImageField(upload_to='respondents/', max_length=100, null=True, blank=True)
+    # Nom de l'image dont les miniatures ont été générées (voir main_app/media.py),
+    # ou ce nom précédé de FAILED_MARK : place pour le nom le plus long plus le marqueur
+    processed_image = models.CharField(max_length=100 + len(FAILED_MARK), blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Liste des répondants, pagination par curseur
+            models.Index(fields=['submitted_at'], name='respondent_submitted_idx'),
+            # Recherche de l'admin (^name, ^email)
+            PrefixSearchIndex(fields=['name'], name='respondent_name_search_idx'),
+            PrefixSearchIndex(fields=['email'], name='respondent_email_search_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.email_key = normalize_email(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_key'}
+        super().save(*args, **kwargs)
+
+    def _image_url(self, variant):
+        from .media import image_variant_url
+        return image_variant_url(self, variant)
+
+    @property
+    def small_image_url(self):
+        return self._image_url('small')
+
+    @property
+    def medium_image_url(self):
+        return self._image_url('medium')
+
+
+def question_sort_text(language):
+    # Texte affiché dans cette langue (repli sur la langue par défaut, jamais NULL),
+    # clé du tri par texte de l'accueil. Chaîne vide écrite en dur et non en
+    # paramètre : SQLite n'utilise l'index que si la requête reprend son expression
+    # mot pour mot.
+    empty = RawSQL("''", ())
+    return Coalesce(
+        NullIf(build_localized_fieldname('question_text', language), empty),
+        build_localized_fieldname('question_text', mt_settings.DEFAULT_LANGUAGE),
+        empty,
+        output_field=models.CharField(),
+    )
+
+
+class ActiveQuestionManager(models.Manager):
+    # Sondages supprimés en attente de purge (main_app/purge.py) : invisibles partout
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at=None)
+
 
 class Question(models.Model):
     question_text = models.CharField(max_length=200)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     pub_date = models.DateTimeField("date published")
-    
+    # Compteur dénormalisé, tenu à jour par main_app/counters.py
+    response_count = models.IntegerField(default=0, db_index=True)
+    # Suppression demandée : les dépendances sont effacées par lots par run_purge_jobs
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ActiveQuestionManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # Accueil : tous les sondages ou ceux d'un créateur, triés par date ou par réponses
+            models.Index(fields=['pub_date'], name='question_pub_date_idx'),
+            models.Index(fields=['creator', 'pub_date'], name='question_creator_pub_idx'),
+            models.Index(fields=['creator', 'response_count'], name='question_creator_count_idx'),
+            # Tri par texte (question_sort_text), dans chaque langue
+            *[
+                models.Index(question_sort_text(language), F('id'), name=f'question_sort_{language}_idx')
+                for language in mt_settings.AVAILABLE_LANGUAGES
+            ],
+            *[
+                models.Index(
+                    F('creator'), question_sort_text(language), F('id'), name=f'question_creator_sort_{language}_idx',
+                )
+                for language in mt_settings.AVAILABLE_LANGUAGES
+            ],
+            # Recherche de l'admin, dans chaque langue
+            PrefixSearchIndex(fields=['question_text_fr'], name='question_text_fr_search_idx'),
+            PrefixSearchIndex(fields=['question_text_en'], name='question_text_en_search_idx'),
+        ]
+
     def __str__(self):
         return self.question_text
 
@@ -40,15 +155,159 @@ class Choice(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     choice_text = models.CharField(max_length=200)
     votes = models.IntegerField(default=0)
+    response_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Recherche de l'admin, dans chaque langue
+            PrefixSearchIndex(fields=['choice_text_fr'], name='choice_text_fr_search_idx'),
+            PrefixSearchIndex(fields=['choice_text_en'], name='choice_text_en_search_idx'),
+        ]
 
     def __str__(self):
         return self.choice_text
 
 
+class ResponseQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create n'envoie pas post_save : on met à jour les compteurs en une fois
+        from . import fragments
+        from .counters import apply_response_deltas, rebuild_response_counts
+
+        from .rollups import apply_rollup_deltas, rebuild_rollups, rollup_deltas
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        deltas = {}
+        for obj in objs:
+            deltas[obj.choice_id] = deltas.get(obj.choice_id, 0) + 1
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            # Impossible de savoir quelles lignes ont été insérées : on recompte
+            rebuild_response_counts(choice_ids=deltas.keys())
+            rebuild_rollups(choice_ids=deltas.keys())
+        else:
+            apply_response_deltas(deltas)
+            apply_rollup_deltas(rollup_deltas((obj.choice_id, obj.answered_at, 1) for obj in objs))
+        fragments.bump_versions(fragments.LISTING)
+        return objs
+
+
 class Response(models.Model):
     respondent = models.ForeignKey(Respondent, on_delete=models.CASCADE)
     choice = models.ForeignKey(Choice, on_delete=models.CASCADE)
     answered_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ResponseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Réponses d'une question (par choix), les plus récentes d'abord
+            models.Index(fields=['choice', 'answered_at'], name='response_choice_answered_idx'),
+        ]
+
     def __str__(self):
         return f"{self.respondent.name} → {self.choice.choice_text}"
+
+
+class ArchivedResponse(models.Model):
+    # Réponse ancienne déplacée hors de Response (voir main_app/archive.py) : même
+    # identifiant, seulement les clés entières et la date. Toujours comptée dans les
+    # compteurs, les agrégats, les résultats et les exports
+    respondent = models.ForeignKey(Respondent, on_delete=models.CASCADE, related_name='archived_responses')
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='archived_responses')
+    answered_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.respondent_id} → {self.choice_id} (archivée)"
+
+
+class ResponseRollup(models.Model):
+    # Nombre de réponses d'un choix par heure et par jour (tranches UTC), tenu à
+    # jour par main_app/rollups.py : les séries temporelles ne parcourent pas Response
+    PERIOD_CHOICES = [('hour', 'Heure'), ('day', 'Jour')]
+
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='rollups')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'period', 'bucket'], name='unique_response_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.choice_id} {self.period} {self.bucket:%Y-%m-%d %H:%M} ({self.count})"
+
+
+class SearchTerm(models.Model):
+    # Index inversé de la recherche pour les bases sans FTS5 (voir main_app/search.py) :
+    # un mot normalisé par question, pondéré par ses occurrences
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'question'], name='unique_search_term'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} → {self.question_id}"
+
+
+class VoteShard(models.Model):
+    # Compteur partiel d'un choix : les votes sont répartis sur plusieurs lignes
+    # puis reportés périodiquement dans Choice.votes (voir main_app/votes.py)
+    choice = models.ForeignKey(Choice, on_delete=models.CASCADE, related_name='vote_shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['choice', 'shard'], name='unique_vote_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.choice_id} #{self.shard} (+{self.count})"
+
+
+class MediaDeletion(models.Model):
+    # File d'attente des fichiers à supprimer du stockage (voir main_app/media.py)
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class IdempotencyKey(models.Model):
+    # Clé d'un envoi déjà traité (formulaire de réponse, vote) : la contrainte
+    # d'unicité arrête les doublons qui passent entre les mailles du cache
+    # (voir main_app/idempotency.py)
+    key = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class PurgeJob(models.Model):
+    # Suppression différée d'un sondage ou d'un utilisateur et de tout ce qui en
+    # dépend, par lots de taille bornée (voir main_app/purge.py). Reprise là où
+    # elle s'est arrêtée : chaque lot est validé à part
+    QUESTION = 'question'
+    USER = 'user'
+    KIND_CHOICES = [(QUESTION, 'Sondage'), (USER, 'Utilisateur')]
+
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    target_id = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    deleted_rows = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.target_id}"
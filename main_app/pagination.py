@@ -0,0 +1,164 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Pagination par curseur (keyset) : au lieu de COUNT(*) + OFFSET, chaque page
+# repart de la dernière ligne affichée avec un WHERE (clé, id) < (valeur, id).
+# Le coût d'une page ne dépend donc pas de sa position dans la liste.
+# L'id sert de départage pour que l'ordre soit total et stable.
+
+
+def _json_default(value):
+    # isoformat complet : DjangoJSONEncoder tronque les microsecondes
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class CursorPaginator:
+    def __init__(self, queryset, key, per_page, descending=True):
+        self.queryset = queryset
+        self.key = key
+        self.per_page = per_page
+        self.descending = descending
+
+    def _key_field(self):
+        annotation = self.queryset.query.annotations.get(self.key)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(self.key)
+
+    def encode_cursor(self, direction, obj):
+        payload = [direction, getattr(obj, self.key), obj.pk]
+        raw = json.dumps(payload, default=_json_default, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        # Un curseur illisible ou falsifié renvoie simplement à la première page
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, value, pk = json.loads(raw)
+            if direction not in ('n', 'p') or not isinstance(pk, int):
+                return None
+            # Clé de tri NULL : aucune comparaison (<, >) possible, les clés sont choisies non NULL
+            if value is None:
+                return None
+            value = self._key_field().to_python(value)
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return None
+        return direction, value, pk
+
+    def _page_query(self, cursor):
+        position = self.decode_cursor(cursor)
+        backwards = position is not None and position[0] == 'p'
+        descending = self.descending != backwards
+        op = 'lt' if descending else 'gt'
+
+        queryset = self.queryset
+        if position is not None:
+            _, value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.key}__{op}': value}) | Q(**{self.key: value, f'pk__{op}': pk})
+            )
+
+        prefix = '-' if descending else ''
+        return queryset.order_by(f'{prefix}{self.key}', f'{prefix}pk')[:self.per_page + 1], position, backwards
+
+    def _build_page(self, rows, position, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows)
+        has_next = position is not None if backwards else has_more
+        has_previous = has_more if backwards else position is not None
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor('n', rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor('p', rows[0]) if has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        queryset, position, backwards = self._page_query(cursor)
+        return self._build_page(list(queryset), position, backwards)
+
+    async def aget_page(self, cursor=None):
+        queryset, position, backwards = self._page_query(cursor)
+        return self._build_page([row async for row in queryset], position, backwards)
+
+
+class EstimatedCountPaginator(Paginator):
+    # Paginator pour les grandes tables de l'admin : pas de COUNT(*) exact.
+    # Table entière : estimation fournie par la base (statistiques du planificateur).
+    # Liste filtrée : comptage plafonné à COUNT_LIMIT lignes.
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+def estimate_row_count(model, using='default'):
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            # Après ANALYZE, sqlite_stat1 donne le nombre de lignes ; sinon le plus grand rowid
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+            cursor.execute(f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and int(row[0]) >= 0 else None
@@ -0,0 +1,95 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import fragments
+from .bulk import delete_rows
+from .models import ArchivedResponse, Choice, PurgeJob, Question, Response, ResponseRollup, SearchTerm, VoteShard
+
+logger = logging.getLogger(__name__)
+
+# Suppression en deux temps des sondages et des utilisateurs. La requête ne fait
+# que marquer la racine (Question.deleted_at, User.is_active) et enregistrer un
+# PurgeJob : le sondage disparaît aussitôt des pages (ActiveQuestionManager),
+# l'utilisateur ne peut plus se connecter. La commande run_purge_jobs efface
+# ensuite les dépendances par lots de clés primaires, une transaction par lot,
+# sans charger les objets ni envoyer de signal par ligne : les compteurs, agrégats
+# et l'index de recherche du sondage disparaissent avec lui. Les répondants, qui
+# peuvent avoir répondu à d'autres sondages, sont conservés (leurs images restent
+# gérées par la file MediaDeletion).
+
+MAX_ATTEMPTS = 5
+
+
+def soft_delete_question(question):
+    question.deleted_at = timezone.now()
+    with transaction.atomic():
+        # Signal post_save : versions du cache de fragments (accueil, sondage)
+        question.save(update_fields=['deleted_at'])
+        PurgeJob.objects.create(kind=PurgeJob.QUESTION, target_id=question.pk)
+
+
+def soft_delete_user(user):
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        Question.objects.filter(creator=user).update(deleted_at=timezone.now())
+        PurgeJob.objects.create(kind=PurgeJob.USER, target_id=user.pk)
+        fragments.bump_versions(fragments.LISTING)
+
+
+def _delete_chunks(job, queryset, chunk_size):
+    # Lot par lot jusqu'à épuisement : une purge interrompue reprend sans rien refaire
+    while True:
+        with transaction.atomic():
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return
+            # DELETE direct (sans collecteur) : les dépendances ont été effacées avant
+            deleted = delete_rows(queryset.model, pks, using=router.db_for_write(queryset.model))
+            PurgeJob.objects.filter(pk=job.pk).update(deleted_rows=F('deleted_rows') + deleted)
+
+
+def purge_question(job, question_id, chunk_size):
+    for model in (Response, ArchivedResponse, ResponseRollup, VoteShard):
+        _delete_chunks(job, model._base_manager.filter(choice__question_id=question_id), chunk_size)
+    _delete_chunks(job, SearchTerm.objects.filter(question_id=question_id), chunk_size)
+    _delete_chunks(job, Choice._base_manager.filter(question_id=question_id), chunk_size)
+    # Racine supprimée normalement : plus rien à charger en cascade, signaux de Question envoyés
+    Question.all_objects.filter(pk=question_id).delete()
+
+
+def purge_user(job, user_id, chunk_size):
+    # Sondages marqués avec l'utilisateur, ou créés entre-temps : tous purgés
+    question_ids = list(Question.all_objects.filter(creator_id=user_id).order_by('pk').values_list('pk', flat=True))
+    for question_id in question_ids:
+        purge_question(job, question_id, chunk_size)
+    User.objects.filter(pk=user_id).delete()
+
+
+def run_job(job, chunk_size=None):
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    if job.kind == PurgeJob.USER:
+        purge_user(job, job.target_id, chunk_size)
+    else:
+        purge_question(job, job.target_id, chunk_size)
+    PurgeJob.objects.filter(pk=job.pk).update(finished_at=timezone.now())
+
+
+def run_purge_jobs(chunk_size=None):
+    finished = failed = 0
+    jobs = PurgeJob.objects.filter(finished_at=None, attempts__lt=MAX_ATTEMPTS).order_by('pk')
+    for job in list(jobs):
+        try:
+            run_job(job, chunk_size)
+        except Exception as exc:
+            # Lots déjà validés conservés : le prochain passage reprend la suite
+            logger.exception("Purge %s interrompue", job)
+            PurgeJob.objects.filter(pk=job.pk).update(attempts=F('attempts') + 1, last_error=str(exc))
+            failed += 1
+        else:
+            finished += 1
+    return finished, failed
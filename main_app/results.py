@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from django.db.models import Count
+
+from .models import ArchivedResponse, Choice, Interest, Response
+
+# Résultats agrégés d'un sondage, sans charger les réponses une par une :
+# - nombre de réponses par choix : compteurs dénormalisés Choice.response_count
+# - répartition centre d'intérêt × choix : une requête GROUP BY par table
+#   (réponses récentes et archivées)
+
+
+def interest_breakdown(question):
+    counts = defaultdict(lambda: defaultdict(int))
+    for model in (Response, ArchivedResponse):
+        rows = (
+            model.objects.filter(choice__question=question)
+            .order_by()
+            .values_list('choice_id', 'respondent__interests')
+            .annotate(n=Count('pk'))
+        )
+        for choice_id, interest_id, n in rows:
+            counts[interest_id][choice_id] += n
+    return counts
+
+
+def question_results(question):
+    choices = list(Choice.objects.filter(question=question).order_by('pk'))
+    total = sum(choice.response_count for choice in choices)
+
+    counts = interest_breakdown(question)
+    interests = Interest.objects.filter(pk__in=[pk for pk in counts if pk is not None]).order_by('pk')
+    # Une ligne par centre d'intérêt, puis les répondants sans centre d'intérêt
+    breakdown = [(interest, counts[interest.pk]) for interest in interests]
+    if None in counts:
+        breakdown.append((None, counts[None]))
+
+    return {
+        'total': total,
+        'choices': [
+            {
+                'choice': choice,
+                'count': choice.response_count,
+                'percent': round(100 * choice.response_count / total, 1) if total else 0,
+            }
+            for choice in choices
+        ],
+        'breakdown': [
+            {'interest': interest, 'counts': [row.get(choice.pk, 0) for choice in choices]}
+            for interest, row in breakdown
+        ],
+    }
@@ -0,0 +1,144 @@
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncHour
+
+from .counters import create_or_increment, lock_order
+from .models import ArchivedResponse, Choice, Response, ResponseRollup
+
+# Agrégats temporels des réponses (ResponseRollup) : nombre de réponses par
+# choix, par heure et par jour. Ils sont mis à jour au fil de l'eau par les
+# signaux de Response et par ResponseQuerySet.bulk_create, comme les compteurs
+# dénormalisés (main_app/counters.py) ; rebuild_rollups() recalcule l'historique
+# par lots de choix (commande rebuild_response_rollups). Les tranches sont en UTC.
+
+PERIODS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+# Nombre de conditions par UPDATE (profondeur maximale des expressions SQLite)
+UPDATE_CHUNK = 100
+
+
+def bucket_start(period, moment):
+    moment = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if period == 'day' else moment
+
+
+def rollup_deltas(rows):
+    # rows : (choice_id, answered_at, delta) -> {(choice_id, période, début de tranche): delta}
+    deltas = defaultdict(int)
+    for choice_id, answered_at, delta in rows:
+        for period in PERIODS:
+            deltas[(choice_id, period, bucket_start(period, answered_at))] += delta
+    return deltas
+
+
+def rollup_added(choice_id, answered_at, delta=1):
+    apply_rollup_deltas(rollup_deltas([(choice_id, answered_at, delta)]))
+
+
+def _matching(keys):
+    return reduce(or_, (Q(choice_id=choice_id, period=period, bucket=bucket) for choice_id, period, bucket in keys))
+
+
+def apply_rollup_deltas(deltas):
+    # Un UPDATE par lot de tranches qui reçoivent le même delta (une réponse : heure
+    # et jour en une requête), puis création des tranches encore absentes
+    by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(key)
+
+    for delta, keys in sorted(by_delta.items()):
+        keys = lock_order(keys)
+        for start in range(0, len(keys), UPDATE_CHUNK):
+            chunk = keys[start:start + UPDATE_CHUNK]
+            updated = ResponseRollup.objects.filter(_matching(chunk)).update(count=F('count') + delta)
+            if updated == len(chunk) or delta < 0:
+                # Retrait dans une tranche absente : historique pas encore agrégé,
+                # rebuild_rollups() le recomptera
+                continue
+            existing = set(ResponseRollup.objects.filter(_matching(chunk)).values_list('choice_id', 'period', 'bucket'))
+            _create_rollups([key for key in chunk if key not in existing], delta)
+
+
+def _create_rollups(keys, delta):
+    try:
+        with transaction.atomic():
+            ResponseRollup.objects.bulk_create([
+                ResponseRollup(choice_id=choice_id, period=period, bucket=bucket, count=delta)
+                for choice_id, period, bucket in keys
+            ])
+    except IntegrityError:
+        # Tranche créée entre-temps par une autre requête : une par une
+        for choice_id, period, bucket in keys:
+            create_or_increment(ResponseRollup, 'count', delta, choice_id=choice_id, period=period, bucket=bucket)
+
+
+def actual_rollups(choice_ids):
+    # Recomptage depuis Response et ArchivedResponse : un GROUP BY par heure et par
+    # table (index choix + date), jours déduits des heures
+    rows = []
+    for model in (Response, ArchivedResponse):
+        rows += (
+            model.objects.filter(choice_id__in=choice_ids)
+            .annotate(hour=TruncHour('answered_at', tzinfo=dt_timezone.utc))
+            .order_by()
+            .values_list('choice_id', 'hour')
+            .annotate(n=Count('pk'))
+        )
+    return rollup_deltas(rows)
+
+
+def rebuild_rollups(choice_ids=None, chunk_size=100, dry_run=False):
+    if choice_ids is None:
+        choice_ids = Choice.objects.values_list('pk', flat=True)
+    choice_ids = sorted(choice_ids)
+
+    mismatches = []
+    for start in range(0, len(choice_ids), chunk_size):
+        chunk = choice_ids[start:start + chunk_size]
+        # Lecture et réécriture d'un lot dans une même transaction : pas de réponse perdue entre les deux
+        with transaction.atomic():
+            actual = actual_rollups(chunk)
+            stored = {
+                (choice_id, period, bucket): count
+                for choice_id, period, bucket, count in ResponseRollup.objects.filter(choice_id__in=chunk)
+                .values_list('choice_id', 'period', 'bucket', 'count')
+            }
+            wrong = sorted(key for key in actual.keys() | stored.keys() if actual.get(key, 0) != stored.get(key, 0))
+            mismatches += [(*key, stored.get(key, 0), actual.get(key, 0)) for key in wrong]
+            if wrong and not dry_run:
+                ResponseRollup.objects.filter(choice_id__in=chunk).delete()
+                ResponseRollup.objects.bulk_create([
+                    ResponseRollup(choice_id=choice_id, period=period, bucket=bucket, count=count)
+                    for (choice_id, period, bucket), count in actual.items() if count
+                ])
+    return mismatches
+
+
+def timeseries(question, period, start, end):
+    # Série [start, end[ lue uniquement dans les agrégats, tranches vides comprises
+    step = PERIODS[period]
+    start = bucket_start(period, start)
+    choice_ids = list(Choice.objects.filter(question=question).order_by('pk').values_list('pk', flat=True))
+    counts = defaultdict(dict)
+    rows = ResponseRollup.objects.filter(
+        choice_id__in=choice_ids, period=period, bucket__gte=start, bucket__lt=end,
+    ).values_list('bucket', 'choice_id', 'count')
+    for bucket, choice_id, count in rows:
+        counts[bucket][choice_id] = count
+
+    series = []
+    bucket = start
+    while bucket < end:
+        row = counts.get(bucket, {})
+        series.append({
+            'start': bucket.isoformat(),
+            'total': sum(row.values()),
+            'choices': {choice_id: row.get(choice_id, 0) for choice_id in choice_ids},
+        })
+        bucket += step
+    return series
@@ -0,0 +1,41 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Routage des lectures vers les réplicas (settings.DATABASE_REPLICAS).
+# Par défaut tout passe par la base principale : seules les requêtes HTTP en
+# lecture (GET, HEAD...) autorisées par le middleware replica_routing_middleware
+# lisent sur un réplica. Les commandes, les écritures, les lectures faites dans
+# une transaction et les clients qui viennent d'écrire restent sur la principale.
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def allow_replica_reads(allowed=True):
+    # Renvoie le jeton à passer à reset_replica_reads()
+    return _replica_reads.set(allowed)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def replica_reads_allowed():
+    return bool(settings.DATABASE_REPLICAS) and _replica_reads.get()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Lecture au milieu d'une transaction : elle doit voir ce qui vient d'être écrit
+        if not replica_reads_allowed() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les réplicas contiennent les mêmes données que la base principale
+        return True
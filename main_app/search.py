@@ -0,0 +1,214 @@
+import functools
+import re
+import unicodedata
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connection, connections, router, transaction
+from django.db.models import Q, Sum
+
+from .models import Choice, Question, SearchTerm
+
+# Recherche plein texte des sondages (texte de la question et des choix, en
+# français et en anglais). Sous SQLite, une table virtuelle FTS5 (créée par la
+# migration 0020) : une ligne par question, rowid = identifiant de la question,
+# classement bm25 où la question pèse plus que ses choix (sauf pour les mots
+# trop courants, voir _fts5_ids). Sur les autres bases,
+# index inversé SearchTerm (un mot normalisé par question, pondéré). L'index est
+# tenu à jour par les signaux de Question et Choice ; les insertions en bloc
+# passent par rebuild_index() (commande rebuild_search_index).
+
+FTS_TABLE = 'main_app_question_fts'
+# Poids des colonnes : texte de la question (fr, en), texte des choix (fr, en)
+QUESTION_WEIGHT, CHOICE_WEIGHT = 10, 1
+MAX_TERMS = 8
+TERM_LENGTH = 64
+WORD_RE = re.compile(r'\w+')
+# Borne supérieure des mots commençant par un préfixe donné
+PREFIX_END = '\uffff'
+
+
+@functools.cache
+def _fts5_compiled():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def backend():
+    if settings.SEARCH_BACKEND:
+        return settings.SEARCH_BACKEND
+    return 'fts5' if connection.vendor == 'sqlite' and _fts5_compiled() else 'terms'
+
+
+def normalize(word):
+    # Minuscules sans accents, comme le tokenizer FTS5 (unicode61 remove_diacritics 2)
+    word = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(c for c in word if not unicodedata.combining(c))[:TERM_LENGTH]
+
+
+def query_terms(query):
+    return [normalize(word) for word in WORD_RE.findall(query or '')][:MAX_TERMS]
+
+
+def documents(question_ids):
+    # {question_id: (question fr, question en, choix fr, choix en)} en deux requêtes
+    texts = {
+        pk: [fr or '', en or '', [], []]
+        for pk, fr, en in Question.objects.filter(pk__in=question_ids)
+        .values_list('pk', 'question_text_fr', 'question_text_en')
+    }
+    choices = (
+        Choice.objects.filter(question_id__in=question_ids).order_by('pk')
+        .values_list('question_id', 'choice_text_fr', 'choice_text_en')
+    )
+    for question_id, fr, en in choices:
+        texts[question_id][2].append(fr or '')
+        texts[question_id][3].append(en or '')
+    return {pk: (fr, en, ' '.join(choices_fr), ' '.join(choices_en)) for pk, (fr, en, choices_fr, choices_en) in texts.items()}
+
+
+def _weighted_terms(document):
+    weights = Counter()
+    for text, weight in zip(document, (QUESTION_WEIGHT, QUESTION_WEIGHT, CHOICE_WEIGHT, CHOICE_WEIGHT)):
+        for word in WORD_RE.findall(text):
+            weights[normalize(word)] += weight
+    return weights
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def remove_questions(question_ids):
+    question_ids = list(question_ids)
+    if not question_ids:
+        return
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(question_ids)})", question_ids)
+    else:
+        SearchTerm.objects.filter(question_id__in=question_ids).delete()
+
+
+def index_questions(question_ids):
+    # (Ré)indexation complète des questions : les questions disparues sont retirées
+    question_ids = list(question_ids)
+    docs = documents(question_ids)
+    remove_questions(question_ids)
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, question_fr, question_en, choices_fr, choices_en) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(pk, *document) for pk, document in docs.items()],
+            )
+    else:
+        SearchTerm.objects.bulk_create([
+            SearchTerm(question_id=pk, term=term, weight=weight)
+            for pk, document in docs.items() for term, weight in _weighted_terms(document).items()
+        ])
+
+
+def rebuild_index(chunk_size=2000):
+    # Réindexation de toutes les questions par lots de clés primaires ; renvoie le nombre de questions
+    if backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    else:
+        SearchTerm.objects.all().delete()
+    indexed, last_pk = 0, 0
+    while True:
+        chunk = list(Question.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not chunk:
+            return indexed
+        # Une transaction par lot : sans elle, chaque ligne insérée serait validée (et écrite) à part
+        with transaction.atomic():
+            index_questions(chunk)
+        indexed += len(chunk)
+        last_pk = chunk[-1]
+
+
+class SearchPage:
+    # Page de résultats classés : pas de décompte total (coûteux), seulement la page suivante
+    def __init__(self, questions, number, has_next):
+        self.object_list = questions
+        self.number = number
+        self.has_next = has_next
+        self.has_previous = number > 1
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+def _fts5_count(cursor, match, limit):
+    # Nombre de résultats, compté au plus jusqu'à limit (arrêt dans l'ordre de l'index)
+    cursor.execute(
+        f"SELECT count(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)", [match, limit],
+    )
+    return cursor.fetchone()[0]
+
+
+def _fts5_ids(terms, offset, limit):
+    # Tous les mots requis, le dernier en préfixe (recherche pendant la saisie)
+    exact = ' '.join(f'"{term}"' for term in terms)
+    match = exact + '*'
+    order = 'rank'
+    using = router.db_for_read(Question)
+    with connections[using].cursor() as cursor:
+        # bm25 est calculé pour chaque résultat : pour les mots trop courants, les plus
+        # récents d'abord, lus dans l'ordre de l'index et sans tri. Le mot complet est
+        # testé avant le préfixe, qui oblige à fusionner toutes ses variantes
+        most = settings.SEARCH_RANK_MAX_MATCHES
+        if _fts5_count(cursor, exact, most + 1) > most:
+            match, order = exact, 'rowid DESC'
+        elif _fts5_count(cursor, match, most + 1) > most:
+            order = 'rowid DESC'
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY {order} LIMIT %s OFFSET %s",
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _terms_ids(terms, offset, limit):
+    # Tous les mots requis, le dernier en préfixe (intervalle : utilisable par l'index sur
+    # tous les moteurs) ; score = somme des poids, lu uniquement dans l'index (term, question)
+    conditions = [Q(term=term) for term in terms[:-1]]
+    conditions.append(Q(term__gte=terms[-1], term__lt=terms[-1] + PREFIX_END))
+    matches = SearchTerm.objects.filter(reduce(or_, conditions))
+    if len(conditions) > 1:
+        for condition in conditions:
+            matches = matches.filter(question_id__in=SearchTerm.objects.filter(condition).values('question_id'))
+    return list(
+        matches.values('question_id').annotate(score=Sum('weight'))
+        .order_by('-score', '-question_id').values_list('question_id', flat=True)[offset:offset + limit]
+    )
+
+
+def search(query, page=1, per_page=None):
+    per_page = per_page or settings.SEARCH_PAGE_SIZE
+    page = max(1, min(page, settings.SEARCH_MAX_PAGES))
+    terms = query_terms(query)
+    if not terms:
+        return SearchPage([], page, False)
+
+    find = _fts5_ids if backend() == 'fts5' else _terms_ids
+    # Un résultat de plus que la page : indique s'il existe une page suivante
+    ids = find(terms, (page - 1) * per_page, per_page + 1)
+    questions = Question.objects.in_bulk(ids[:per_page])
+    return SearchPage(
+        [questions[pk] for pk in ids[:per_page] if pk in questions], page,
+        len(ids) > per_page and page < settings.SEARCH_MAX_PAGES,
+    )
@@ -1,34 +1,110 @@
-import os
-from django.db.models.signals import pre_save, post_delete
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
-from .models import Respondent
+from .models import ArchivedResponse, Choice, Interest, Question, Respondent, Response
+from .counters import response_added
+from .rollups import rollup_added
+from .media import image_files, image_name, schedule_deletion
+from . import fragments, instrumentation, search
 from django.db.models.signals import post_save
 
+# Les fichiers ne sont plus effacés pendant la requête : ils sont mis en file
+# d'attente (main_app/media.py) et supprimés par process_media_deletions
+
+# Compteurs de requêtes par alias de base (main_app/instrumentation.py)
+@receiver(connection_created)
+def count_connection_queries(sender, connection, **kwargs):
+    instrumentation.install(connection)
+
+# Nom de l'image au chargement, pour détecter un remplacement sans relire la ligne
+@receiver(post_init, sender=Respondent)
+def remember_original_image(sender, instance, **kwargs):
+    instance._original_image = image_name(instance.__dict__.get('image'))
+
 # Suppression du fichier image quand l’objet est supprimé
 @receiver(post_delete, sender=Respondent)
 def delete_image_on_object_delete(sender, instance, **kwargs):
-    if instance.image and instance.image.path:
-        if os.path.isfile(instance.image.path):
-            os.remove(instance.image.path)
+    schedule_deletion(*image_files(image_name(instance.image)))
 
 # Suppression de l’ancienne image si on en envoie une nouvelle
-@receiver(pre_save, sender=Respondent)
-def delete_old_image_on_update(sender, instance, **kwargs):
-    try:
-        old_instance = Respondent.objects.get(pk=instance.pk)
-    except Respondent.DoesNotExist:
+@receiver(post_save, sender=Respondent)
+def delete_old_image_on_update(sender, instance, created, update_fields=None, **kwargs):
+    if 'image' not in instance.__dict__:  # champ différé : pas modifié
         return
-
-    old_image = old_instance.image
-    new_image = instance.image
-
-    if old_image and old_image != new_image:
-        if os.path.isfile(old_image.path):
-            os.remove(old_image.path)
+    new_image = image_name(instance.__dict__['image'])
+    if not created and (update_fields is None or 'image' in update_fields):
+        if instance._original_image and instance._original_image != new_image:
+            schedule_deletion(*image_files(instance._original_image))
+    instance._original_image = new_image
 
 @receiver(post_save, sender=User)
 def add_user_to_basic_group(sender, instance, created, **kwargs):
     if created:
         basic_group, _ = Group.objects.get_or_create(name='basic')
-        instance.groups.add(basic_group)
\ No newline at end of file
+        instance.groups.add(basic_group)
+
+# Compteurs de réponses dénormalisés (Question.response_count / Choice.response_count)
+# et agrégats par heure et par jour (ResponseRollup)
+@receiver(pre_save, sender=Response)
+def remember_previous_choice(sender, instance, **kwargs):
+    # Seule une modification (admin) peut changer le choix : pas de requête à la création
+    if instance._state.adding or instance.pk is None:
+        return
+    instance._previous_choice_id = (
+        Response.objects.filter(pk=instance.pk).values_list('choice_id', flat=True).first()
+    )
+
+@receiver(post_save, sender=Response)
+def count_response_on_save(sender, instance, created, **kwargs):
+    if created:
+        choice = instance.choice if Response.choice.is_cached(instance) else None
+        response_added(instance.choice_id, question_id=choice.question_id if choice else None)
+        rollup_added(instance.choice_id, instance.answered_at)
+        return
+    previous_choice_id = getattr(instance, '_previous_choice_id', None)
+    if previous_choice_id and previous_choice_id != instance.choice_id:
+        response_added(previous_choice_id, -1)
+        response_added(instance.choice_id)
+        rollup_added(previous_choice_id, instance.answered_at, -1)
+        rollup_added(instance.choice_id, instance.answered_at)
+
+@receiver(post_delete, sender=Response)
+@receiver(post_delete, sender=ArchivedResponse)
+def count_response_on_delete(sender, instance, **kwargs):
+    response_added(instance.choice_id, -1)
+    rollup_added(instance.choice_id, instance.answered_at, -1)
+
+# Versions du cache de fragments : invalidation exacte des pages mises en cache
+@receiver([post_save, post_delete], sender=Question)
+def bump_question_versions(sender, instance, **kwargs):
+    fragments.bump_versions(fragments.LISTING, fragments.question_scope(instance.pk))
+
+@receiver([post_save, post_delete], sender=Choice)
+def bump_choice_versions(sender, instance, **kwargs):
+    fragments.bump_versions(fragments.question_scope(instance.question_id))
+
+@receiver([post_save, post_delete], sender=Response)
+@receiver(post_delete, sender=ArchivedResponse)
+def bump_response_versions(sender, instance, **kwargs):
+    fragments.bump_versions(fragments.LISTING)
+
+@receiver([post_save, post_delete], sender=Interest)
+def bump_interest_versions(sender, instance, **kwargs):
+    fragments.bump_versions(fragments.INTERESTS)
+
+# Index de recherche plein texte (main_app/search.py) : une question est réindexée
+# avec ses choix dès que l'un des textes change
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'question_text', 'question_text_fr', 'question_text_en'} & set(update_fields):
+        return
+    search.index_questions([instance.pk])
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, **kwargs):
+    search.remove_questions([instance.pk])
+
+@receiver([post_save, post_delete], sender=Choice)
+def index_choice_question(sender, instance, **kwargs):
+    search.index_questions([instance.question_id])
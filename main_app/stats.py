@@ -0,0 +1,22 @@
+from django.core.cache import cache
+
+# Compteurs de statistiques gardés dans le cache partagé (succès du cache de
+# fragments, doublons écartés par l'idempotence) : incrémentés sans requête SQL,
+# perdus seulement si le cache est vidé.
+
+
+def increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Premier incrément (ou clé évincée) : add() ne remplace pas un compteur créé entre-temps
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def aincrement(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
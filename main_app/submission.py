@@ -0,0 +1,54 @@
+from django.db import transaction
+
+from .models import Respondent, Response, normalize_email
+
+# Enregistrement d'une réponse anonyme au formulaire d'un sondage, avec le moins
+# de requêtes possible et dans une seule transaction :
+# - répondant cherché par email normalisé (un SELECT indexé), créé s'il n'existe pas ;
+# - seuls les champs modifiés sont réécrits (save(update_fields=...)) ;
+# - centres d'intérêt : seules les différences sont supprimées / ajoutées ;
+# - la réponse est insérée (les compteurs sont mis à jour par les signaux).
+
+
+def _update_interests(respondent, interest_ids, created):
+    Through = Respondent.interests.through
+    current = set() if created else set(
+        Through.objects.filter(respondent=respondent).values_list('interest_id', flat=True)
+    )
+    removed = current - interest_ids
+    added = interest_ids - current
+    if removed:
+        Through.objects.filter(respondent=respondent, interest_id__in=removed).delete()
+    if added:
+        Through.objects.bulk_create(
+            [Through(respondent_id=respondent.pk, interest_id=interest_id) for interest_id in sorted(added)]
+        )
+
+
+def submit_response(name, email, choice, interests=(), image=None):
+    email = email or None
+    interest_ids = {interest.pk for interest in interests}
+
+    with transaction.atomic():
+        # Sans email, chaque soumission correspond à un nouveau répondant
+        email_key = normalize_email(email)
+        respondent = Respondent.objects.filter(email_key=email_key).order_by('pk').first() if email_key else None
+        created = respondent is None
+
+        if created:
+            respondent = Respondent.objects.create(name=name, email=email, image=image)
+        else:
+            update_fields = []
+            if respondent.name != name:
+                respondent.name = name
+                update_fields.append('name')
+            if image:
+                respondent.image = image
+                update_fields.append('image')
+            if update_fields:
+                respondent.save(update_fields=update_fields)
+
+        _update_interests(respondent, interest_ids, created)
+        response = Response.objects.create(respondent=respondent, choice=choice)
+
+    return response
@@ -0,0 +1,26 @@
+from django.template.backends.django import DjangoTemplates
+
+from .instrumentation import time_template
+
+# Moteur de gabarits Django dont les rendus sont chronométrés pour le
+# middleware request_metrics_middleware (temps de rendu par requête).
+
+
+class InstrumentedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with time_template():
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
@@ -1,3 +1,1487 @@
-from django.test import TestCase
+import asyncio
+import gc
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone, translation
+from PIL import Image
+
+from . import catalogs, fragments, idempotency, instrumentation, live, purge, search, transfer
+from .pagination import CursorPaginator, EstimatedCountPaginator
+from .media import FAILED_MARK, process_deletions, process_images, sweep_orphans, variant_name
+from .forms import RespondentForm
+from .models import (
+    ArchivedResponse, Choice, Interest, MediaDeletion, PurgeJob, Question, Respondent, Response, ResponseRollup, VoteShard,
+)
+from .ingest import ingest_records
+from .archive import archive_responses
+from .checks import check_shared_cache
+from .counters import rebuild_response_counts
+from .exports import iter_ndjson, iter_response_rows
+from .results import question_results
+from .rollups import rebuild_rollups
+from .votes import flush_votes, get_tally, record_vote
+from .views import sort_key_for
+
+
+class PollTestCase(TestCase):
+    # Le cache local survit d'un test à l'autre, et les versions ne sont
+    # incrémentées qu'au commit (jamais atteint dans un TestCase)
+    def setUp(self):
+        cache.clear()
+
+
+def make_question(text="Question ?", creator=None, choices=("Oui", "Non")):
+    question = Question.objects.create(question_text=text, creator=creator, pub_date=timezone.now())
+    for choice_text in choices:
+        Choice.objects.create(question=question, choice_text=choice_text)
+    return question
+
+
+class VoteTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.choice = self.question.choice_set.first()
+
+    def test_vote_view_records_vote(self):
+        response = self.client.post(reverse('vote', args=[self.question.pk]), {'choice': self.choice.pk})
+        self.assertRedirects(response, reverse('home'))
+        self.assertEqual(get_tally(self.choice.pk), 1)
+
+    def test_flush_moves_pending_votes_into_choice(self):
+        for _ in range(25):
+            record_vote(self.choice.pk)
+        self.assertEqual(get_tally(self.choice.pk), 25)
+
+        self.assertEqual(flush_votes(batch_size=3), 25)
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.votes, 25)
+        self.assertFalse(VoteShard.objects.filter(count__gt=0).exists())
+        self.assertEqual(get_tally(self.choice.pk), 25)
+
+
+class ConcurrentVoteTests(TransactionTestCase):
+    def test_many_threads_voting_on_one_choice(self):
+        question = make_question()
+        choice = question.choice_set.first()
+        threads_count, votes_per_thread = 8, 25
+        errors = []
+
+        def worker():
+            try:
+                for i in range(votes_per_thread):
+                    record_vote(choice.pk)
+                    if i % 10 == 0:
+                        flush_votes()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(get_tally(choice.pk), threads_count * votes_per_thread)
+        flush_votes()
+        choice.refresh_from_db()
+        self.assertEqual(choice.votes, threads_count * votes_per_thread)
+
+
+class ResponseCountTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        self.respondent = Respondent.objects.create(name="Alice")
+
+    def assertCounts(self, question, yes, no):
+        self.question.refresh_from_db()
+        self.yes.refresh_from_db()
+        self.no.refresh_from_db()
+        self.assertEqual(
+            (self.question.response_count, self.yes.response_count, self.no.response_count),
+            (question, yes, no),
+        )
+
+    def test_create_update_and_delete(self):
+        response = Response.objects.create(respondent=self.respondent, choice=self.yes)
+        self.assertCounts(1, 1, 0)
+        response.choice = self.no
+        response.save()
+        self.assertCounts(1, 0, 1)
+        response.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_bulk_create_and_cascade(self):
+        Response.objects.bulk_create(
+            [Response(respondent=self.respondent, choice=self.yes) for _ in range(3)]
+            + [Response(respondent=self.respondent, choice=self.no)]
+        )
+        self.assertCounts(4, 3, 1)
+        self.respondent.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_rebuild_command(self):
+        Response.objects.create(respondent=self.respondent, choice=self.yes)
+        Question.objects.filter(pk=self.question.pk).update(response_count=7)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_response_counts', '--check', stdout=StringIO())
+        call_command('rebuild_response_counts', stdout=StringIO())
+        self.assertCounts(1, 1, 0)
+        call_command('rebuild_response_counts', '--check', stdout=StringIO())
+
+    def test_home_sorts_by_response_count(self):
+        other = make_question("Autre ?")
+        Response.objects.create(respondent=self.respondent, choice=other.choice_set.first())
+        response = self.client.get(reverse('home'), {'sort': 'response_count', 'order': 'desc'})
+        self.assertEqual([q.pk for q in response.context['page_obj']], [other.pk, self.question.pk])
+
+
+class CursorPaginationTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        # Dates et compteurs en double pour vérifier le départage par id
+        for i in range(14):
+            Question.objects.create(
+                question_text=f"Question {i % 5}", pub_date=now - timezone.timedelta(days=i % 4),
+                response_count=i % 3,
+            )
+
+    def walk(self, sort, order):
+        pages, cursor = [], None
+        while True:
+            params = {'sort': sort, 'order': order}
+            if cursor:
+                params['cursor'] = cursor
+            page_obj = self.client.get(reverse('home'), params).context['page_obj']
+            pages.append(page_obj)
+            if not page_obj.has_next:
+                return pages
+            cursor = page_obj.next_cursor
+
+    def test_every_sort_key_visits_each_question_once(self):
+        for sort in ('pub_date', 'question_text', 'response_count'):
+            for order in ('asc', 'desc'):
+                with self.subTest(sort=sort, order=order):
+                    pages = self.walk(sort, order)
+                    seen = [q.pk for page_obj in pages for q in page_obj]
+                    self.assertEqual(len(pages), 3)
+                    self.assertCountEqual(seen, Question.objects.values_list('pk', flat=True))
+
+                    # Le curseur « précédent » redonne exactement la page d'avant
+                    previous = self.client.get(reverse('home'), {
+                        'sort': sort, 'order': order, 'cursor': pages[1].previous_cursor,
+                    }).context['page_obj']
+                    self.assertEqual([q.pk for q in previous], [q.pk for q in pages[0]])
+                    self.assertFalse(previous.has_previous)
+
+    def test_invalid_cursor_and_sort_fall_back_to_first_page(self):
+        response = self.client.get(reverse('home'), {'sort': 'creator__password', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['current_sort'], 'pub_date')
+        self.assertFalse(response.context['page_obj'].has_previous)
+
+    def test_null_cursor_value_falls_back_to_first_page(self):
+        questions, key = sort_key_for(Question.objects.all(), 'question_text')
+        paginator = CursorPaginator(questions, key, 6)
+        cursor = paginator.encode_cursor('n', type('Row', (), {'sort_text': None, 'pk': 1})())
+        self.assertIsNone(paginator.decode_cursor(cursor))
+        response = self.client.get(reverse('home'), {'sort': 'question_text', 'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page_obj'].has_previous)
+
+    def test_question_list_is_paginated(self):
+        user = User.objects.create_user('bob', password='secret-pass')
+        for i in range(25):
+            make_question(f"Sondage {i:02d}", creator=user, choices=())
+        self.client.force_login(user)
+        page_obj = self.client.get(reverse('question_list')).context['page_obj']
+        self.assertEqual(len(page_obj), 20)
+        next_page = self.client.get(reverse('question_list'), {'cursor': page_obj.next_cursor}).context['page_obj']
+        self.assertEqual([q.question_text for q in next_page], [f"Sondage {i}" for i in range(20, 25)])
+
+    @override_settings(POLL_PAGINATION_MODE='pages')
+    def test_page_number_mode(self):
+        response = self.client.get(reverse('home'), {'page': 3})
+        self.assertEqual(response.context['page_obj'].number, 3)
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+
+class FragmentCacheTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.respondent = Respondent.objects.create(name="Alice")
+
+    def test_home_is_served_from_cache_until_a_response_arrives(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, "<strong>0</strong>")
+        self.assertEqual(fragments.get_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Response.objects.create(respondent=self.respondent, choice=self.question.choice_set.first())
+        self.assertContains(self.client.get(reverse('home')), "<strong>1</strong>")
+
+    def test_question_form_is_invalidated_by_choice_changes(self):
+        url = reverse('question_detail', args=[self.question.pk])
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Choice.objects.create(question=self.question, choice_text="Peut-être")
+        self.assertContains(self.client.get(url), "Peut-être")
+
+    def test_language_is_part_of_the_key(self):
+        Question.objects.filter(pk=self.question.pk).update(question_text_en="English question")
+        self.client.get(reverse('home'))
+        self.client.cookies['django_language'] = 'en'
+        self.assertContains(self.client.get(reverse('home')), "English question")
+
+
+class ResultsTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        sport, music = Interest.objects.create(name="Sport"), Interest.objects.create(name="Musique")
+        both = Respondent.objects.create(name="Alice")
+        both.interests.set([sport, music])
+        sporty = Respondent.objects.create(name="Bruno")
+        sporty.interests.set([sport])
+        nothing = Respondent.objects.create(name="Chloé")
+        Response.objects.create(respondent=both, choice=self.yes)
+        Response.objects.create(respondent=sporty, choice=self.yes)
+        Response.objects.create(respondent=nothing, choice=self.no)
+        self.user = User.objects.create_user('bob', password='secret-pass')
+
+    def test_counts_percentages_and_breakdown(self):
+        # Choix, répartition (réponses récentes et archivées), centres d'intérêt
+        with self.assertNumQueries(4):
+            results = question_results(self.question)
+        self.assertEqual(results['total'], 3)
+        self.assertEqual([(r['count'], r['percent']) for r in results['choices']], [(2, 66.7), (1, 33.3)])
+        self.assertEqual(
+            [(str(r['interest']) if r['interest'] else None, r['counts']) for r in results['breakdown']],
+            [("Sport", [2, 0]), ("Musique", [1, 0]), (None, [0, 1])],
+        )
+
+    def test_admin_page_does_not_load_responses(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('question_detail', args=[self.question.pk]))
+        self.assertContains(response, "66.7")
+        self.assertNotContains(response, "Chloé")
+
+    def test_responses_are_paginated(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('question_responses', args=[self.question.pk]))
+        self.assertContains(response, "Chloé")
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class ExportTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('bob', password='secret-pass')
+        self.question = make_question(creator=self.user)
+        sport = Interest.objects.create(name="Sport")
+        for i in range(5):
+            respondent = Respondent.objects.create(name=f"R{i}", email=f"r{i}@example.com")
+            if i % 2:
+                respondent.interests.add(sport)
+            Response.objects.create(respondent=respondent, choice=self.question.choice_set.first())
+
+    def test_csv_is_streamed_with_interests(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_responses', args=[self.question.pk]))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[2].endswith(',Sport'))
+
+    def test_other_users_cannot_export(self):
+        self.client.force_login(User.objects.create_user('eve', password='secret-pass'))
+        response = self.client.get(reverse('export_responses', args=[self.question.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_writes_ndjson_in_chunks(self):
+        out = StringIO()
+        # Réponses archivées (aucune), puis 3 paquets de réponses avec leurs centres d'intérêt
+        with self.assertNumQueries(5):
+            call_command('export_responses', '--format', 'ndjson', '--chunk-size', '2', stdout=out, stderr=StringIO())
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['respondent_name'] for row in rows], [f"R{i}" for i in range(5)])
+        self.assertEqual(rows[1]['interests'], ["Sport"])
+
+
+class IngestTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        self.sport = Interest.objects.create(name="Sport")
+        self.existing = Respondent.objects.create(name="Ancien nom", email="alice@example.com")
+        self.user = User.objects.create_user('bob', password='secret-pass')
+        self.user.user_permissions.add(Permission.objects.get(codename='add_response'))
+        self.client.force_login(self.user)
+
+    def post(self, records):
+        return self.client.post(reverse('ingest_responses'), json.dumps(records), content_type='application/json')
+
+    def test_batch_is_ingested_with_per_record_errors(self):
+        records = [
+            {'name': "Alice", 'email': "alice@example.com", 'choice': self.yes.pk, 'interests': [self.sport.pk]},
+            {'name': "Anonyme", 'choice': self.no.pk},
+            {'name': "Carla", 'email': "carla@example.com", 'choice': self.yes.pk},
+            {'name': "Carla", 'email': "carla@example.com", 'choice': self.no.pk},
+            {'name': "", 'choice': 999999},
+            {'name': "Dan", 'email': "pas-un-email", 'choice': self.yes.pk, 'interests': [123456]},
+        ]
+        # Dont 5 pour les agrégats horaires et quotidiens (mise à jour, lecture, création en bloc + savepoint)
+        with self.assertNumQueries(25):
+            response = self.post(records)
+        result = response.json()
+        self.assertEqual(result['created'], 4)
+        self.assertEqual([error['index'] for error in result['errors']], [4, 5])
+        self.assertEqual(set(result['errors'][1]['errors']), {'email', 'interests'})
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Alice")
+        self.assertEqual(list(self.existing.interests.all()), [self.sport])
+        self.assertEqual(Respondent.objects.filter(email="carla@example.com").count(), 1)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.response_count, 4)
+
+    def test_requires_permission(self):
+        self.client.force_login(User.objects.create_user('eve', password='secret-pass'))
+        self.assertEqual(self.post([]).status_code, 403)
+
+    def test_command_reads_ndjson(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'reponses.ndjson')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(5):
+                f.write(json.dumps({'name': f"R{i}", 'choice': self.yes.pk}) + '\n')
+        out = StringIO()
+        call_command('ingest_responses', path, '--batch-size', '2', stdout=out, stderr=StringIO())
+        self.assertIn("5 réponse(s) importée(s)", out.getvalue())
+        self.yes.refresh_from_db()
+        self.assertEqual(self.yes.response_count, 5)
+
+
+class SubmissionQueryBudgetTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.yes = self.question.choice_set.first()
+        self.sport, self.music = Interest.objects.create(name="Sport"), Interest.objects.create(name="Musique")
+        self.url = reverse('question_detail', args=[self.question.pk])
+
+    def submit(self, **data):
+        return self.client.post(self.url, {'name': "Alice", 'choice': self.yes.pk, **data})
+
+    def test_new_respondent(self):
+        # question, choix du formulaire, centres d'intérêt du formulaire, puis dans la transaction :
+        # recherche par email, répondant, centres d'intérêt, réponse, 2 compteurs (+ savepoint),
+        # agrégats horaires et quotidiens : mise à jour, lecture, création (+ savepoint)
+        with self.assertNumQueries(16):
+            response = self.submit(email="alice@example.com", interests=[self.sport.pk, self.music.pk])
+        self.assertRedirects(response, reverse('home'))
+        respondent = Respondent.objects.get()
+        self.assertEqual(set(respondent.interests.all()), {self.sport, self.music})
+
+    def test_returning_respondent_only_writes_changes(self):
+        self.submit(email="alice@example.com", interests=[self.sport.pk])
+        # Catalogues du formulaire déjà en mémoire ; même nom, mêmes centres d'intérêt :
+        # pas d'UPDATE ni de DELETE/INSERT des centres d'intérêt ; agrégats déjà créés : un seul UPDATE
+        with self.assertNumQueries(9):
+            self.submit(email="alice@example.com", interests=[self.sport.pk])
+        with self.assertNumQueries(12):
+            self.submit(name="Alice B.", email="alice@example.com", interests=[self.music.pk])
+
+        respondent = Respondent.objects.get()
+        self.assertEqual(respondent.name, "Alice B.")
+        self.assertEqual(list(respondent.interests.all()), [self.music])
+        self.assertEqual(Response.objects.filter(respondent=respondent).count(), 3)
+
+    def test_submissions_without_email_are_distinct_respondents(self):
+        self.submit()
+        self.submit(name="Bruno")
+        self.assertEqual(Respondent.objects.count(), 2)
+
+
+class MediaCleanupTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def make_respondent(self, filename="photo.jpg"):
+        return Respondent.objects.create(name="Alice", image=SimpleUploadedFile(filename, b"image"))
+
+    def path(self, respondent_or_name):
+        name = getattr(respondent_or_name, 'image', respondent_or_name)
+        return os.path.join(self.media_root, str(name))
+
+    def test_delete_is_queued_then_processed(self):
+        respondent = self.make_respondent()
+        path = self.path(respondent)
+        respondent.delete()
+        self.assertTrue(os.path.exists(path))
+        # L'original et ses deux miniatures (absentes ici)
+        self.assertEqual(process_deletions(), (3, 0))
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaDeletion.objects.exists())
+
+    def test_replacing_image_queues_old_file_without_rereading_row(self):
+        respondent = self.make_respondent()
+        old_path = self.path(respondent)
+        respondent.image = SimpleUploadedFile("nouvelle.jpg", b"image")
+        # UPDATE de la ligne puis INSERT dans la file, sans SELECT préalable
+        with self.assertNumQueries(2):
+            respondent.save(update_fields=['image'])
+        self.assertEqual(MediaDeletion.objects.values_list('name', flat=True).first(), "respondents/photo.jpg")
+        process_deletions()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(self.path(respondent)))
+
+    def test_rolled_back_delete_keeps_file(self):
+        respondent = self.make_respondent()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            respondent.delete()
+            raise RuntimeError
+        self.assertFalse(MediaDeletion.objects.exists())
+        self.assertTrue(os.path.exists(self.path(respondent)))
+
+    def test_sweeper_finds_unreferenced_files(self):
+        kept = self.make_respondent()
+        orphan = self.make_respondent("orpheline.jpg")
+        Respondent.objects.filter(pk=orphan.pk).update(image='')
+
+        self.assertEqual(sweep_orphans(), [])  # délai de grâce
+        self.assertEqual(sweep_orphans(grace=timezone.timedelta(0)), ["respondents/orpheline.jpg"])
+        process_deletions()
+        self.assertFalse(os.path.exists(self.path("respondents/orpheline.jpg")))
+        self.assertTrue(os.path.exists(self.path(kept)))
+
+
+@override_settings(RESPONDENT_IMAGE_MAX_SIZE=200)
+class ImageDerivativeTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def jpeg(self):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "Appareil"  # Make
+        Image.new('RGB', (800, 400), 'red').save(buffer, format='JPEG', exif=exif)
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue())
+
+    def test_derivatives_are_built_outside_the_request(self):
+        respondent = Respondent.objects.create(name="Alice", image=self.jpeg())
+        self.assertEqual(respondent.small_image_url, respondent.image.url)
+
+        self.assertEqual(process_images(), (1, 0))
+        respondent.refresh_from_db()
+        self.assertTrue(respondent.small_image_url.endswith("derivatives/photo.jpg_small.webp"))
+
+        with Image.open(os.path.join(self.media_root, respondent.image.name)) as original:
+            self.assertEqual(original.size, (200, 100))
+            self.assertEqual(dict(original.getexif()), {})
+        with Image.open(os.path.join(self.media_root, variant_name(respondent.image.name, 'small'))) as small:
+            self.assertEqual((small.format, small.size), ('WEBP', (96, 96)))
+        self.assertEqual(process_images(), (0, 0))
+
+    def test_derivatives_are_queued_for_deletion_with_the_original(self):
+        respondent = Respondent.objects.create(name="Alice", image=self.jpeg())
+        process_images()
+        respondent.delete()
+        process_deletions()
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'respondents', 'derivatives')), [])
+
+    def test_unreadable_file_is_not_retried(self):
+        respondent = Respondent.objects.create(name="Alice", image=SimpleUploadedFile("faux.jpg", b"pas une image"))
+        with self.assertLogs('main_app.media', 'WARNING'):
+            self.assertEqual(process_images(), (0, 1))
+        self.assertEqual(process_images(), (0, 0))
+        respondent.refresh_from_db()
+        self.assertEqual(respondent.small_image_url, respondent.image.url)
+
+    def test_failure_mark_fits_the_longest_image_name(self):
+        max_length = Respondent._meta.get_field('image').max_length
+        name = "x" * (max_length - len("respondents/.jpg")) + ".jpg"
+        respondent = Respondent.objects.create(name="Alice", image=SimpleUploadedFile(name, b"pas une image"))
+        self.assertEqual(len(respondent.image.name), max_length)
+        with self.assertLogs('main_app.media', 'WARNING'):
+            self.assertEqual(process_images(), (0, 1))
+        respondent.refresh_from_db()
+        self.assertTrue(respondent.processed_image.startswith(FAILED_MARK))
+        self.assertLessEqual(
+            len(respondent.processed_image), Respondent._meta.get_field('processed_image').max_length,
+        )
+        self.assertEqual(process_images(), (0, 0))
+
+
+class AdminChangelistTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='secret-pass'))
+        self.question = make_question("Préférez-vous le thé ?")
+        sport = Interest.objects.create(name="Sport")
+        for i in range(20):
+            respondent = Respondent.objects.create(name=f"Alice {i}" if i % 2 else f"Bruno {i}")
+            respondent.interests.add(sport)
+            Response.objects.create(respondent=respondent, choice=self.question.choice_set.first())
+
+    def test_respondent_changelist_has_no_n_plus_one(self):
+        url = reverse('admin:main_app_respondent_changelist')
+        with CaptureQueriesContext(connection) as captured:
+            self.assertContains(self.client.get(url), "Sport")
+        Respondent.objects.create(name="Chloé").interests.add(Interest.objects.get())
+        with self.assertNumQueries(len(captured)):
+            self.client.get(url)
+
+    def test_respondent_search_uses_prefix_indexes(self):
+        queries = CaptureQueriesContext(connection)
+        with queries:
+            self.client.get(reverse('admin:main_app_respondent_changelist'), {'q': "ali"})
+        searches = [query['sql'] for query in queries.captured_queries if 'LIKE' in query['sql']]
+        self.assertTrue(searches)
+        with connection.cursor() as cursor:
+            for sql in searches:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                self.assertNotIn('SCAN main_app_respondent', plan)
+
+    def test_response_search_by_name_and_question(self):
+        url = reverse('admin:main_app_response_changelist')
+        self.assertEqual(self.client.get(url, {'q': "alice"}).context['cl'].result_count, 10)
+        self.assertEqual(self.client.get(url, {'q': "préférez"}).context['cl'].result_count, 20)
+        self.assertEqual(self.client.get(url, {'q': "lice"}).context['cl'].result_count, 0)
+
+    def test_estimated_count_is_capped_for_filtered_lists(self):
+        paginator = EstimatedCountPaginator(Response.objects.filter(pk__gt=0).order_by('pk'), 5)
+        paginator.COUNT_LIMIT = 7
+        self.assertEqual(paginator.count, 7)
+        paginator = EstimatedCountPaginator(Response.objects.order_by('pk'), 5)
+        paginator.COUNT_LIMIT = 7
+        # Table entière : estimation (plus grand rowid sans ANALYZE)
+        self.assertEqual(paginator.count, Response.objects.order_by('-pk').values_list('pk', flat=True).first())
+
+
+class RespondentsListTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        sport = Interest.objects.create(name="Sport")
+        for i in range(30):
+            Respondent.objects.create(name=f"Répondant {i:02d}").interests.add(sport)
+
+    def test_paginated_with_prefetched_interests(self):
+        # page (colonnes affichées) + centres d'intérêt préchargés
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('respondents'))
+        self.assertEqual(len(response.context['page_obj']), 25)
+        self.assertContains(response, "Répondant 29")
+        self.assertNotContains(response, "Répondant 04")
+        next_page = self.client.get(reverse('respondents'), {'cursor': response.context['page_obj'].next_cursor})
+        self.assertContains(next_page, "Répondant 04")
+
+    def test_streamed_full_list(self):
+        from . import views
+        respondents = Respondent.objects.prefetch_related('interests')
+        request = self.client.get(reverse('respondents')).wsgi_request
+        # une lecture par curseur + un préchargement des centres d'intérêt par paquet
+        with self.assertNumQueries(4):
+            chunks = list(views.stream_respondents(request, respondents, chunk_size=10))
+        # en-tête, 3 paquets de lignes, fin de page
+        self.assertEqual(len(chunks), 5)
+        html = ''.join(chunks)
+        self.assertEqual(html.count("<tr>"), 31)
+        self.assertIn("</html>", chunks[-1])
+
+    def test_all_parameter_streams(self):
+        response = self.client.get(reverse('respondents'), {'all': 1})
+        self.assertTrue(response.streaming)
+        self.assertIn("Répondant 00", b''.join(response.streaming_content).decode())
+
+
+class AsyncViewTests(PollTestCase):
+    # Les vues asynchrones sont choisies au chargement des URL (ASYNC_VIEWS)
+    def setUp(self):
+        super().setUp()
+        # Rechargées après la fin de override_settings (nettoyages exécutés en ordre inverse)
+        self.addCleanup(self.reload_urls)
+        self.enterContext(override_settings(ASYNC_VIEWS=True))
+        self.reload_urls()
+        self.question = make_question("Question asynchrone ?")
+        self.choice = self.question.choice_set.first()
+
+    def reload_urls(self):
+        from main_app import urls as app_urls
+        from projet_travail2 import urls as project_urls
+        importlib.reload(app_urls)
+        importlib.reload(project_urls)
+        clear_url_caches()
+
+    async def test_home_and_question_form(self):
+        from . import async_views
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.resolver_match.func, async_views.home)
+        self.assertContains(response, "Question asynchrone ?")
+
+        response = await self.async_client.get(reverse('question_detail', args=[self.question.pk]))
+        self.assertContains(response, 'name="choice"')
+        # Second affichage : fragment servi depuis le cache
+        await self.async_client.get(reverse('question_detail', args=[self.question.pk]))
+        self.assertEqual(fragments.get_stats()['hits'], 1)
+
+    async def test_vote(self):
+        url = reverse('vote', args=[self.question.pk])
+        response = await self.async_client.post(url, {'choice': self.choice.pk})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        await self.async_client.post(url, {'choice': self.choice.pk})
+        self.assertEqual(await sync_to_async(get_tally)(self.choice.pk), 2)
+        response = await self.async_client.post(url, {})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_submission(self):
+        url = reverse('question_detail', args=[self.question.pk])
+        response = await self.async_client.post(url, {'name': "Alice", 'choice': self.choice.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(await Response.objects.filter(choice=self.choice).acount(), 1)
+        response = await self.async_client.post(url, {'name': "", 'choice': self.choice.pk})
+        self.assertEqual(response.status_code, 200)
+
+    async def test_authenticated_results(self):
+        user = await User.objects.acreate_user('auteur', password='motdepasse')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('question_detail', args=[self.question.pk]))
+        self.assertEqual(response.context['results']['total'], 0)
+        response = await self.async_client.get(reverse('home'))
+        self.assertNotContains(response, "Question asynchrone ?")
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # Deux fichiers SQLite : la base de test (principale) et une copie figée (réplica en retard)
+    def setUp(self):
+        cache.clear()
+        self.question = make_question("Question répliquée ?")
+        connection.close()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        replica_name = os.path.join(directory, 'replica.sqlite3')
+        shutil.copyfile(connection.settings_dict['NAME'], replica_name)
+
+        # Connexion ajoutée pour ce seul thread, sans toucher à settings.DATABASES
+        replica = connections.create_connection('default')
+        replica.alias = 'replica'
+        replica.settings_dict = dict(replica.settings_dict, NAME=replica_name)
+        connections['replica'] = replica
+        self.addCleanup(self.remove_replica)
+        self.enterContext(override_settings(DATABASE_REPLICAS=['replica']))
+        # Écrite après la copie : absente du réplica
+        self.recent = make_question("Question récente ?")
+        instrumentation.reset_query_counts()
+
+    def remove_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+
+    def test_reads_go_to_replica(self):
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, "Question répliquée ?")
+        self.assertNotContains(response, "Question récente ?")
+        counts = instrumentation.query_counts()
+        self.assertGreater(counts.get('replica', 0), 0)
+        self.assertNotIn('default', counts)
+
+    def test_client_reads_own_writes_after_post(self):
+        choice = self.recent.choice_set.first()
+        response = self.client.post(reverse('vote', args=[self.recent.pk]), {'choice': choice.pk})
+        self.assertEqual(response.status_code, 302)
+        instrumentation.reset_query_counts()
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, "Question récente ?")
+        self.assertNotIn('replica', instrumentation.query_counts())
+
+        # Fenêtre écoulée : retour au réplica (fragment de l'accueil recalculé)
+        self.client.cookies.pop('poll_primary_until')
+        cache.clear()
+        response = self.client.get(reverse('home'))
+        self.assertNotContains(response, "Question récente ?")
+
+    def test_commands_and_transactions_use_primary(self):
+        self.assertTrue(Question.objects.filter(pk=self.recent.pk).exists())
+        with transaction.atomic():
+            self.assertTrue(Question.objects.filter(pk=self.recent.pk).exists())
+        self.assertEqual(instrumentation.query_counts().keys(), {'default'})
+
+
+class SharedCacheCheckTests(PollTestCase):
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual(check_shared_cache(None), [])
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([warning.id for warning in check_shared_cache(None)], ['main_app.W001'])
+
+    def test_stats_are_seen_by_another_process(self):
+        fragments.get_or_render(('accueil',), lambda: "<p>liste</p>")
+        fragments.get_or_render(('accueil',), lambda: "<p>liste</p>")
+        # Commande lancée dans un processus séparé : elle lit le même cache
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'fragment_cache_stats'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        self.assertIn("Succès : 1  Échecs : 1", result.stdout)
+
+
+class HotPathIndexTests(PollTestCase):
+    # Plan d'exécution (EXPLAIN) des requêtes les plus fréquentes
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('auteur', password='motdepasse')
+        self.question = make_question(creator=self.user)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'USING (COVERING )?INDEX {index_name}', plan)
+
+    def test_home_queries(self):
+        self.assertUsesIndex(Question.objects.order_by('-pub_date', '-pk')[:7], 'question_pub_date_idx')
+        self.assertUsesIndex(
+            Question.objects.filter(creator=self.user).order_by('-pub_date', '-pk')[:7], 'question_creator_pub_idx',
+        )
+        self.assertUsesIndex(
+            Question.objects.filter(creator=self.user).order_by('-response_count', '-pk')[:7],
+            'question_creator_count_idx',
+        )
+
+    def test_respondent_queries(self):
+        self.assertUsesIndex(Respondent.objects.filter(email_key='alice@exemple.fr'), 'main_app_respondent_email_key')
+        self.assertUsesIndex(Respondent.objects.order_by('-submitted_at', '-pk')[:26], 'respondent_submitted_idx')
+
+    def test_home_text_sort_queries(self):
+        # Expression du tri identique à celle de l'index : pas de tri en table temporaire
+        for language in ('fr', 'en'):
+            with self.subTest(language=language), translation.override(language):
+                questions, key = sort_key_for(Question.objects.all(), 'question_text')
+                queryset = questions.filter(sort_text__gt="M").order_by(key, 'pk')[:7]
+                self.assertUsesIndex(queryset, f'question_sort_{language}_idx')
+                self.assertNotIn('TEMP B-TREE', queryset.explain())
+                questions, key = sort_key_for(Question.objects.filter(creator=self.user), 'question_text')
+                queryset = questions.order_by(f'-{key}', '-pk')[:7]
+                self.assertUsesIndex(queryset, f'question_creator_sort_{language}_idx')
+                self.assertNotIn('TEMP B-TREE', queryset.explain())
+
+    def test_admin_prefix_search_queries(self):
+        # Index déclarés dans Meta.indexes : conservés par les reconstructions de table (0023)
+        self.assertUsesIndex(Respondent.objects.filter(name__istartswith='al'), 'respondent_name_search_idx')
+        self.assertUsesIndex(Respondent.objects.filter(email__istartswith='al'), 'respondent_email_search_idx')
+        self.assertUsesIndex(Question.objects.filter(question_text_fr__istartswith='pré'), 'question_text_fr_search_idx')
+        self.assertUsesIndex(Choice.objects.filter(choice_text_en__istartswith='te'), 'choice_text_en_search_idx')
+
+    def test_response_queries(self):
+        self.assertUsesIndex(
+            Response.objects.filter(choice__question=self.question).order_by('-answered_at', '-pk')[:26],
+            'response_choice_answered_idx',
+        )
+
+    def test_email_key_deduplicates_respondents(self):
+        choice = self.question.choice_set.first()
+        url = reverse('question_detail', args=[self.question.pk])
+        self.client.post(url, {'name': "Alice", 'email': "Alice@Exemple.fr", 'choice': choice.pk})
+        self.client.post(url, {'name': "Alice", 'email': "alice@exemple.FR", 'choice': choice.pk})
+        self.assertEqual(Respondent.objects.get().email_key, "alice@exemple.fr")
+
+        ingest_records([{'name': "Alice", 'email': "ALICE@exemple.fr", 'choice': choice.pk}])
+        self.assertEqual(Respondent.objects.count(), 1)
+        self.assertEqual(Response.objects.count(), 3)
+
+
+class SeedDataTests(PollTestCase):
+    def test_seed_volumes(self):
+        call_command(
+            'seed_data', users=3, questions=5, choices=2, respondents=10, interests=4, responses=40,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Choice.objects.count(), 10)
+        self.assertEqual(Response.objects.count(), 40)
+        self.assertFalse(Question.objects.filter(creator=None).exists())
+        # Insertions en bloc : compteurs dénormalisés et clés d'email tout de même renseignés
+        self.assertEqual(sum(Question.objects.values_list('response_count', flat=True)), 40)
+        self.assertFalse(Respondent.objects.filter(email_key=None).exists())
+
+    def test_second_run_only_adds_to_its_own_rows(self):
+        options = dict(users=2, questions=3, choices=2, respondents=5, interests=2, responses=10, stdout=StringIO())
+        call_command('seed_data', **options)
+        first_questions = set(Question.objects.values_list('pk', flat=True))
+        call_command('seed_data', **options)
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(Respondent.objects.count(), 10)
+        self.assertEqual(Respondent.objects.values('email_key').distinct().count(), 10)
+        # Pas de choix ajoutés aux sondages du premier passage
+        self.assertEqual(Choice.objects.filter(question_id__in=first_questions).count(), 6)
+        self.assertEqual(Choice.objects.count(), 12)
+        self.assertEqual(Response.objects.count(), 20)
+
+    def test_seed_after_deletions_keeps_names_unique(self):
+        options = dict(users=2, questions=1, choices=2, respondents=3, interests=1, responses=3, stdout=StringIO())
+        call_command('seed_data', **options)
+        User.objects.order_by('pk').first().delete()
+        Respondent.objects.order_by('pk').first().delete()
+        call_command('seed_data', **options)
+        self.assertEqual(User.objects.values('username').distinct().count(), 3)
+        self.assertEqual(Respondent.objects.values('email_key').distinct().count(), 5)
+
+    def test_failed_seed_leaves_nothing(self):
+        with mock.patch.object(Respondent.interests.through.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                call_command('seed_data', users=2, questions=3, choices=2, respondents=5, interests=2,
+                             responses=10, stdout=StringIO())
+        self.assertFalse(Question.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0, REQUEST_METRICS_SLOW_MS=10_000, REQUEST_METRICS_MAX_QUERIES=50)
+class RequestMetricsTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+
+    def test_server_timing_header(self):
+        with self.assertLogs('main_app.requests', 'INFO') as logs:
+            response = self.client.get(reverse('question_detail', args=[self.question.pk]))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries default=\d+"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+, total;dur=[\d.]+')
+        record, = logs.records
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertEqual(record.metrics['status'], 200)
+        self.assertGreater(record.metrics['template_ms'], 0)
+
+    @override_settings(REQUEST_METRICS_MAX_QUERIES=1)
+    def test_slow_request_logs_slowest_queries(self):
+        with self.assertLogs('main_app.requests', 'WARNING') as logs:
+            self.client.get(reverse('question_detail', args=[self.question.pk]))
+        record, = logs.records
+        self.assertIn("Requête lente", record.getMessage())
+        self.assertTrue(record.metrics['slowest_queries'])
+        self.assertIn('SELECT', record.metrics['slowest_queries'][0]['sql'])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_has_no_details(self):
+        with self.assertLogs('main_app.requests', 'INFO') as logs:
+            response = self.client.get(reverse('home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertNotIn('queries', logs.records[0].metrics)
+
+
+class FormCatalogTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question(choices=())
+        self.yes = Choice.objects.create(question=self.question, choice_text_fr="Oui", choice_text_en="Yes")
+        self.maybe = Choice.objects.create(question=self.question, choice_text_fr="Peut-être")
+        self.sport = Interest.objects.create(name_fr="Sport")
+
+    def test_warm_catalog_costs_no_queries(self):
+        RespondentForm(question=self.question)
+        with self.assertNumQueries(0):
+            html = str(RespondentForm(question=self.question))
+            form = RespondentForm(
+                {'name': "Alice", 'choice': self.yes.pk, 'interests': [self.sport.pk]}, question=self.question,
+            )
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertIn("Oui", html)
+        self.assertEqual(form.cleaned_data['choice'].pk, self.yes.pk)
+        self.assertEqual(form.cleaned_data['choice'].question_id, self.question.pk)
+        self.assertEqual([interest.pk for interest in form.cleaned_data['interests']], [self.sport.pk])
+
+    def test_change_made_by_another_worker_is_seen(self):
+        self.assertEqual(catalogs.choice_catalog(self.question.pk)[0], (self.yes.pk, "Oui"))
+        # Modification sans signal ici : la version est incrémentée par un autre processus
+        Choice.objects.filter(pk=self.yes.pk).update(choice_text_fr="Oui, tout à fait")
+        subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c',
+             f"from main_app import fragments; fragments.bump_versions(fragments.question_scope({self.question.pk}))"],
+            cwd=settings.BASE_DIR, check=True,
+        )
+        self.assertEqual(catalogs.choice_catalog(self.question.pk)[0], (self.yes.pk, "Oui, tout à fait"))
+
+    def test_unknown_choice_is_rejected(self):
+        other = make_question("Autre ?")
+        form = RespondentForm({'name': "Alice", 'choice': other.choice_set.first().pk}, question=self.question)
+        self.assertFalse(form.is_valid())
+        self.assertIn('choice', form.errors)
+
+    def test_catalog_per_language_with_fallback(self):
+        with translation.override('en'):
+            english = catalogs.choice_catalog(self.question.pk)
+        self.assertEqual(english, ((self.yes.pk, "Yes"), (self.maybe.pk, "Peut-être")))
+        self.assertEqual(catalogs.choice_catalog(self.question.pk), ((self.yes.pk, "Oui"), (self.maybe.pk, "Peut-être")))
+
+    def test_catalog_follows_version_bumps(self):
+        catalogs.interest_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            music = Interest.objects.create(name_fr="Musique")
+        self.assertIn((music.pk, "Musique"), catalogs.interest_catalog())
+
+
+class IdempotencyTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.choice = self.question.choice_set.first()
+        self.url = reverse('question_detail', args=[self.question.pk])
+
+    def test_form_carries_a_fresh_key(self):
+        first = self.client.get(self.url).context['idempotency_key']
+        second = self.client.get(self.url).context['idempotency_key']
+        self.assertRegex(first, idempotency.KEY_PATTERN)
+        self.assertNotEqual(first, second)
+
+    def test_double_submission_is_short_circuited(self):
+        data = {'name': "Alice", 'choice': self.choice.pk, 'idempotency_key': idempotency.new_key()}
+        self.assertRedirects(self.client.post(self.url, data), reverse('home'))
+        # Aucune requête SQL pour le doublon
+        with self.assertNumQueries(1):  # lecture de la question
+            response = self.client.post(self.url, data)
+        self.assertRedirects(response, reverse('home'))
+        self.assertEqual(Response.objects.count(), 1)
+        self.assertEqual(idempotency.get_stats()['submission'], {'cache': 1, 'database': 0})
+
+    def test_invalid_form_releases_key(self):
+        key = idempotency.new_key()
+        response = self.client.post(self.url, {'name': "", 'choice': self.choice.pk, 'idempotency_key': key})
+        self.assertEqual(response.status_code, 200)
+        self.client.post(self.url, {'name': "Alice", 'choice': self.choice.pk, 'idempotency_key': key})
+        self.assertEqual(Response.objects.count(), 1)
+
+    def test_unique_constraint_stops_duplicates_missed_by_cache(self):
+        key = idempotency.new_key()
+        vote_url = reverse('vote', args=[self.question.pk])
+        self.client.post(vote_url, {'choice': self.choice.pk}, headers={'Idempotency-Key': key})
+        cache.clear()  # autre processus, ou clé évincée du cache
+        self.client.post(vote_url, {'choice': self.choice.pk}, headers={'Idempotency-Key': key})
+        self.assertEqual(get_tally(self.choice.pk), 1)
+        self.assertEqual(idempotency.get_stats()['vote'], {'cache': 0, 'database': 1})
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        vote_url = reverse('vote', args=[self.question.pk])
+        self.client.post(vote_url, {'choice': self.choice.pk})
+        self.client.post(vote_url, {'choice': self.choice.pk})
+        self.assertEqual(get_tally(self.choice.pk), 2)
+
+
+@override_settings(LIVE_RESULTS_INTERVAL=0.01, LIVE_RESULTS_HEARTBEAT=0.5)
+class LiveResultsTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+
+    async def test_subscribers_share_one_source(self):
+        loads = []
+        load_tallies = live.load_tallies
+
+        async def counting_load(question_id):
+            loads.append(question_id)
+            return await load_tallies(question_id)
+
+        with mock.patch.object(live, 'load_tallies', counting_load):
+            first = live.broadcaster(self.question.pk).subscribe()
+            second = live.broadcaster(self.question.pk).subscribe()
+            # Premier événement : état complet
+            for subscription in (first, second):
+                tallies, changed = await subscription.__anext__()
+                self.assertEqual(changed, {
+                    self.yes.pk: {'responses': 0, 'votes': 0}, self.no.pk: {'responses': 0, 'votes': 0},
+                })
+            self.assertEqual(len(live._broadcasters), 1)
+
+            await sync_to_async(record_vote)(self.yes.pk)
+            respondent = await Respondent.objects.acreate(name="Alice")
+            await Response.objects.acreate(respondent=respondent, choice=self.no)
+            # Puis uniquement les choix modifiés
+            for subscription in (first, second):
+                seen = {}
+                while len(seen) < 2:
+                    _, changed = await subscription.__anext__()
+                    seen.update(changed)
+                self.assertEqual(seen, {
+                    self.yes.pk: {'responses': 0, 'votes': 1}, self.no.pk: {'responses': 1, 'votes': 0},
+                })
+
+            await first.aclose()
+            await second.aclose()
+        self.assertEqual(live._broadcasters, {})
+        # Les deux abonnés ont été servis par les lectures de la source partagée
+        self.assertEqual(set(loads), {self.question.pk})
+
+    async def test_stream_view(self):
+        url = reverse('results_stream', args=[self.question.pk])
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 403)
+
+        user = await User.objects.acreate_user('auteur', password='motdepasse')
+        await self.async_client.aforce_login(user)
+        with override_settings(ASYNC_VIEWS=True):
+            response = await self.async_client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertTrue((await anext(content)).startswith(b'retry: '))
+        event = (await anext(content)).decode()
+        self.assertTrue(event.startswith('event: tally\ndata: '))
+        data = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(data['total'], 0)
+        self.assertEqual(set(data['choices']), {str(self.yes.pk), str(self.no.pk)})
+        # Aucun changement : battement de cœur
+        self.assertEqual(await anext(content), b': ping\n\n')
+        # Client déconnecté : le serveur abandonne la réponse, l'abonnement est finalisé
+        await content.aclose()
+        del response, content
+        gc.collect()
+        await asyncio.sleep(0.05)
+        self.assertEqual(live._broadcasters, {})
+
+    def test_stream_view_under_wsgi_sends_one_state(self):
+        user = User.objects.create_user('auteur', password='motdepasse')
+        self.client.force_login(user)
+        response = self.client.get(reverse('results_stream', args=[self.question.pk]))
+        with self.assertWarns(Warning):
+            content = b''.join(response).decode()
+        self.assertEqual(content.count('event: tally'), 1)
+        self.assertEqual(live._broadcasters, {})
+
+    def test_concurrent_wsgi_streams_each_send_one_state(self):
+        # Sous WSGI, chaque réponse lit son flux dans sa propre boucle d'événements
+        tallies = {self.yes.pk: {'responses': 2, 'votes': 1}, self.no.pk: {'responses': 1, 'votes': 0}}
+        results, errors = [], []
+
+        async def consume():
+            return [chunk async for chunk in live.stream(self.question.pk, follow=False)]
+
+        def worker():
+            try:
+                results.append(asyncio.run(consume()))
+            except Exception as exc:
+                errors.append(exc)
+
+        async def slow_load(question_id):
+            # Lectures simultanées : les quatre flux se chevauchent
+            await asyncio.sleep(0.05)
+            return tallies
+
+        with mock.patch.object(live, 'load_tallies', slow_load):
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 4)
+        for chunks in results:
+            self.assertEqual(len(chunks), 2)
+            self.assertEqual(json.loads(chunks[1].split('data: ', 1)[1])['total'], 3)
+        self.assertEqual(live._broadcasters, {})
+
+    def test_each_event_loop_has_its_own_source(self):
+        async def key():
+            return live.broadcaster(self.question.pk).key
+
+        try:
+            first, second = asyncio.run(key()), asyncio.run(key())
+            self.assertNotEqual(first, second)
+            self.assertEqual(first[1], self.question.pk)
+        finally:
+            live._broadcasters.clear()
+
+
+class ResponseRollupTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        self.alice = Respondent.objects.create(name="Alice")
+
+    def rollups(self, period):
+        return dict(
+            ResponseRollup.objects.filter(period=period).values_list('choice_id', 'count')
+        )
+
+    def test_rollups_follow_responses(self):
+        Response.objects.create(respondent=self.alice, choice=self.yes)
+        response = Response.objects.create(respondent=self.alice, choice=self.yes)
+        Response.objects.bulk_create([Response(respondent=self.alice, choice=self.no)])
+        self.assertEqual(self.rollups('hour'), {self.yes.pk: 2, self.no.pk: 1})
+        self.assertEqual(self.rollups('day'), {self.yes.pk: 2, self.no.pk: 1})
+
+        response.choice = self.no
+        response.save()
+        self.assertEqual(self.rollups('day'), {self.yes.pk: 1, self.no.pk: 2})
+        response.delete()
+        self.assertEqual(self.rollups('hour'), {self.yes.pk: 1, self.no.pk: 1})
+        self.assertEqual(rebuild_rollups(dry_run=True), [])
+
+    def test_rebuild_repairs_history(self):
+        two_days_ago = timezone.now() - timezone.timedelta(days=2)
+        Response.objects.create(respondent=self.alice, choice=self.yes)
+        Response.objects.create(respondent=self.alice, choice=self.no)
+        # Historique modifié sans signaux (import, correction en base)
+        Response.objects.filter(choice=self.no).update(answered_at=two_days_ago)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_response_rollups', '--check', stdout=StringIO())
+
+        call_command('rebuild_response_rollups', '--chunk-size', '1', stdout=StringIO())
+        self.assertEqual(rebuild_rollups(dry_run=True), [])
+        self.assertEqual(
+            ResponseRollup.objects.get(choice=self.no, period='day').bucket,
+            two_days_ago.replace(hour=0, minute=0, second=0, microsecond=0),
+        )
+
+    def test_timeseries_reads_rollups_only(self):
+        Response.objects.create(respondent=self.alice, choice=self.yes)
+        Response.objects.create(respondent=self.alice, choice=self.no)
+        user = User.objects.create_user('auteur', password='motdepasse')
+        self.client.force_login(user)
+        url = reverse('question_timeseries', args=[self.question.pk])
+
+        # question, choix, agrégats (+ session et utilisateur)
+        with self.assertNumQueries(5):
+            data = self.client.get(url, {'period': 'day'}).json()
+        self.assertEqual(len(data['buckets']), settings.TIMESERIES_DEFAULT_BUCKETS)
+        today = data['buckets'][-1]
+        self.assertEqual(today['total'], 2)
+        self.assertEqual(today['choices'], {str(self.yes.pk): 1, str(self.no.pk): 1})
+        self.assertEqual(data['buckets'][0]['total'], 0)
+        hours = self.client.get(url, {'period': 'hour'}).json()['buckets']
+        self.assertEqual(len(hours), settings.TIMESERIES_DEFAULT_BUCKETS)
+        self.assertEqual(hours[-1]['total'], 2)
+
+        data = self.client.get(url, {
+            'period': 'hour', 'start': '2026-01-01T00:00:00', 'end': '2026-01-01T06:00:00',
+        }).json()
+        self.assertEqual([bucket['start'] for bucket in data['buckets']][:2], [
+            '2026-01-01T00:00:00+00:00', '2026-01-01T01:00:00+00:00',
+        ])
+        self.assertEqual(len(data['buckets']), 6)
+
+        self.assertEqual(self.client.get(url, {'period': 'week'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'period': 'hour', 'start': '2020-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'end': '2026-02-30T00:00:00'}).status_code, 400)
+
+
+class SearchTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bike = make_question("Quel vélo préférez-vous ?", choices=("Route", "Montagne"))
+        self.bike.question_text_en = "Which bike do you prefer?"
+        self.bike.save()
+        self.holidays = make_question("Où partir en vacances ?", choices=("Mer", "Montagne"))
+        self.food = make_question("Plat préféré ?", choices=("Raclette", "Fondue"))
+
+    def results(self, query, page=1):
+        return list(search.search(query, page))
+
+    def check_search(self):
+        # Sans accents, en anglais, dans le texte des choix, préfixe du dernier mot
+        self.assertEqual(self.results("velo"), [self.bike])
+        self.assertEqual(self.results("bike prefer"), [self.bike])
+        self.assertEqual(self.results("raclette"), [self.food])
+        self.assertEqual(self.results("vac"), [self.holidays])
+        self.assertEqual(self.results("vélo raclette"), [])
+        # Mot présent dans les choix des deux questions, et dans le texte d'une nouvelle :
+        # la question l'emporte sur les choix
+        mountain = make_question("Montagne ou plage ?", choices=("Oui", "Non"))
+        self.assertEqual(self.results("montagne")[0], mountain)
+        self.assertEqual(set(self.results("montagne")), {mountain, self.bike, self.holidays})
+
+        self.bike.question_text = "Quelle trottinette ?"
+        self.bike.save()
+        self.assertEqual(self.results("velo"), [])
+        self.food.choice_set.get(choice_text="Raclette").delete()
+        self.assertEqual(self.results("raclette"), [])
+        self.holidays.delete()
+        self.assertEqual(self.results("vacances"), [])
+
+    def test_fts5_search(self):
+        self.assertEqual(search.backend(), 'fts5')
+        self.check_search()
+
+    @override_settings(SEARCH_BACKEND='terms')
+    def test_inverted_index_search(self):
+        search.rebuild_index()
+        self.check_search()
+
+    def test_frequent_terms_are_sorted_by_date(self):
+        newer = make_question("Plat du jour ?")
+        with override_settings(SEARCH_RANK_MAX_MATCHES=1):
+            self.assertEqual(self.results("plat"), [newer, self.food])
+
+    @override_settings(SEARCH_PAGE_SIZE=2)
+    def test_pagination_and_view(self):
+        for i in range(3):
+            make_question(f"Sondage numéro {i} ?")
+        self.assertTrue(search.search("sondage", 1).has_next)
+        page = search.search("sondage", 2)
+        self.assertEqual(len(page), 1)
+        self.assertFalse(page.has_next)
+        self.assertTrue(page.has_previous)
+
+        response = self.client.get(reverse('search'), {'q': "vélo"})
+        self.assertContains(response, "Quel vélo préférez-vous ?")
+        response = self.client.get(reverse('search'), {'q': "sondage", 'page': 'x'})
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertEqual(len(self.client.get(reverse('search')).context['page_obj']), 0)
+
+    def test_bulk_inserts_need_a_rebuild(self):
+        Question.objects.bulk_create([Question(question_text="Importée en bloc ?", pub_date=timezone.now())])
+        self.assertEqual(self.results("importee"), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.results("importee")), 1)
+        self.assertEqual(self.results("velo"), [self.bike])
+
+
+class DataTransferTests(PollTestCase):
+    fixture = os.path.join(settings.BASE_DIR, 'main_app', 'fixtures', 'initial_data.json')
+
+    def import_file(self, path, *args):
+        out = StringIO()
+        call_command('import_data', path, *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_data', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_parsers_read_records_across_chunks(self):
+        records = [{'model': 'main_app.interest', 'pk': i, 'fields': {'name': f"Centre [{i}], « {i} »"}} for i in range(20)]
+        array = ''.join(transfer.iter_json_array(records))
+        ndjson = ''.join(transfer.iter_ndjson(records))
+        with mock.patch.object(transfer, 'READ_CHUNK', 7):
+            self.assertEqual(list(transfer.read_records(StringIO(array), 'json')), records)
+            self.assertEqual(list(transfer.read_records(StringIO(ndjson), 'ndjson')), records)
+            self.assertEqual(list(transfer.read_records(StringIO(' [ ] '), 'json')), [])
+            with self.assertRaises(ValueError):
+                list(transfer.read_records(StringIO(array[:-10]), 'json'))
+
+    def test_fixture_import_rebuilds_derived_data(self):
+        output = self.import_file(self.fixture, '--batch-size', '4')
+        self.assertIn("admin.logentry : 97 ignoré(s)", output)
+        self.assertEqual(Question.objects.count(), 8)
+        self.assertEqual(Choice.objects.count(), 28)
+        # Compteurs absents de la fixture : recalculés, comme les agrégats et l'index
+        for question in Question.objects.all():
+            self.assertEqual(question.response_count, Response.objects.filter(choice__question=question).count())
+        self.assertEqual(sum(ResponseRollup.objects.filter(period='day').values_list('count', flat=True)), 6)
+        self.assertEqual(search.search("origine").object_list, [Question.objects.get(pk=1)])
+        self.assertEqual(list(User.objects.get(username='Simon').groups.values_list('name', flat=True)), ['basic'])
+        respondent = Respondent.objects.get(email='contact@contact.com')
+        self.assertEqual(respondent.email_key, 'contact@contact.com')
+        self.assertEqual(list(respondent.interests.values_list('pk', flat=True)), [1])
+
+    def test_round_trip_preserves_everything(self):
+        user = User.objects.create_user('bob', password='secret-pass')
+        group = Group.objects.create(name='editeurs')
+        group.permissions.add(Permission.objects.get(codename='add_question'))
+        question = make_question(creator=user)
+        respondent = Respondent.objects.create(name="Alice", email="alice@example.com")
+        respondent.interests.add(Interest.objects.create(name="Sport"))
+        Response.objects.create(respondent=respondent, choice=question.choice_set.first())
+        exported = self.export('--format', 'ndjson', '--chunk-size', '2')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.ndjson')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(exported)
+            User.objects.all().delete()
+            Group.objects.all().delete()
+            Respondent.objects.all().delete()
+            Interest.objects.all().delete()
+            self.import_file(path)
+
+        self.assertEqual(self.export('--format', 'ndjson'), exported)
+        self.assertEqual(Question.objects.get().response_count, 1)
+        self.assertTrue(Group.objects.get(name='editeurs').permissions.filter(codename='add_question').exists())
+
+    def test_failed_import_saves_nothing(self):
+        records = [
+            {'model': 'main_app.interest', 'pk': 1, 'fields': {'name': "Sport"}},
+            {'model': 'main_app.question', 'pk': 1, 'fields': {'question_text': "?", 'creator': 99, 'pub_date': '2025-01-01T00:00:00Z'}},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(records, f)
+            with self.assertRaises(CommandError):
+                self.import_file(path)
+        self.assertFalse(Interest.objects.exists())
+
+
+class PurgeTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user('bob', password='secret-pass')
+        self.question = make_question("Sondage à supprimer ?", creator=self.owner)
+        self.kept = make_question("Sondage conservé ?", creator=User.objects.create_user('eve', password='secret-pass'))
+        self.respondent = Respondent.objects.create(name="Alice")
+        for choice in [*self.question.choice_set.all(), *self.kept.choice_set.all()]:
+            for _ in range(3):
+                Response.objects.create(respondent=self.respondent, choice=choice)
+        record_vote(self.question.choice_set.first().pk)
+
+    def purge(self, chunk_size=2):
+        out = StringIO()
+        call_command('run_purge_jobs', '--chunk-size', str(chunk_size), stdout=out)
+        return out.getvalue()
+
+    def assertPurged(self, question):
+        self.assertFalse(Question.all_objects.filter(pk=question.pk).exists())
+        self.assertFalse(Choice.objects.filter(question_id=question.pk).exists())
+        self.assertFalse(Response.objects.filter(choice__question_id=question.pk).exists())
+        self.assertFalse(ResponseRollup.objects.filter(choice__question_id=question.pk).exists())
+        self.assertFalse(VoteShard.objects.filter(choice__question_id=question.pk).exists())
+
+    def test_question_is_hidden_then_purged_in_chunks(self):
+        self.client.force_login(self.owner)
+        self.client.post(reverse('delete_question', args=[self.question.pk]))
+        # Marquée seulement : invisible, dépendances toujours là
+        self.assertFalse(Question.objects.filter(pk=self.question.pk).exists())
+        self.assertEqual(Response.objects.filter(choice__question=self.question).count(), 6)
+        self.assertEqual(self.client.get(reverse('question_detail', args=[self.question.pk])).status_code, 404)
+        self.assertEqual(search.search("supprimer").object_list, [])
+        self.assertEqual(ingest_records([{'name': "X", 'choice': self.question.choice_set.first().pk}])['created'], 0)
+
+        self.assertIn("1 purge(s) terminée(s)", self.purge())
+        self.assertPurged(self.question)
+        job = PurgeJob.objects.get()
+        self.assertIsNotNone(job.finished_at)
+        self.assertGreaterEqual(job.deleted_rows, 6 + 2)
+        self.assertEqual(Response.objects.filter(choice__question=self.kept).count(), 6)
+        self.assertTrue(Respondent.objects.filter(pk=self.respondent.pk).exists())
+        self.assertEqual(self.purge(), "0 purge(s) terminée(s), 0 interrompue(s).\n")
+
+    def test_only_the_creator_can_delete_with_a_post(self):
+        url = reverse('delete_question', args=[self.question.pk])
+        self.client.post(url)
+        self.client.force_login(User.objects.get(username='eve'))
+        self.assertEqual(self.client.post(url).status_code, 403)
+        # Un lien ou un préchargement ne suffit pas
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertContains(self.client.get(reverse('question_list')), f'action="{url}" method="post"')
+        self.assertTrue(Question.objects.filter(pk=self.question.pk).exists())
+        self.assertFalse(PurgeJob.objects.exists())
+
+    def test_user_deletion_and_resume_after_failure(self):
+        admin = User.objects.create_user('root', password='secret-pass')
+        admin.groups.add(Group.objects.get_or_create(name='admin')[0])
+        self.client.force_login(admin)
+        self.client.post(reverse('delete_users'), {'user_id': self.owner.pk})
+        self.owner.refresh_from_db()
+        self.assertFalse(self.owner.is_active)
+        self.assertFalse(Question.objects.filter(creator=self.owner).exists())
+        self.assertNotContains(self.client.get(reverse('delete_users')), 'bob')
+
+        # Échec après les réponses : les lots validés ne sont pas refaits, la purge reprend
+        delete_chunks = purge._delete_chunks
+
+        def fail_after_responses(job, queryset, chunk_size):
+            if queryset.model is not Response:
+                raise OSError("disque plein")
+            delete_chunks(job, queryset, chunk_size)
+
+        with mock.patch.object(purge, '_delete_chunks', fail_after_responses), self.assertLogs('main_app.purge'):
+            self.assertIn("1 interrompue(s)", self.purge())
+        job = PurgeJob.objects.get()
+        self.assertEqual((job.attempts, job.last_error, job.finished_at), (1, "disque plein", None))
+        self.assertEqual(job.deleted_rows, 6)
+        self.assertFalse(Response.objects.filter(choice__question_id=self.question.pk).exists())
+        self.assertTrue(Choice.objects.filter(question_id=self.question.pk).exists())
+
+        self.purge()
+        self.assertPurged(self.question)
+        self.assertFalse(User.objects.filter(pk=self.owner.pk).exists())
+        self.assertTrue(Question.objects.filter(pk=self.kept.pk).exists())
+
+
+class ArchiveTests(PollTestCase):
+    def setUp(self):
+        super().setUp()
+        self.question = make_question()
+        self.yes, self.no = self.question.choice_set.order_by('pk')
+        self.sport = Interest.objects.create(name="Sport")
+        self.respondents = []
+        for i, choice in enumerate([self.yes, self.yes, self.no, self.yes]):
+            respondent = Respondent.objects.create(name=f"R{i}")
+            respondent.interests.set([self.sport] if i % 2 else [])
+            Response.objects.create(respondent=respondent, choice=choice)
+            self.respondents.append(respondent)
+        # Trois réponses anciennes, une récente
+        Response.objects.exclude(respondent=self.respondents[-1]).update(answered_at=timezone.now() - timezone.timedelta(days=400))
+        rebuild_rollups()
+
+    def test_old_responses_are_moved_and_still_counted(self):
+        results = question_results(self.question)
+        export = [json.loads(line) for line in ''.join(iter_ndjson(iter_response_rows())).splitlines()]
+        out = StringIO()
+        call_command('archive_responses', '--chunk-size', '2', stdout=out)
+        self.assertIn("3 réponse(s) archivée(s)", out.getvalue())
+        self.assertEqual(Response.objects.count(), 1)
+        self.assertEqual(ArchivedResponse.objects.count(), 3)
+
+        # Compteurs, agrégats, résultats et export inchangés
+        self.yes.refresh_from_db()
+        self.assertEqual(self.yes.response_count, 3)
+        self.assertEqual(rebuild_response_counts(dry_run=True), [])
+        self.assertEqual(rebuild_rollups(dry_run=True), [])
+        self.assertEqual(question_results(self.question), results)
+        rows = [json.loads(line) for line in ''.join(iter_ndjson(iter_response_rows())).splitlines()]
+        self.assertEqual(sorted(rows, key=lambda row: row['response_id']), export)
+        self.assertEqual(archive_responses(), 0)
+
+    def test_deleting_a_respondent_updates_counters(self):
+        archive_responses()
+        self.respondents[0].delete()
+        self.yes.refresh_from_db()
+        self.assertEqual(self.yes.response_count, 2)
+        self.assertEqual(rebuild_rollups(dry_run=True), [])
+
+    def test_closed_poll_is_archived_entirely(self):
+        other = make_question("Autre ?")
+        Response.objects.create(respondent=self.respondents[0], choice=other.choice_set.first())
+        call_command('archive_responses', '--question', str(self.question.pk), stdout=StringIO())
+        self.assertFalse(Response.objects.filter(choice__question=self.question).exists())
+        self.assertEqual(ArchivedResponse.objects.count(), 4)
+        self.assertEqual(Response.objects.count(), 1)
@@ -0,0 +1,306 @@
+import datetime
+import decimal
+import json
+import re
+import uuid
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.color import no_style
+from django.core.serializers import sort_dependencies
+from django.db import connection, transaction
+from django.utils import translation
+
+from . import fragments, search
+from .bulk import insert_rows
+from .counters import rebuild_response_counts
+from .models import Choice, Question, Respondent, Response, normalize_email
+from .rollups import rebuild_rollups
+
+# Import/export en flux de toutes les données (modèles de main_app, utilisateurs
+# et groupes), au format des fixtures Django : tableau JSON (lisible par
+# loaddata) ou NDJSON (un objet par ligne). Contrairement à dumpdata/loaddata,
+# rien n'est chargé en entier en mémoire : l'export lit les tables par paquets
+# de clés primaires, l'import analyse le fichier au fil de la lecture et insère
+# par lots. Les lignes sont insérées telles quelles, comme le fait loaddata
+# (save_base(raw=True) : pas de auto_now_add) mais sans passer par save() :
+# aucun signal d'enregistrement n'est envoyé, sans rien débrancher pour les
+# autres requêtes du processus. Les données dérivées (compteurs, agrégats, index
+# de recherche) sont recalculées une fois à la fin de l'import.
+
+# Données recalculées après l'import, ou propres à une installation (files d'attente)
+EXCLUDED_MODELS = {
+    'main_app.responserollup', 'main_app.searchterm', 'main_app.mediadeletion', 'main_app.idempotencykey',
+}
+READ_CHUNK = 64 * 1024
+WHITESPACE = re.compile(r'\s*')
+
+
+def transfer_models():
+    # Ordre des dépendances : un objet n'est écrit qu'après ceux qu'il référence
+    models = [Group, User] + [
+        model for model in apps.get_app_config('main_app').get_models()
+        if model._meta.label_lower not in EXCLUDED_MODELS
+    ]
+    return sort_dependencies([(None, models)], allow_cycles=True)
+
+
+def _many_to_many(model):
+    return [field for field in model._meta.local_many_to_many if field.remote_field.through._meta.auto_created]
+
+
+def _through_columns(field):
+    through = field.remote_field.through
+    return (
+        through._meta.get_field(field.m2m_field_name()).attname,
+        through._meta.get_field(field.m2m_reverse_field_name()).attname,
+    )
+
+
+def _permission_keys():
+    # Les identifiants des permissions varient d'une base à l'autre : clés naturelles
+    rows = Permission.objects.values_list('pk', 'codename', 'content_type__app_label', 'content_type__model')
+    return {pk: [codename, app_label, model] for pk, codename, app_label, model in rows}
+
+
+def _model_records(model, chunk_size, permission_keys):
+    fields = [field for field in model._meta.local_fields if field.serialize]
+    relations = _many_to_many(model)
+    rows = model._base_manager.order_by('pk').values_list('pk', *[field.attname for field in fields])
+    last_pk = None
+    while True:
+        chunk = list((rows if last_pk is None else rows.filter(pk__gt=last_pk))[:chunk_size])
+        if not chunk:
+            return
+        pks = [row[0] for row in chunk]
+        # Relations multiples : une requête par paquet et par champ
+        related = {}
+        for field in relations:
+            source, target = _through_columns(field)
+            values = {}
+            links = (
+                field.remote_field.through.objects.filter(**{f'{source}__in': pks})
+                .order_by(source, target).values_list(source, target)
+            )
+            for pk, target_pk in links:
+                if field.related_model is Permission:
+                    target_pk = permission_keys[target_pk]
+                values.setdefault(pk, []).append(target_pk)
+            related[field.name] = values
+
+        for pk, *values in chunk:
+            data = {field.name: value for field, value in zip(fields, values)}
+            data.update({name: values.get(pk, []) for name, values in related.items()})
+            yield {'model': model._meta.label_lower, 'pk': pk, 'fields': data}
+        last_pk = pks[-1]
+
+
+def iter_records(chunk_size=2000):
+    # Champs traduits : le champ d'origine est lu et écrit dans la langue par défaut
+    with translation.override(settings.LANGUAGE_CODE):
+        permission_keys = _permission_keys()
+        for model in transfer_models():
+            yield from _model_records(model, chunk_size, permission_keys)
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        # Pas de troncature aux millisecondes (DjangoJSONEncoder) : les curseurs comparent les dates exactes
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Type non exportable : {type(value).__name__}")
+
+
+def _dumps(record):
+    return json.dumps(record, default=_default, ensure_ascii=False)
+
+
+def iter_json_array(records):
+    yield '['
+    separator = '\n'
+    for record in records:
+        yield separator + _dumps(record)
+        separator = ',\n'
+    yield '\n]\n'
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield _dumps(record) + '\n'
+
+
+TRANSFER_FORMATS = {'json': iter_json_array, 'ndjson': iter_ndjson}
+
+
+def _chunks(stream):
+    return iter(lambda: stream.read(READ_CHUNK), '')
+
+
+def _ndjson_records(chunks):
+    rest = ''
+    for chunk in chunks:
+        lines = (rest + chunk).split('\n')
+        rest = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if rest.strip():
+        yield json.loads(rest)
+
+
+def _json_array_records(chunks):
+    # Analyse incrémentale d'un tableau JSON : un objet est décodé dès qu'il est
+    # entièrement lu, seul l'objet en cours de lecture reste en mémoire
+    decoder = json.JSONDecoder()
+    buffer, position, expected = '', 0, '['
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ValueError("Fin de fichier inattendue : tableau JSON incomplet.")
+            buffer, position = chunk, 0
+            continue
+        char = buffer[position]
+        if expected == '[':
+            if char != '[':
+                raise ValueError("Tableau JSON attendu.")
+            position, expected = position + 1, 'first'
+        elif char == ']' and expected in ('first', 'next'):
+            return
+        elif expected == 'next':
+            if char != ',':
+                raise ValueError(f"',' ou ']' attendu, {char!r} trouvé.")
+            position, expected = position + 1, 'value'
+        else:
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Objet coupé par la fin du paquet lu : on complète et on recommence
+                chunk = next(chunks, None)
+                if chunk is None:
+                    raise
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield record
+            position, expected = end, 'next'
+
+
+def read_records(stream, format):
+    chunks = _chunks(stream)
+    return _ndjson_records(chunks) if format == 'ndjson' else _json_array_records(chunks)
+
+
+class _Loader:
+    def __init__(self, batch_size, progress):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.models = {model._meta.label_lower: model for model in transfer_models()}
+        self.permissions = {
+            (codename, app_label, model): pk for pk, (codename, app_label, model) in _permission_keys().items()
+        }
+        self.counts = Counter()
+        self.skipped = Counter()
+        self.model, self.objects, self.links = None, [], []
+        self.question_ids = []
+
+    def add(self, record):
+        if not isinstance(record, dict) or 'model' not in record:
+            raise ValueError(f"Objet de fixture attendu, {record!r} trouvé.")
+        model = self.models.get(record['model'])
+        if model is None:
+            # Tables gérées par les migrations (types de contenu, permissions) ou recalculées
+            self.skipped[record['model']] += 1
+            return
+        if model is not self.model or len(self.objects) >= self.batch_size:
+            self.flush()
+            self.model = model
+        if record.get('pk') is None:
+            raise ValueError(f"{record['model']} : clé primaire manquante.")
+
+        data, relations = {model._meta.pk.attname: model._meta.pk.to_python(record['pk'])}, {}
+        for name, value in record.get('fields', {}).items():
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValueError(f"{record['model']} : champ inconnu « {name} ».")
+            if field.many_to_many:
+                relations[field] = value
+            elif field.is_relation:
+                data[field.attname] = None if value is None else field.target_field.to_python(value)
+            else:
+                data[field.attname] = field.to_python(value)
+        obj = model(**data)
+        if model is Question:
+            self.question_ids.append(obj.pk)
+        if model is Respondent and 'email_key' not in record.get('fields', {}):
+            # Fixtures antérieures à la clé de déduplication (renseignée par save())
+            obj.email_key = normalize_email(obj.email)
+        self.objects.append(obj)
+        for field, values in relations.items():
+            source, target = _through_columns(field)
+            through = field.remote_field.through
+            self.links += [through(**{source: obj.pk, target: self._target(field, value)}) for value in values]
+
+    def _target(self, field, value):
+        if isinstance(value, list):
+            try:
+                return self.permissions[tuple(value)]
+            except KeyError:
+                raise ValueError(f"Permission inconnue : {value}.")
+        return field.target_field.to_python(value)
+
+    def flush(self):
+        if not self.objects:
+            return
+        fields = self.model._meta.concrete_fields
+        batch_size = max(1, min(self.batch_size, connection.ops.bulk_batch_size(fields, self.objects)))
+        for start in range(0, len(self.objects), batch_size):
+            # Insertion brute en une requête par lot, valeurs conservées telles quelles
+            insert_rows(self.model, self.objects[start:start + batch_size], fields, using=connection.alias)
+        links_by_model = {}
+        for link in self.links:
+            links_by_model.setdefault(type(link), []).append(link)
+        for through, links in links_by_model.items():
+            through.objects.bulk_create(links, batch_size=self.batch_size)
+        self.counts[self.model._meta.label_lower] += len(self.objects)
+        self.objects, self.links = [], []
+        if self.progress:
+            self.progress(self.model, self.counts)
+
+
+def rebuild_derived_data(question_ids=()):
+    rebuild_response_counts()
+    rebuild_rollups()
+    search.rebuild_index()
+    fragments.bump_versions(
+        fragments.LISTING, fragments.INTERESTS, *[fragments.question_scope(pk) for pk in question_ids],
+    )
+
+
+def import_records(records, batch_size=1000, progress=None):
+    # Tout ou rien, comme loaddata : une transaction, contraintes vérifiées à la fin
+    # (les références en avant d'un fichier hors ordre sont donc acceptées)
+    loader = _Loader(batch_size, progress)
+    with translation.override(settings.LANGUAGE_CODE), transaction.atomic():
+        with connection.constraint_checks_disabled():
+            for record in records:
+                loader.add(record)
+            loader.flush()
+        models = [loader.models[label] for label in loader.counts]
+        tables = [model._meta.db_table for model in models]
+        tables += [field.remote_field.through._meta.db_table for model in models for field in _many_to_many(model)]
+        connection.check_constraints(table_names=tables)
+
+        # Clés primaires imposées : les séquences (PostgreSQL) repartent après la plus grande
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+        if {Question, Choice, Response} & set(models):
+            rebuild_derived_data(loader.question_ids)
+    return loader.counts, loader.skipped
@@ -1,14 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 from django.contrib.auth import views as auth_views
 
+# Point d'entrée ASGI : versions asynchrones des pages les plus fréquentées
+poll_views = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.home, name='home'),
+    path('', poll_views.home, name='home'),
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
-    path('question/<int:question_id>/', views.question_detail, name='question_detail'),
+    path('question/<int:question_id>/', poll_views.question_detail, name='question_detail'),
+    path('question/<int:question_id>/results/stream/', async_views.results_stream, name='results_stream'),
+    path('question/<int:question_id>/responses/', views.question_responses, name='question_responses'),
+    path('question/<int:question_id>/timeseries/', views.question_timeseries, name='question_timeseries'),
+    path('question/<int:question_id>/export/', views.export_responses, name='export_responses'),
+    path('api/responses/batch/', views.ingest_responses, name='ingest_responses'),
+    path('search/', views.search_questions, name='search'),
     path('respondents/', views.respondents_list, name='respondents'),
-    path('question/<int:question_id>/vote/', views.vote, name='vote'),
+    path('question/<int:question_id>/vote/', poll_views.vote, name='vote'),
     path('login/', auth_views.LoginView.as_view(template_name='main_app/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='home'), name='logout'),
     path('register/', views.register, name='register'),
@@ -1,44 +1,99 @@
+import json
+
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import HttpResponse, HttpResponseForbidden
-from django.db.models import Count
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
+from django.conf import settings
+from modeltranslation.utils import get_language
 
 from main_app.forms import ChoiceForm, ContactForm, QuestionForm, RespondentForm, UserUpdateForm
-from .models import Choice, Question, Respondent, Response
+from .models import Choice, Question, Respondent, Response, question_sort_text
+from . import fragments, idempotency
+from .exports import EXPORT_FORMATS, iter_response_rows
+from .ingest import ingest_records
+from .pagination import CursorPaginator
+from .purge import soft_delete_question, soft_delete_user
+from .results import question_results
+from .rollups import PERIODS, bucket_start, timeseries
+from .search import search
+from .submission import submit_response
+from .votes import record_vote
 from django.contrib.auth.models import User
 
 from django.contrib.auth.forms import UserCreationForm
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required, permission_required, user_passes_test
 from django.contrib.auth import login
 
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 
-def home(request):
+HOME_SORT_KEYS = ('pub_date', 'question_text', 'response_count')
+
+def sort_key_for(queryset, sort_param):
+    # Le texte traduit peut être vide : on trie sur le texte affiché, expression indexée par langue
+    if sort_param != 'question_text':
+        return queryset, sort_param
+    return queryset.annotate(sort_text=question_sort_text(get_language())), 'sort_text'
+
+def home_sort(request):
     sort_param = request.GET.get('sort', 'pub_date')  # par défaut tri par date
     sort_order = request.GET.get('order', 'desc')     # par défaut décroissant
+    if sort_param not in HOME_SORT_KEYS:
+        sort_param = 'pub_date'
+    if sort_order not in ('asc', 'desc'):
+        sort_order = 'desc'
+    return sort_param, sort_order
+
+def home_fragment_parts(request, listing_version, sort_param, sort_order):
+    return (
+        'home', listing_version, get_language(), settings.POLL_PAGINATION_MODE,
+        sort_param, sort_order, request.GET.get('page', ''), request.GET.get('cursor', ''),
+    )
+
+def home(request):
+    sort_param, sort_order = home_sort(request)
 
-    order_prefix = '-' if sort_order == 'desc' else ''
-    sort_field = f"{order_prefix}{sort_param}"
+    def render_polls():
+        # Afficher selon l'état de connexion
+        if request.user.is_authenticated:
+            questions = Question.objects.filter(creator=request.user)
+        else:
+            questions = Question.objects.all()
+
+        if settings.POLL_PAGINATION_MODE == 'pages':
+            # response_count est un compteur dénormalisé et indexé : pas d'agrégation ici
+            order_prefix = '-' if sort_order == 'desc' else ''
+            questions = questions.order_by(f"{order_prefix}{sort_param}")
+            paginator = Paginator(questions, 6)
+            page_obj = paginator.get_page(request.GET.get('page'))
+        else:
+            questions, key = sort_key_for(questions, sort_param)
+            paginator = CursorPaginator(questions, key, 6, descending=sort_order == 'desc')
+            page_obj = paginator.get_page(request.GET.get('cursor'))
+
+        return render_to_string('main_app/_home_polls.html', {
+            'page_obj': page_obj,
+            'current_sort': sort_param,
+            'current_order': sort_order,
+        })
 
-    # Afficher selon l'état de connexion
     if request.user.is_authenticated:
-        questions = Question.objects.filter(creator=request.user)
+        polls_html = render_polls()
     else:
-        questions = Question.objects.all()
-
-    questions = questions.annotate(
-        response_count=Count('choice__response')
-    ).order_by(sort_field)
-
-    paginator = Paginator(questions, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        # Les visiteurs anonymes voient tous la même liste : fragment mis en cache
+        listing_version, = fragments.get_versions(fragments.LISTING)
+        polls_html = fragments.get_or_render(
+            home_fragment_parts(request, listing_version, sort_param, sort_order), render_polls,
+        )
 
     return render(request, 'main_app/home.html', {
-        'page_obj': page_obj,
+        'polls_html': mark_safe(polls_html),
         'current_sort': sort_param,
         'current_order': sort_order,
     })
@@ -59,82 +114,218 @@ def contact(request):
         'form': form
     })
 
+# Recherche plein texte des sondages, résultats classés par pertinence
+def search_questions(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    return render(request, 'main_app/search.html', {
+        'query': query,
+        'page_obj': search(query, page),
+    })
+
+RESPONDENT_ROWS_MARKER = '<!-- lignes -->'
+
 def respondents_list(request):
-    respondents = Respondent.objects.all().order_by('-submitted_at')
-    context = {'respondents': respondents}
-    return render(request, 'main_app/respondents_list.html', context)
+    # Seulement les colonnes affichées, centres d'intérêt préchargés
+    respondents = Respondent.objects.only(
+        'id', 'name', 'email', 'submitted_at', 'image', 'processed_image',
+    ).prefetch_related('interests')
+
+    if request.GET.get('all'):
+        return StreamingHttpResponse(stream_respondents(request, respondents))
+
+    page_obj = CursorPaginator(respondents, 'submitted_at', 25).get_page(request.GET.get('cursor'))
+    return render(request, 'main_app/respondents_list.html', {'page_obj': page_obj})
+
+def stream_respondents(request, respondents, chunk_size=500):
+    # Liste complète envoyée au fil de la lecture : la page est coupée autour des
+    # lignes, qui sont rendues et envoyées par paquets. L'en-tête est rendu avant
+    # l'envoi pour que le jeton CSRF soit posé avec la réponse.
+    page = render_to_string('main_app/respondents_list.html', {
+        'streaming': True, 'rows_marker': mark_safe(RESPONDENT_ROWS_MARKER),
+    }, request=request)
+    head, tail = page.split(RESPONDENT_ROWS_MARKER, 1)
+
+    def chunks():
+        yield head
+        chunk = []
+        for respondent in respondents.order_by('-submitted_at', '-pk').iterator(chunk_size=chunk_size):
+            chunk.append(respondent)
+            if len(chunk) >= chunk_size:
+                yield render_to_string('main_app/_respondent_rows.html', {'respondents': chunk})
+                chunk = []
+        if chunk:
+            yield render_to_string('main_app/_respondent_rows.html', {'respondents': chunk})
+        yield tail
+
+    return chunks()
 
 def vote(request, question_id):
     question = get_object_or_404(Question, pk=question_id)
     if request.method == 'POST':
         choice_id = request.POST.get('choice')
         if choice_id:
-            choice = get_object_or_404(Choice, pk=choice_id, question=question)
-            choice.votes += 1
-            choice.save()
+            choice = get_object_or_404(Choice.objects.only('pk'), pk=choice_id, question=question)
+            # Vote renvoyé (double clic, nouvelle tentative) : même redirection, rien n'est compté
+            key = idempotency.request_key(request)
+            if idempotency.claim(key, 'vote'):
+                idempotency.run_once(key, 'vote', lambda: record_vote(choice.pk))
             return redirect('home')
         else:
             return HttpResponse("Vous devez sélectionner une option.", status=400)
     else:
         return HttpResponse("Méthode non autorisée", status=405)
     
+def submit_respondent_form(form, key=None):
+    if not form.is_valid():
+        # La clé est libérée : le formulaire corrigé pourra être renvoyé
+        idempotency.release(key)
+        return False
+    idempotency.run_once(key, 'submission', lambda: submit_response(
+        name=form.cleaned_data['name'],
+        email=form.cleaned_data.get('email'),
+        choice=form.cleaned_data['choice'],
+        interests=form.cleaned_data.get('interests') or (),
+        image=form.cleaned_data.get('image'),
+    ))
+    return True
+
+def question_form_parts(question_id, question_version, interests_version):
+    return ('question_form', question_id, question_version, interests_version, get_language())
+
 def question_detail(request, question_id):
     question = get_object_or_404(Question, pk=question_id)
 
     if request.user.is_authenticated:
-        # Si utilisateur connecté : afficher les réponses à cette question
-        responses = Response.objects.filter(choice__question=question).select_related('respondent', 'choice')
+        # Si utilisateur connecté : afficher les résultats agrégés de cette question,
+        # le détail des réponses est chargé à la demande (question_responses)
         return render(request, 'main_app/question_detail_admin.html', {
             'question': question,
-            'responses': responses,
+            'results': question_results(question),
         })
 
     # Si non connecté : traitement du formulaire
     if request.method == "POST":
+        # Doublon (double clic, nouvelle tentative) : écarté avant toute écriture
+        key = idempotency.request_key(request)
+        if not idempotency.claim(key, 'submission'):
+            return redirect('home')
         form = RespondentForm(request.POST, request.FILES, question=question)
-        if form.is_valid():
-            email = form.cleaned_data.get('email')
-            name = form.cleaned_data.get('name')
-            interests = form.cleaned_data.get('interests')
-            image = form.cleaned_data.get('image')
-
-            # Recherche ou création du respondent
-            respondent, created = Respondent.objects.get_or_create(
-                email=email if email else None,
-                defaults={'name': name, 'image': image}
-            )
-
-            # Si le respondent existait déjà, mettre à jour le nom et l'image si nécessaire
-            if not created:
-                updated = False
-                if respondent.name != name:
-                    respondent.name = name
-                    updated = True
-                if image:
-                    respondent.image = image
-                    updated = True
-                if updated:
-                    respondent.save()
-
-            # Mettre à jour les centres d'intérêt
-            if interests:
-                respondent.interests.set(interests)
-            else:
-                respondent.interests.clear()
-
-            # Créer la réponse
-            choice = form.cleaned_data['choice']
-            Response.objects.create(respondent=respondent, choice=choice)
-
+        if submit_respondent_form(form, key):
             return redirect('home')
+        form_html = render_to_string('main_app/_question_form_fields.html', {'form': form})
     else:
-        form = RespondentForm(question=question)
+        # Formulaire vierge identique pour tous les visiteurs : fragment mis en cache
+        question_version, interests_version = fragments.get_versions(
+            fragments.question_scope(question.pk), fragments.INTERESTS,
+        )
+        form_html = fragments.get_or_render(
+            question_form_parts(question.pk, question_version, interests_version),
+            lambda: render_to_string('main_app/_question_form_fields.html', {
+                'form': RespondentForm(question=question),
+            }),
+        )
 
     return render(request, 'main_app/question_detail.html', {
         'question': question,
-        'form': form,
+        'form_html': mark_safe(form_html),
+        # Hors du fragment en cache : une clé par affichage
+        'idempotency_key': idempotency.new_key(),
     })
 
+# Détail des réponses d'une question, page par page (chargé par question_detail_admin.html)
+@login_required
+def question_responses(request, question_id):
+    question = get_object_or_404(Question, pk=question_id)
+    responses = (
+        Response.objects.filter(choice__question=question)
+        .select_related('respondent', 'choice')
+        .prefetch_related('respondent__interests')
+    )
+    page_obj = CursorPaginator(responses, 'answered_at', 25).get_page(request.GET.get('cursor'))
+    return render(request, 'main_app/_question_responses.html', {
+        'question': question,
+        'page_obj': page_obj,
+    })
+
+def _parse_moment(value):
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        # Bien formée mais impossible (30 février, 25 h...)
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+# Nombre de réponses par heure ou par jour, lu dans les agrégats (main_app/rollups.py)
+# ?period=hour|day&start=...&end=... (dates ISO 8601, fin exclue)
+@login_required
+def question_timeseries(request, question_id):
+    question = get_object_or_404(Question, pk=question_id)
+    period = request.GET.get('period', 'day')
+    if period not in PERIODS:
+        return JsonResponse({'error': "Période inconnue (hour ou day)."}, status=400)
+
+    end = _parse_moment(request.GET['end']) if 'end' in request.GET else timezone.now()
+    if end is None:
+        return JsonResponse({'error': "Intervalle invalide."}, status=400)
+    if 'start' in request.GET:
+        start = _parse_moment(request.GET['start'])
+    else:
+        # Fin arrondie à la tranche suivante : exactement TIMESERIES_DEFAULT_BUCKETS tranches, la courante comprise
+        if bucket_start(period, end) < end:
+            end = bucket_start(period, end) + PERIODS[period]
+        start = end - PERIODS[period] * settings.TIMESERIES_DEFAULT_BUCKETS
+    if start is None or start >= end:
+        return JsonResponse({'error': "Intervalle invalide."}, status=400)
+    if (end - start) / PERIODS[period] > settings.TIMESERIES_MAX_BUCKETS:
+        return JsonResponse({'error': f"Au plus {settings.TIMESERIES_MAX_BUCKETS} tranches par requête."}, status=400)
+
+    return JsonResponse({
+        'question': question.pk,
+        'period': period,
+        'buckets': timeseries(question, period, start, end),
+    })
+
+# Export des réponses d'une question (CSV ou NDJSON), envoyé en flux
+@login_required
+def export_responses(request, question_id):
+    question = get_object_or_404(Question, pk=question_id)
+    if question.creator != request.user and not request.user.is_staff:
+        return HttpResponseForbidden("Vous n'avez pas le droit d'exporter ce sondage.")
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse("Format inconnu.", status=400)
+    serialize, content_type = EXPORT_FORMATS[export_format]
+
+    response = StreamingHttpResponse(serialize(iter_response_rows(question.pk)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="reponses-{question.pk}.{export_format}"'
+    return response
+
+# Import par lots de réponses collectées hors ligne (JSON : liste d'enregistrements)
+@require_POST
+@login_required
+@permission_required('main_app.add_response', raise_exception=True)
+def ingest_responses(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': "JSON invalide."}, status=400)
+
+    records = payload.get('records') if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        return JsonResponse({'error': "Liste d'enregistrements attendue."}, status=400)
+    if len(records) > settings.INGEST_MAX_BATCH:
+        return JsonResponse({'error': f"Au plus {settings.INGEST_MAX_BATCH} enregistrements par lot."}, status=413)
+
+    result = ingest_records(records)
+    return JsonResponse(result, status=400 if result['errors'] and not result['created'] else 200)
+
 def register(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -150,8 +341,9 @@ def register(request):
 @login_required
 def question_list(request):
     # Questions créées par l'utilisateur connecté
-    questions = Question.objects.filter(creator=request.user).order_by('-pub_date').order_by('question_text')
-    return render(request, 'main_app/question_list.html', {'questions': questions})
+    questions, key = sort_key_for(Question.objects.filter(creator=request.user), 'question_text')
+    page_obj = CursorPaginator(questions, key, 20, descending=False).get_page(request.GET.get('cursor'))
+    return render(request, 'main_app/question_list.html', {'questions': page_obj, 'page_obj': page_obj})
 
 # Créer un sondage
 @login_required
@@ -184,9 +376,14 @@ def edit_question(request, pk):
         form = QuestionForm(instance=question)
     return render(request, 'main_app/question_form.html', {'form': form})
 
+@require_POST
+@login_required
 def delete_question(request, pk):
     question = get_object_or_404(Question, pk=pk)
-    question.delete()
+    if question.creator != request.user:
+        return HttpResponseForbidden("Vous n'avez pas le droit de supprimer ce sondage.")
+    # Réponses, choix... effacés plus tard par lots (run_purge_jobs)
+    soft_delete_question(question)
     return redirect('question_list')
 
 # Ajouter un choix
@@ -246,12 +443,13 @@ def is_admin(user):
 @login_required
 @user_passes_test(is_admin)
 def delete_users(request):
-    users = User.objects.exclude(id=request.user.id).exclude(username='Admin').order_by('username')
+    # Comptes désactivés : suppression déjà demandée, en attente de purge
+    users = User.objects.exclude(id=request.user.id).exclude(username='Admin').filter(is_active=True).order_by('username')
 
     if request.method == 'POST':
         user_id = request.POST.get('user_id')
-        user_to_delete = get_object_or_404(User, id=user_id)
-        user_to_delete.delete()
+        user_to_delete = get_object_or_404(User, id=user_id, is_active=True)
+        soft_delete_user(user_to_delete)
         return redirect('delete_users')
 
     return render(request, 'main_app/delete_users.html', {'users': users})
\ No newline at end of file
@@ -0,0 +1,70 @@
+import random
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+
+from .counters import create_or_increment
+from .models import Choice, VoteShard
+
+# Les votes ne modifient jamais directement la ligne Choice : chaque vote
+# incrémente atomiquement un des VOTE_SHARD_COUNT compteurs partiels du choix,
+# ce qui répartit la contention. La table VoteShard sert de tampon partagé entre
+# tous les processus ; flush_votes() reporte les deltas par lots dans Choice.votes.
+# Le total exact d'un choix vaut donc toujours votes + somme des compteurs partiels.
+
+
+def record_vote(choice_id):
+    shard = random.randrange(settings.VOTE_SHARD_COUNT)
+    updated = VoteShard.objects.filter(choice_id=choice_id, shard=shard).update(count=F('count') + 1)
+    if not updated:
+        _create_shard(choice_id, shard)
+
+
+async def arecord_vote(choice_id):
+    shard = random.randrange(settings.VOTE_SHARD_COUNT)
+    updated = await VoteShard.objects.filter(choice_id=choice_id, shard=shard).aupdate(count=F('count') + 1)
+    if not updated:
+        # Premier vote sur ce compteur : création dans une transaction (API synchrone)
+        await sync_to_async(_create_shard)(choice_id, shard)
+
+
+def _create_shard(choice_id, shard):
+    create_or_increment(VoteShard, 'count', 1, choice_id=choice_id, shard=shard)
+
+
+def get_tallies(choice_ids):
+    rows = Choice.objects.filter(pk__in=choice_ids).annotate(
+        pending=Coalesce(Sum('vote_shards__count'), 0)
+    ).values_list('pk', 'votes', 'pending')
+    return {pk: votes + pending for pk, votes, pending in rows}
+
+
+def get_tally(choice_id):
+    return get_tallies([choice_id]).get(choice_id, 0)
+
+
+def flush_votes(batch_size=500):
+    flushed = 0
+    while True:
+        with transaction.atomic():
+            shards = list(
+                VoteShard.objects.select_for_update()
+                .filter(count__gt=0)
+                .values_list('pk', 'choice_id', 'count')[:batch_size]
+            )
+            if not shards:
+                return flushed
+
+            deltas = defaultdict(int)
+            for pk, choice_id, count in shards:
+                # On retire exactement ce qui a été lu : les votes arrivés entre-temps restent dans le compteur
+                VoteShard.objects.filter(pk=pk).update(count=F('count') - count)
+                deltas[choice_id] += count
+
+            for choice_id, delta in deltas.items():
+                Choice.objects.filter(pk=choice_id).update(votes=F('votes') + delta)
+                flushed += delta
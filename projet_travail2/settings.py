@@ -44,7 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main_app.middleware.request_metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'main_app.middleware.replica_routing_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -59,7 +61,8 @@ ROOT_URLCONF = 'projet_travail2.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Moteur Django standard, rendus chronométrés (voir main_app/middleware.py)
+        'BACKEND': 'main_app.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,9 +85,32 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Les écritures concurrentes (votes) attendent le verrou au lieu d'échouer
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Base de test sur fichier : les tests de concurrence ouvrent une connexion par thread
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Réplicas en lecture seule (la réplication elle-même est assurée hors de Django) :
+# POLL_REPLICA_DATABASES="/chemin/replica1.sqlite3,/chemin/replica2.sqlite3"
+DATABASE_REPLICAS = []
+for index, replica_name in enumerate(filter(None, os.environ.get('POLL_REPLICA_DATABASES', '').split(',')), 1):
+    alias = f'replica{index}'
+    DATABASES[alias] = dict(DATABASES['default'], NAME=replica_name.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['main_app.routers.ReplicaRouter']
+
+# Après une requête d'écriture, le même client lit sur la base principale pendant
+# ce délai (en secondes) : il voit ses propres écritures malgré le retard des réplicas
+REPLICA_READ_YOUR_WRITES_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,3 +164,91 @@ LOGIN_REDIRECT_URL = '/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Nombre de compteurs partiels par choix pour les votes (voir main_app/votes.py)
+VOTE_SHARD_COUNT = 8
+
+# Pagination de l'accueil : 'cursor' (keyset, coût constant) ou 'pages' (numéros de page,
+# COUNT(*) + OFFSET, à réserver aux petits volumes)
+POLL_PAGINATION_MODE = 'cursor'
+
+# Cache partagé par tous les processus : les numéros de version du cache de
+# fragments (et des catalogues), les clés d'idempotence et les statistiques y
+# sont stockés. Un cache propre au processus (LocMemCache) laisserait les autres
+# workers servir des données périmées (avertissement main_app.W001). Fichiers
+# locaux pour un seul serveur ; sur plusieurs machines, utiliser Redis ou Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Durée maximale de conservation d'un fragment (l'invalidation se fait par version)
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Nombre maximal d'enregistrements par appel à l'import par lots (api/responses/batch/)
+INGEST_MAX_BATCH = 5000
+
+# Taille maximale (en pixels) des photos de répondants conservées après traitement
+RESPONDENT_IMAGE_MAX_SIZE = 2048
+
+# Vues asynchrones (accueil, sondage, vote) : activées par asgi.py, les vues
+# synchrones restent utilisées derrière WSGI
+ASYNC_VIEWS = os.environ.get('POLL_ASYNC_VIEWS') == '1'
+
+# Durée (en secondes) pendant laquelle la clé d'un envoi (réponse, vote) écarte les doublons
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# Résultats en direct (question/<id>/results/stream/) : fréquence de relecture des
+# compteurs, partagée par tous les abonnés d'un sondage, et battement de cœur (secondes)
+LIVE_RESULTS_INTERVAL = 1.0
+LIVE_RESULTS_HEARTBEAT = 15
+# Délai de reconnexion suggéré au navigateur (millisecondes)
+LIVE_RESULTS_RETRY_MS = 3000
+
+# Séries temporelles (question/<id>/timeseries/) : tranches renvoyées par défaut et au plus
+TIMESERIES_DEFAULT_BUCKETS = 30
+TIMESERIES_MAX_BUCKETS = 24 * 31
+
+# Recherche plein texte (main_app/search.py) : 'fts5' (SQLite), 'terms' (index inversé
+# SearchTerm) ou None pour choisir selon la base. Les pages au-delà de SEARCH_MAX_PAGES
+# ne sont pas servies (décalage trop coûteux, résultats peu pertinents)
+SEARCH_BACKEND = os.environ.get('POLL_SEARCH_BACKEND') or None
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGES = 50
+# Au-delà de ce nombre de résultats estimé, tri par date plutôt que par pertinence (FTS5)
+SEARCH_RANK_MAX_MATCHES = 5000
+
+# Purge des sondages et utilisateurs supprimés (main_app/purge.py) : lignes effacées
+# par transaction, ce qui borne la durée des verrous et la taille du journal
+PURGE_CHUNK_SIZE = 1000
+
+# Archivage (main_app/archive.py, commande archive_responses) : les réponses plus
+# anciennes que ce nombre de jours quittent la table Response
+RESPONSE_ARCHIVE_AFTER_DAYS = 365
+
+# Mesures par requête (main_app/middleware.py) : en-tête Server-Timing et journal
+# "main_app.requests". Fraction des requêtes instrumentées en détail (0 à 1)
+REQUEST_METRICS_SAMPLE_RATE = 1.0 if DEBUG else 0.1
+# Seuils au-delà desquels une requête est signalée (niveau WARNING) avec ses requêtes SQL les plus lentes
+REQUEST_METRICS_SLOW_MS = 500
+REQUEST_METRICS_MAX_QUERIES = 50
+REQUEST_METRICS_SLOWEST_QUERIES = 5
+
+# Une ligne par requête au niveau INFO : POLL_REQUEST_LOG_LEVEL=INFO pour les afficher
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'main_app.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('POLL_REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}